@@ -0,0 +1,97 @@
+"""
+Latency of ``POST /devices/{serial_number}/access`` under many devices.
+
+``--devices`` simulated devices, cycling through the serial numbers in
+``DATABASE_URL`` (populate it first with
+``python -m web_backend.utils.seed``), each send access checks for
+random users one after the other through ``httpx.ASGITransport``.
+Authentication is stubbed out so only the access path is measured.
+Every request queues an access log row for the batched writer.
+
+Usage:
+    python -m benchmarks.access --requests 5000 --devices 64
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+
+from web_backend.app import app
+from web_backend.database import async_session_maker
+from web_backend.models import Device, User
+from web_backend.security import get_current_admin
+from web_backend.utils.access_log_writer import access_log_writer
+
+
+async def main(requests: int, devices: int) -> None:
+    app.dependency_overrides[get_current_admin] = lambda: None
+
+    async with async_session_maker() as session:
+        serial_numbers = (
+            await session.scalars(
+                select(Device.serial_number).where(
+                    Device.environment_id.is_not(None)
+                )
+            )
+        ).all()
+        user_ids = (await session.scalars(select(User.id))).all()
+
+    devices = [
+        serial_numbers[device % len(serial_numbers)]
+        for device in range(devices)
+    ]
+    remaining = iter(range(requests))
+    latencies = []
+    allowed = 0
+
+    async with (
+        app.router.lifespan_context(app),
+        AsyncClient(
+            transport=ASGITransport(app=app), base_url='http://b'
+        ) as c,
+    ):
+
+        async def device(serial_number):
+            nonlocal allowed
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await c.post(
+                    f'/devices/{serial_number}/access',
+                    json={'user_id': random.choice(user_ids)},
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                allowed += response.json()['allowed']
+
+        start = time.perf_counter()
+        await asyncio.gather(*(device(serial) for serial in devices))
+        elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'{requests} checks from {len(devices)} simulated devices, '
+        f'{allowed / requests:.0%} allowed'
+    )
+    print(f'{"checks/s":>10}{"p50 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+    print(
+        f'{requests / elapsed:>10.1f}{quantiles[49] * 1000:>9.2f}'
+        f'{quantiles[98] * 1000:>9.2f}{max(latencies) * 1000:>9.2f}'
+    )
+    stats = access_log_writer.stats()
+    print(
+        f'{stats["written"]} log rows in {stats["batches"]} batches, '
+        f'slowest flush {stats["max_flush_seconds"] * 1000:.1f} ms'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--devices', type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.devices))
@@ -0,0 +1,123 @@
+"""
+Latency of ``GET /environments/logs/{environment_id}`` on a large log.
+
+Fills ``access_log`` in ``DATABASE_URL`` (populate it first with
+``python -m web_backend.utils.seed``) with ``--rows`` synthetic accesses
+spread over the last ``--months`` months and every environment, creating
+the monthly partitions they fall in, then pages through the busiest
+environment's log with each filter. ``--rows 0`` reuses the rows already
+there. Authentication is stubbed out.
+
+Usage:
+    python -m benchmarks.environment_logs --rows 50000000 --months 12
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from web_backend.app import app
+from web_backend.database import engine
+from web_backend.security import get_current_admin
+from web_backend.utils.access_log_partitions import (
+    add_months,
+    maintain_partitions,
+    partition_months,
+)
+
+FILL = text("""
+    INSERT INTO access_log (
+        id, user_id, user_name, user_name_unaccent, user_email, user_cpf,
+        user_phone_number, environment_id, environment_name,
+        environment_name_unaccent, access_time, allowed_access
+    )
+    SELECT gen_random_uuid(), u.id, u.name, u.name_unaccent, u.email,
+           u.cpf, u.phone_number, e.id, e.name, e.name_unaccent,
+           now() - random() * (:months * interval '1 month'),
+           random() < 0.9
+    FROM generate_series(1, :rows) AS i
+    JOIN users u ON u.id = 1 + i % (SELECT max(id) FROM users)
+    JOIN environments e
+      ON e.id = 1 + (i::bigint * 7919) % (SELECT max(id) FROM environments)
+""")
+
+
+def fill(rows: int, months: int) -> None:
+    current = date.today().replace(day=1)
+    with engine.begin() as connection:
+        maintain_partitions(connection, months_ahead=1)
+        existing = partition_months(connection)
+        # creating partitions first keeps the rows out of the default one
+        for back in range(1, months + 1):
+            if add_months(current, -back) not in existing:
+                maintain_partitions(
+                    connection,
+                    today=add_months(current, -back),
+                    months_ahead=0,
+                )
+        connection.execute(FILL, {'rows': rows, 'months': months})
+        connection.execute(text('ANALYZE access_log'))
+
+
+def busiest_environment() -> int:
+    with engine.connect() as connection:
+        return connection.scalar(
+            text(
+                'SELECT environment_id FROM access_log '
+                'GROUP BY environment_id ORDER BY count(*) DESC LIMIT 1'
+            )
+        )
+
+
+async def main(rows: int, months: int, requests: int) -> None:
+    if rows:
+        fill(rows, months)
+    environment_id = busiest_environment()
+    app.dependency_overrides[get_current_admin] = lambda: None
+    week_ago = datetime.now() - timedelta(days=7)
+    cases = {
+        'newest page': {},
+        'last week': {'from': week_ago.isoformat()},
+        'denied': {'allowed_access': False},
+        'one user': {'user_id': 1},
+        'one user, week': {'user_id': 1, 'from': week_ago.isoformat()},
+    }
+
+    async with (
+        app.router.lifespan_context(app),
+        AsyncClient(
+            transport=ASGITransport(app=app), base_url='http://b'
+        ) as client,
+    ):
+        print(f'environment {environment_id}, {requests} requests per case')
+        print(f'{"case":>16}{"path":>8}{"p50 ms":>9}{"p99 ms":>9}')
+        for name, params in cases.items():
+            for path in ('', '/cursor'):
+                latencies = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    response = await client.get(
+                        f'/environments/logs/{environment_id}{path}',
+                        params={**params, 'size': 50, 'count': 'none'},
+                    )
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                quantiles = statistics.quantiles(latencies, n=100)
+                print(
+                    f'{name:>16}{path or "/":>8}'
+                    f'{quantiles[49] * 1000:>9.2f}{quantiles[98] * 1000:>9.2f}'
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.months, args.requests))
@@ -0,0 +1,87 @@
+"""
+Throughput and memory of ``GET /access-logs/export``.
+
+Serves the app with uvicorn on a local port and downloads the whole
+``access_log`` in ``DATABASE_URL`` (fill it with
+``python -m benchmarks.environment_logs --rows 10000000``) in each
+format, with and without gzip, discarding the body as it arrives.
+Reports rows per second and the peak RSS of the process, which holds
+both the server and the client, against its RSS before the first export.
+Authentication is stubbed out.
+
+Usage:
+    python -m benchmarks.export --port 8765
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import uvicorn
+from sqlalchemy import func, select
+
+from web_backend.app import app
+from web_backend.database import async_session_maker
+from web_backend.models import AccessLog
+from web_backend.security import get_current_admin
+
+
+def rss_mib(field: str) -> float:
+    # VmRSS is the current resident set, VmHWM its peak so far
+    with open('/proc/self/status', encoding='ascii') as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def main(port: int) -> None:
+    app.dependency_overrides[get_current_admin] = lambda: None
+    async with async_session_maker() as session:
+        rows = await session.scalar(
+            select(func.count()).select_from(AccessLog)
+        )
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, port=port, log_level='warning', lifespan='on')
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    baseline = rss_mib('VmRSS')
+    print(f'{rows} rows, RSS before exporting {baseline:.0f} MiB')
+    print(f'{"format":>8}{"gzip":>6}{"rows/s":>11}{"MiB":>9}{"peak MiB":>10}')
+    async with httpx.AsyncClient(
+        base_url=f'http://127.0.0.1:{port}', timeout=None
+    ) as client:
+        for format in ('csv', 'ndjson'):
+            for encoding in ('identity', 'gzip'):
+                received = 0
+                start = time.perf_counter()
+                async with client.stream(
+                    'GET',
+                    '/access-logs/export',
+                    params={'format': format},
+                    headers={'Accept-Encoding': encoding},
+                ) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+                elapsed = time.perf_counter() - start
+                print(
+                    f'{format:>8}{encoding == "gzip"!s:>6}'
+                    f'{rows / elapsed:>11.0f}{received / 2**20:>9.0f}'
+                    f'{rss_mib("VmHWM"):>10.0f}'
+                )
+
+    server.should_exit = True
+    await serving
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(main(args.port))
@@ -0,0 +1,81 @@
+"""
+Requests per second and CPU time of the list and detail endpoints, with
+and without ``FAST_JSON_RESPONSES``.
+
+Runs in-process through ``httpx.ASGITransport`` against the database in
+``DATABASE_URL`` (populate it first with ``python -m web_backend.utils.seed``)
+and switches the mode between runs. Authentication is stubbed out.
+
+Usage:
+    python -m benchmarks.fast_json --requests 2000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from web_backend.app import app
+from web_backend.routers import environment, user
+from web_backend.security import get_current_admin
+
+ENDPOINTS = [
+    '/users/?size=100',
+    '/environments/?size=100',
+    '/users/1',
+    '/environments/1',
+]
+
+
+def set_fast(fast: bool) -> None:
+    user.settings.FAST_JSON_RESPONSES = fast
+    environment.settings.FAST_JSON_RESPONSES = fast
+
+
+async def run(path: str, requests: int, concurrency: int):
+    transport = ASGITransport(app=app)
+    remaining = iter(range(requests))
+
+    async with AsyncClient(transport=transport, base_url='http://b') as c:
+        await c.get(path)  # warm up the pool
+
+        async def worker():
+            for _ in remaining:
+                response = await c.get(path)
+                response.raise_for_status()
+
+        start, cpu = time.perf_counter(), time.process_time()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+
+    return requests / elapsed, cpu / requests * 1000
+
+
+async def main(requests: int, concurrency: int) -> None:
+    app.dependency_overrides[get_current_admin] = lambda: None
+
+    async with app.router.lifespan_context(app):
+        print(f'{requests} requests, concurrency {concurrency}')
+        print(
+            f'{"endpoint":<26}{"req/s":>9}{"fast req/s":>12}'
+            f'{"CPU ms":>9}{"fast CPU ms":>13}'
+        )
+        for path in ENDPOINTS:
+            set_fast(False)
+            rps, cpu = await run(path, requests, concurrency)
+            set_fast(True)
+            fast_rps, fast_cpu = await run(path, requests, concurrency)
+            print(
+                f'{path:<26}{rps:>9.1f}{fast_rps:>12.1f}'
+                f'{cpu:>9.2f}{fast_cpu:>13.2f}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,79 @@
+"""
+Latency of a face search over galleries of increasing size.
+
+Fills a ``FaceGallery`` with random unit-length 128-d descriptors and
+times ``search`` for a batch of probes, next to the straightforward
+``np.linalg.norm(matrix - probe, axis=1)`` it replaces, which
+materializes a full copy of the gallery per probe. Runs on the CPU with
+whatever BLAS numpy was built against; set ``OMP_NUM_THREADS`` to pin
+the thread count.
+
+Usage:
+    python -m benchmarks.gallery --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from web_backend.utils.gallery import DESCRIPTOR_SIZE, FaceGallery
+
+
+def random_descriptors(rng: np.random.Generator, count: int) -> np.ndarray:
+    descriptors = rng.standard_normal((count, DESCRIPTOR_SIZE), np.float32)
+    descriptors /= np.linalg.norm(descriptors, axis=1, keepdims=True)
+    return descriptors
+
+
+def timed(search, probes) -> tuple[float, float]:
+    latencies = []
+    for probe in probes:
+        start = time.perf_counter()
+        search(probe)
+        latencies.append(time.perf_counter() - start)
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return quantiles[49] * 1000, quantiles[98] * 1000
+
+
+def main(sizes: list[int], probes: int) -> None:
+    rng = np.random.default_rng(0)
+    queries = random_descriptors(rng, probes)
+
+    print(
+        f'{"gallery":>9}{"MiB":>8}{"search p50":>12}{"p99 ms":>9}'
+        f'{"norm p50":>10}{"p99 ms":>9}'
+    )
+    for size in sizes:
+        descriptors = random_descriptors(rng, size)
+        gallery = FaceGallery()
+        gallery.load(list(range(size)), descriptors.tobytes())
+        matrix = gallery.matrix
+
+        search = timed(lambda probe: gallery.search(probe, 5), queries)
+        norm = timed(
+            lambda probe: np.argsort(np.linalg.norm(matrix - probe, axis=1))[
+                :5
+            ],
+            queries,
+        )
+        print(
+            f'{size:>9}{matrix.nbytes / 2**20:>8.1f}'
+            f'{search[0]:>12.2f}{search[1]:>9.2f}'
+            f'{norm[0]:>10.2f}{norm[1]:>9.2f}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[1_000, 10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument('--probes', type=int, default=50)
+    args = parser.parse_args()
+    main(args.sizes, args.probes)
@@ -0,0 +1,70 @@
+"""
+Login latency and throughput of the Argon2 process pool.
+
+Each simulated login runs the same password verification as
+``POST /auth/token`` through ``verify_password_async``, with
+``--concurrency`` logins in flight. Pool size and Argon2 cost come from
+Settings (``PASSWORD_HASH_WORKERS``, ``ARGON2_*``).
+
+Usage:
+    python -m benchmarks.login --logins 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from web_backend.security import (
+    get_password_hash,
+    password_pool,
+    verify_password_async,
+)
+
+
+async def main(logins: int, concurrency: int) -> None:
+    hashed = get_password_hash('benchmark')
+    latencies = []
+    rejected = 0
+    remaining = iter(range(logins))
+
+    async def worker():
+        nonlocal rejected
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                valid, _ = await verify_password_async('benchmark', hashed)
+            except HTTPException:
+                rejected += 1
+                continue
+            assert valid
+            latencies.append(time.perf_counter() - start)
+
+    await verify_password_async('benchmark', hashed)  # start the workers
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    password_pool.shutdown()
+
+    cores = min(password_pool.max_workers, os.cpu_count() or 1)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'{logins} logins, concurrency {concurrency}, '
+        f'{password_pool.max_workers} workers'
+    )
+    print(f'p50 latency:      {quantiles[49] * 1000:8.1f} ms')
+    print(f'p99 latency:      {quantiles[98] * 1000:8.1f} ms')
+    print(f'logins/s:         {len(latencies) / elapsed:8.1f}')
+    print(f'logins/s/core:    {len(latencies) / elapsed / cores:8.1f}')
+    print(f'rejected (503):   {rejected:8d}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
@@ -0,0 +1,88 @@
+"""
+Cost of the in-memory user-by-environment permission matrix.
+
+Loads a ``PermissionMatrix`` with random grants, then times single
+``allowed`` checks, incremental grants and revocations, status changes
+and dropping an environment, which clears a bit column across every
+user. The matrix is filled straight from arrays, so this measures the
+index alone, not reading ``users_environments`` from the database.
+
+Usage:
+    python -m benchmarks.permissions --users 1000000 --environments 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from web_backend.utils.permission_matrix import PermissionMatrix
+
+ACTIVE_SHARE = 0.9
+
+
+def timed(operation, arguments) -> float:
+    # one clock read per batch: reading it per call costs as much as a check
+    start = time.perf_counter_ns()
+    for argument in arguments:
+        operation(*argument)
+    return (time.perf_counter_ns() - start) / len(arguments)
+
+
+def main(
+    users: int, environments: int, grants_per_user: int, checks: int
+) -> None:
+    rng = np.random.default_rng(0)
+    user_ids = np.arange(1, users + 1)
+    pairs = np.column_stack((
+        np.repeat(user_ids, grants_per_user),
+        rng.integers(1, environments + 1, users * grants_per_user),
+    ))
+
+    matrix = PermissionMatrix()
+    start = time.perf_counter()
+    matrix.load(
+        list(
+            zip(user_ids.tolist(), (rng.random(users) < ACTIVE_SHARE).tolist())
+        ),
+        list(range(1, environments + 1)),
+        pairs.tolist(),
+    )
+    load = time.perf_counter() - start
+    size = matrix.grants.nbytes + matrix.statuses.nbytes
+
+    samples = np.column_stack((
+        rng.integers(1, users + 1, checks),
+        rng.integers(1, environments + 1, checks),
+    )).tolist()
+    print(
+        f'{users} users x {environments} environments, '
+        f'{len(pairs)} grants: {size / 2**20:.1f} MiB, '
+        f'loaded in {load:.2f} s'
+    )
+    print(f'{"operation":>18}{"ns/op":>12}')
+    for name, operation in (
+        ('allowed', matrix.allowed),
+        ('grant', matrix.grant),
+        ('revoke', matrix.revoke),
+    ):
+        print(f'{name:>18}{timed(operation, samples):>12.0f}')
+
+    statuses = [(user_id, True) for user_id, _ in samples]
+    print(f'{"set_user":>18}{timed(matrix.set_user, statuses):>12.0f}')
+
+    start = time.perf_counter()
+    matrix.drop_environment(environments)
+    print(
+        f'{"drop_environment":>18}{(time.perf_counter() - start) * 1e9:>12.0f}'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--environments', type=int, default=500)
+    parser.add_argument('--grants-per-user', type=int, default=5)
+    parser.add_argument('--checks', type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.users, args.environments, args.grants_per_user, args.checks)
@@ -0,0 +1,92 @@
+"""
+Requests per second of the sync and async listing endpoints.
+
+Both implementations of ``GET /users/`` and ``GET /environments/`` run
+in-process through ``httpx.ASGITransport`` against the database in
+``DATABASE_URL`` (populate it first with ``python -m web_backend.utils.seed``).
+Authentication is stubbed out so only the database path is measured.
+
+Usage:
+    python -m benchmarks.sync_vs_async --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Annotated
+
+from anyio import to_thread
+from fastapi import Depends, FastAPI
+from fastapi_pagination import Page, add_pagination
+from fastapi_pagination.ext.sqlalchemy import paginate
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import asc, select
+from sqlalchemy.orm import Session
+
+from web_backend.app import app as async_app
+from web_backend.database import get_session
+from web_backend.models import Environment, User
+from web_backend.schemas import EnvironmentPublic, UserPublic
+from web_backend.security import get_current_admin
+
+ENDPOINTS = ['/users/', '/environments/']
+
+sync_app = FastAPI()
+add_pagination(sync_app)
+
+
+@sync_app.get('/users/', response_model=Page[UserPublic])
+def get_users_sync(session: Annotated[Session, Depends(get_session)]):
+    return paginate(session, select(User).order_by(asc(User.name)))
+
+
+@sync_app.get('/environments/', response_model=Page[EnvironmentPublic])
+def get_environments_sync(session: Annotated[Session, Depends(get_session)]):
+    return paginate(
+        session, select(Environment).order_by(asc(Environment.name))
+    )
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int):
+    transport = ASGITransport(app=app)
+    remaining = iter(range(requests))
+
+    async with AsyncClient(transport=transport, base_url='http://b') as c:
+        await c.get(path)  # warm up the pool
+
+        async def worker():
+            for _ in remaining:
+                response = await c.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return requests / elapsed
+
+
+async def main(requests: int, concurrency: int) -> None:
+    async_app.dependency_overrides[get_current_admin] = lambda: None
+
+    async with (
+        sync_app.router.lifespan_context(sync_app),
+        async_app.router.lifespan_context(async_app),
+    ):
+        tokens = to_thread.current_default_thread_limiter().total_tokens
+        print(
+            f'{requests} requests, concurrency {concurrency}, {tokens} threads'
+        )
+        print(f'{"endpoint":<16}{"sync req/s":>12}{"async req/s":>13}')
+        for path in ENDPOINTS:
+            sync_rps = await run(sync_app, path, requests, concurrency)
+            async_rps = await run(async_app, path, requests, concurrency)
+            print(f'{path:<16}{sync_rps:>12.1f}{async_rps:>13.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,108 @@
+"""
+Throughput of concurrent photo uploads.
+
+Compares the previous upload path (a blocking ``shutil.copyfileobj`` in
+the threadpool) with the streaming ``upload_photo`` (chunked async reads
+and writes, size cap, content sniffing, hashing and an atomic rename).
+Both run in-process behind a multipart endpoint through
+``httpx.ASGITransport`` and write to a temporary ``UPLOADS_DIR``; the
+database is not involved.
+
+Usage:
+    python -m benchmarks.uploads --uploads 200 --concurrency 32 --size-kb 2048
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated
+
+from anyio import to_thread
+from fastapi import FastAPI, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from httpx import ASGITransport, AsyncClient
+
+from web_backend.utils.upload_photo import settings, upload_photo
+
+app = FastAPI()
+
+
+def copy_photo(file: UploadFile, id: int) -> None:
+    upload_dir = Path(settings.UPLOADS_DIR) / 'legacy'
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    with (upload_dir / f'{id}.jpg').open('wb') as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+
+@app.post('/legacy/{id}')
+async def legacy(id: int, photo: Annotated[UploadFile, File()]):
+    await run_in_threadpool(copy_photo, photo, id)
+
+
+@app.post('/streaming/{id}')
+async def streaming(id: int, photo: Annotated[UploadFile, File()]):
+    await upload_photo(photo, id, 'streaming')
+
+
+async def run(path: str, uploads: int, concurrency: int, photo: bytes):
+    transport = ASGITransport(app=app)
+    remaining = iter(range(uploads))
+    latencies = []
+
+    async with AsyncClient(transport=transport, base_url='http://b') as c:
+
+        async def worker():
+            for id in remaining:
+                start = time.perf_counter()
+                response = await c.post(
+                    f'{path}/{id}', files={'photo': ('p.jpg', photo)}
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return (
+        uploads / elapsed,
+        uploads * len(photo) / elapsed / 2**20,
+        quantiles[49] * 1000,
+        quantiles[98] * 1000,
+    )
+
+
+async def main(uploads: int, concurrency: int, size_kb: int) -> None:
+    photo = b'\xff\xd8\xff\xe0' + os.urandom(size_kb * 1024 - 4)
+    settings.PHOTO_MAX_BYTES = len(photo)
+
+    with tempfile.TemporaryDirectory() as uploads_dir:
+        settings.UPLOADS_DIR = uploads_dir
+        tokens = to_thread.current_default_thread_limiter().total_tokens
+        print(
+            f'{uploads} uploads of {size_kb} KiB, '
+            f'concurrency {concurrency}, {tokens} threads'
+        )
+        print(
+            f'{"path":<12}{"uploads/s":>11}{"MiB/s":>9}'
+            f'{"p50 ms":>9}{"p99 ms":>9}'
+        )
+        for path in ['/legacy', '/streaming']:
+            result = await run(path, uploads, concurrency, photo)
+            print(f'{path:<12}{result[0]:>11.1f}{result[1]:>9.1f}', end='')
+            print(f'{result[2]:>9.1f}{result[3]:>9.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--size-kb', type=int, default=2048)
+    args = parser.parse_args()
+    asyncio.run(main(args.uploads, args.concurrency, args.size_kb))
@@ -0,0 +1,94 @@
+"""
+Throughput of ``POST /users/bulk``.
+
+Builds a CSV of ``--users`` new users in ``DATABASE_URL``, with
+``--conflicts`` of its rows repeating an email already in the file, and
+imports it through the app, timing the request and, separately, the
+parsing and validation it runs in a worker thread. The imported users
+are deleted afterwards. Authentication is stubbed out with the first
+admin.
+
+Usage:
+    python -m benchmarks.user_import --users 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, select
+
+from web_backend.app import app
+from web_backend.database import engine
+from web_backend.models import Admin, User
+from web_backend.security import get_current_admin
+from web_backend.utils.user_import import parse_users
+
+DOMAIN = 'import.example'
+
+
+def build_csv(users: int, conflicts: int) -> str:
+    # numbers unlikely to be taken by earlier runs or seeded users
+    first = int(time.time()) % 8000 * 1_000_000
+    lines = ['name,email,date_of_birth,cpf,phone_number']
+    for i in range(users):
+        number = first + i
+        email_number = first if i <= conflicts else number
+        digits = f'{number:011d}'
+        lines.append(
+            f'Usuário {number},user{email_number}@{DOMAIN},2000-01-01,'
+            f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]},'
+            f'({10 + number // 10**8 % 90}) 9{number // 10**4 % 10**4:04d}'
+            f'-{number % 10**4:04d}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+async def main(users: int, conflicts: int) -> None:
+    content = build_csv(users, conflicts)
+    with engine.connect() as connection:
+        admin_id = connection.scalar(select(Admin.id).limit(1))
+    app.dependency_overrides[get_current_admin] = lambda: type(
+        'CurrentAdmin', (), {'id': admin_id}
+    )
+
+    start = time.perf_counter()
+    parse_users(content, 'csv')
+    parsing = time.perf_counter() - start
+
+    async with (
+        app.router.lifespan_context(app),
+        AsyncClient(
+            transport=ASGITransport(app=app), base_url='http://b', timeout=None
+        ) as client,
+    ):
+        start = time.perf_counter()
+        response = await client.post(
+            '/users/bulk',
+            files={'file': ('users.csv', content.encode(), 'text/csv')},
+        )
+        elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    report = response.json()
+
+    with engine.begin() as connection:
+        connection.execute(delete(User).where(User.email.like(f'%@{DOMAIN}')))
+
+    print(
+        f'{users} rows ({len(content) / 2**20:.1f} MiB): '
+        f'{report["created"]} created, {report["conflicts"]} conflicts, '
+        f'{report["invalid"]} invalid'
+    )
+    print(
+        f'parse and validate {parsing:.2f} s, whole request {elapsed:.2f} s, '
+        f'{users / elapsed:.0f} rows/s'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--conflicts', type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.conflicts))
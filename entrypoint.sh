@@ -2,4 +2,8 @@
 
 poetry run alembic upgrade head
 
+poetry run python -m web_backend.utils.sync_photos --if-empty
+
+poetry run python -m web_backend.utils.access_log_partitions
+
 poetry run fastapi run ./web_backend/app.py --host 0.0.0.0
\ No newline at end of file
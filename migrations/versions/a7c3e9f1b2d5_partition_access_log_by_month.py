@@ -0,0 +1,153 @@
+"""Partition access_log by month
+
+Revision ID: a7c3e9f1b2d5
+Revises: e5b7c2d4a1f6
+Create Date: 2026-10-18 23:02:41.730165
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f1b2d5'
+down_revision: Union[str, None] = 'e5b7c2d4a1f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions are named after their month, as expected by
+# web_backend/utils/access_log_partitions.py, which keeps creating them
+MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc(
+        'month', least(
+            (SELECT min(access_time) FROM access_log_unpartitioned),
+            now()
+        )
+    );
+BEGIN
+    WHILE month <= date_trunc('month', now()) + interval '3 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF access_log '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'access_log_p' || to_char(month, 'YYYY_MM'),
+            month,
+            month + interval '1 month'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END
+$$
+"""
+
+COLUMNS = (
+    'id, user_id, user_name, user_name_unaccent, user_email, user_cpf, '
+    'user_phone_number, environment_id, environment_name, '
+    'environment_name_unaccent, access_time, allowed_access'
+)
+
+
+def create_access_log(name: str, primary_key: list[str], **kwargs) -> None:
+    op.create_table(
+        name,
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('user_name', sa.String(), nullable=False),
+        sa.Column('user_name_unaccent', sa.String(), nullable=False),
+        sa.Column('user_email', sa.String(), nullable=False),
+        sa.Column('user_cpf', sa.String(), nullable=False),
+        sa.Column('user_phone_number', sa.String(), nullable=False),
+        sa.Column('environment_id', sa.Integer(), nullable=True),
+        sa.Column('environment_name', sa.String(), nullable=False),
+        sa.Column('environment_name_unaccent', sa.String(), nullable=False),
+        sa.Column(
+            'access_time',
+            sa.DateTime(),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.Column('allowed_access', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['environment_id'], ['environments.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint(*primary_key, name='access_log_pkey'),
+        **kwargs
+    )
+    op.create_index(
+        'idx_access_log_environment_name_gin_trgm',
+        name,
+        ['environment_name_unaccent'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'environment_name_unaccent': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'idx_access_log_users_name_gin_trgm',
+        name,
+        ['user_name_unaccent'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'user_name_unaccent': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'idx_access_log_environment_id_access_time_id',
+        name,
+        ['environment_id', 'access_time', 'id'],
+        unique=False
+    )
+
+
+def set_aside_access_log() -> None:
+    # frees the names of the table, its indexes and its constraints
+    op.rename_table('access_log', 'access_log_unpartitioned')
+    op.execute(
+        'ALTER INDEX access_log_pkey RENAME TO access_log_unpartitioned_pkey'
+    )
+    for column in ('user_id', 'environment_id'):
+        op.drop_constraint(
+            f'access_log_{column}_fkey',
+            'access_log_unpartitioned',
+            type_='foreignkey',
+        )
+    op.drop_index(
+        'idx_access_log_environment_name_gin_trgm',
+        table_name='access_log_unpartitioned'
+    )
+    op.drop_index(
+        'idx_access_log_users_name_gin_trgm',
+        table_name='access_log_unpartitioned'
+    )
+    op.drop_index(
+        'idx_access_log_environment_id_access_time_id',
+        table_name='access_log_unpartitioned'
+    )
+
+
+def upgrade() -> None:
+    set_aside_access_log()
+    create_access_log(
+        'access_log',
+        ['id', 'access_time'],
+        postgresql_partition_by='RANGE (access_time)'
+    )
+    op.execute(
+        'CREATE TABLE access_log_default PARTITION OF access_log DEFAULT'
+    )
+    op.execute(MONTHLY_PARTITIONS)
+    op.execute(
+        f'INSERT INTO access_log ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM access_log_unpartitioned'
+    )
+    op.drop_table('access_log_unpartitioned')
+
+
+def downgrade() -> None:
+    set_aside_access_log()
+    create_access_log('access_log', ['id'])
+    op.execute(
+        f'INSERT INTO access_log ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM access_log_unpartitioned'
+    )
+    op.drop_table('access_log_unpartitioned')
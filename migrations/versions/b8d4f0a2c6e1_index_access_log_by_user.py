@@ -0,0 +1,34 @@
+"""Index access_log by user and time
+
+Revision ID: b8d4f0a2c6e1
+Revises: a7c3e9f1b2d5
+Create Date: 2026-10-19 09:12:37.504118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f0a2c6e1'
+down_revision: Union[str, None] = 'a7c3e9f1b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_access_log_user_id_access_time_id',
+        'access_log',
+        ['user_id', 'access_time', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'idx_access_log_user_id_access_time_id',
+        table_name='access_log'
+    )
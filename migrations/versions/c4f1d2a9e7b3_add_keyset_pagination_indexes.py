@@ -0,0 +1,49 @@
+"""Add composite indexes backing keyset pagination
+
+Revision ID: c4f1d2a9e7b3
+Revises: 445a72fd0f81
+Create Date: 2026-10-18 18:05:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f1d2a9e7b3'
+down_revision: Union[str, None] = '445a72fd0f81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_users_name_id', 'users', ['name', 'id'], unique=False
+    )
+    op.create_index(
+        'idx_users_email_id', 'users', ['email', 'id'], unique=False
+    )
+    op.create_index(
+        'idx_environments_name_id',
+        'environments',
+        ['name', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'idx_access_log_environment_id_access_time_id',
+        'access_log',
+        ['environment_id', 'access_time', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'idx_access_log_environment_id_access_time_id',
+        table_name='access_log'
+    )
+    op.drop_index('idx_environments_name_id', table_name='environments')
+    op.drop_index('idx_users_email_id', table_name='users')
+    op.drop_index('idx_users_name_id', table_name='users')
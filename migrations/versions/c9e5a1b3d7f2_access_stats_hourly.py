@@ -0,0 +1,46 @@
+"""Add hourly access rollups
+
+Revision ID: c9e5a1b3d7f2
+Revises: b8d4f0a2c6e1
+Create Date: 2026-10-19 11:40:03.216957
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e5a1b3d7f2'
+down_revision: Union[str, None] = 'b8d4f0a2c6e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'access_stats_hourly',
+        sa.Column('environment_id', sa.Integer(), nullable=False),
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('allowed', sa.Integer(), nullable=False),
+        sa.Column('denied', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['environment_id'], ['environments.id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('environment_id', 'hour')
+    )
+    # the history; later logs are counted as they are written
+    op.execute(
+        'INSERT INTO access_stats_hourly '
+        '(environment_id, hour, allowed, denied) '
+        "SELECT environment_id, date_trunc('hour', access_time), "
+        'count(*) FILTER (WHERE allowed_access), '
+        'count(*) FILTER (WHERE NOT allowed_access) '
+        'FROM access_log WHERE environment_id IS NOT NULL '
+        'GROUP BY 1, 2'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('access_stats_hourly')
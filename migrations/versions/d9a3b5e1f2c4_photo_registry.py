@@ -0,0 +1,49 @@
+"""Photo registry
+
+Revision ID: d9a3b5e1f2c4
+Revises: c4f1d2a9e7b3
+Create Date: 2026-10-18 18:41:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3b5e1f2c4'
+down_revision: Union[str, None] = 'c4f1d2a9e7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'photos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(
+            'kind',
+            sa.Enum('users_photos', 'environments_photos', name='photokind'),
+            nullable=False
+        ),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('extension', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(), nullable=False),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'owner_id')
+    )
+    # existing files are indexed on start by entrypoint.sh, with
+    # python -m web_backend.utils.sync_photos --if-empty
+
+
+def downgrade() -> None:
+    op.drop_table('photos')
+    op.execute('DROP TYPE photokind')
@@ -0,0 +1,41 @@
+"""Face embeddings
+
+Revision ID: e5b7c2d4a1f6
+Revises: d9a3b5e1f2c4
+Create Date: 2026-10-18 21:12:05.418227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c2d4a1f6'
+down_revision: Union[str, None] = 'd9a3b5e1f2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'face_embeddings',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('photo_version', sa.String(), nullable=False),
+        sa.Column('descriptor', sa.LargeBinary(), nullable=False),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('face_embeddings')
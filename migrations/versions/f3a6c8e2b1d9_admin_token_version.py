@@ -0,0 +1,34 @@
+"""Admin token version
+
+Revision ID: f3a6c8e2b1d9
+Revises: c9e5a1b3d7f2
+Create Date: 2026-10-19 16:48:21.730512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6c8e2b1d9'
+down_revision: Union[str, None] = 'c9e5a1b3d7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'admins',
+        sa.Column(
+            'token_version',
+            sa.Integer(),
+            server_default='0',
+            nullable=False
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('admins', 'token_version')
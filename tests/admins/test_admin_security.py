@@ -1,8 +1,15 @@
 from http import HTTPStatus
 
 from jwt import decode
-
-from web_backend.security import create_access_token
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from web_backend.security import (
+    AdminPrincipal,
+    admin_cache,
+    create_access_token,
+    get_password_hash,
+)
 from web_backend.settings import Settings
 
 settings = Settings()
@@ -71,3 +78,74 @@ def test_get_current_admin_invalid_token(client, admin):
 #         assert response.json() == {
 #             'detail': 'Could not validate credentials'
 #         }
+
+
+def test_get_current_admin_uses_cache(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/admins/profile', headers=headers)
+    hits = admin_cache.stats()['hits']
+
+    response = client.get('/admins/profile', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert admin_cache.stats()['hits'] == hits + 1
+    assert isinstance(
+        admin_cache.get(response.json()['email']), AdminPrincipal
+    )
+
+
+def test_password_change_revokes_tokens(client, session, token, super_admin):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/admins/profile', headers=headers)
+
+    super_admin.password = get_password_hash('nova-senha')
+    session.commit()
+
+    response = client.get('/admins/profile', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_rehash_at_login_keeps_tokens(client, session, super_admin):
+    old_context = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=8192),))
+    super_admin.password = old_context.hash(super_admin.clean_password)
+    session.commit()
+    old_hash = super_admin.password
+    # the token of another session, issued before the rehash
+    token = create_access_token({
+        'sub': super_admin.email,
+        'ver': super_admin.token_version,
+    })
+
+    client.post(
+        '/auth/token',
+        data={
+            'username': super_admin.email,
+            'password': super_admin.clean_password,
+        },
+    )
+
+    session.refresh(super_admin)
+    assert super_admin.password != old_hash
+    response = client.get(
+        '/admins/profile', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_admin_cache_evicted_on_update(session, super_admin):
+    admin_cache.set(super_admin.email, super_admin)
+
+    super_admin.name = 'Outro Nome'
+    session.commit()
+
+    assert admin_cache.get(super_admin.email) is None
+
+
+def test_admin_cache_evicted_on_delete(session, super_admin):
+    admin_cache.set(super_admin.email, super_admin)
+
+    session.delete(super_admin)
+    session.commit()
+
+    assert admin_cache.get(super_admin.email) is None
@@ -1,15 +1,19 @@
+from datetime import date
 from typing import Generator
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
 from web_backend.app import app
-from web_backend.database import get_session
-from web_backend.models import Admin, table_registry
-from web_backend.security import get_password_hash
+from web_backend.database import get_async_session, get_session
+from web_backend.models import Admin, Environment, User, table_registry
+from web_backend.security import admin_cache, get_password_hash
+from web_backend.utils.permissions import permissions
 
 
 @pytest.fixture(scope='session')
@@ -17,10 +21,19 @@ def engine() -> Generator:
     with PostgresContainer(image='postgres:16', driver='psycopg') as postgres:
         _engine = create_engine(postgres.get_connection_url())
 
+        with _engine.begin() as connection:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
         with _engine.begin():
             yield _engine
 
 
+@pytest.fixture(scope='session')
+def async_engine(engine):
+    # NullPool: each request opens its connection on the TestClient loop
+    return create_async_engine(engine.url, poolclass=NullPool)
+
+
 @pytest.fixture
 def session(engine) -> Generator[Session, None, None]:
     table_registry.metadata.create_all(engine)
@@ -33,12 +46,23 @@ def session(engine) -> Generator[Session, None, None]:
 
 
 @pytest.fixture
-def client(session: Session) -> Generator[TestClient, None, None]:
+def client(
+    session: Session, async_engine
+) -> Generator[TestClient, None, None]:
     def get_session_test():
         return session
 
+    async def get_async_session_test():
+        async with AsyncSession(
+            async_engine, expire_on_commit=False
+        ) as async_session:
+            yield async_session
+
+    admin_cache.clear()
+    permissions.clear()
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_test
+        app.dependency_overrides[get_async_session] = get_async_session_test
         yield client
 
     app.dependency_overrides.clear()
@@ -49,6 +73,10 @@ def admin(session: Session) -> Generator[Admin, None, None]:
     admin = Admin(
         email='admin_teste@example.com',
         password=get_password_hash('admin_teste1234'),
+        date_of_birth=date(2000, 1, 1),
+        cpf='000.000.000-00',
+        name='Admin Teste',
+        phone_number='(82) 90000-0000',
         super_admin=False,
     )
 
@@ -65,6 +93,10 @@ def super_admin(session: Session) -> Generator[Admin, None, None]:
     super_admin = Admin(
         email='admin_teste@example.com',
         password=get_password_hash(password),
+        date_of_birth=date(2000, 1, 1),
+        cpf='000.000.000-00',
+        name='Super Admin Teste',
+        phone_number='(82) 90000-0000',
         super_admin=True,
     )
 
@@ -77,6 +109,40 @@ def super_admin(session: Session) -> Generator[Admin, None, None]:
     return super_admin
 
 
+@pytest.fixture
+def user(session: Session, super_admin: Admin) -> User:
+    user = User(
+        registered_by_admin_id=super_admin.id,
+        name='User Teste',
+        name_unaccent='User Teste',
+        email='user_teste@example.com',
+        date_of_birth=date(2000, 1, 1),
+        cpf='111.111.111-11',
+        phone_number='(82) 91111-1111',
+    )
+
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    return user
+
+
+@pytest.fixture
+def environment(session: Session, super_admin: Admin) -> Environment:
+    environment = Environment(
+        name='Laboratório',
+        name_unaccent='Laboratorio',
+        creator_admin_id=super_admin.id,
+    )
+
+    session.add(environment)
+    session.commit()
+    session.refresh(environment)
+
+    return environment
+
+
 @pytest.fixture
 def token(client, super_admin: Admin) -> str:
     response = client.post(
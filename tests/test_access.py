@@ -0,0 +1,289 @@
+import asyncio
+from datetime import UTC, datetime
+from http import HTTPStatus
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from web_backend.models import (
+    AccessLog,
+    AccessStatsHourly,
+    Device,
+)
+from web_backend.models.user import UserStatus
+from web_backend.models.user_environment import association_table
+from web_backend.utils.access_log_writer import (
+    AccessLogWriter,
+    access_log_writer,
+    append_rows,
+)
+from web_backend.utils.access_stats import check_stats
+
+
+@pytest.fixture
+def device(session, super_admin, environment):
+    device = Device(
+        serial_number='door-1',
+        environment_id=environment.id,
+        environment=environment,
+        creator_admin_id=super_admin.id,
+    )
+    session.add(device)
+    session.commit()
+
+    return device
+
+
+def grant(session, user, environment):
+    session.execute(
+        insert(association_table).values(
+            user_id=user.id, enviroment_id=environment.id
+        )
+    )
+    session.commit()
+
+
+def access(client, token, user_id, serial_number='door-1'):
+    response = client.post(
+        f'/devices/{serial_number}/access',
+        json={'user_id': user_id},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    # logs are written in batches, after the response
+    client.portal.call(access_log_writer.flush)
+
+    return response
+
+
+@pytest.mark.usefixtures('device')
+def test_granted_user_is_allowed_and_logged(
+    client, token, session, user, environment
+):
+    grant(session, user, environment)
+    updated_at = user.updated_at
+
+    response = access(client, token, user.id)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'allowed': True,
+        'user_id': user.id,
+        'environment_id': environment.id,
+    }
+    log = session.scalar(select(AccessLog))
+    assert (log.user_name, log.environment_name, log.allowed_access) == (
+        'User Teste',
+        'Laboratório',
+        True,
+    )
+    session.refresh(user)
+    session.refresh(environment)
+    assert user.last_accessed_environment_name == 'Laboratório'
+    assert user.last_access_time == log.access_time
+    assert user.updated_at == updated_at
+    assert environment.last_accessed_by_user_id == user.id
+
+
+@pytest.mark.usefixtures('device')
+def test_user_without_grant_is_denied(
+    client, token, session, user, environment
+):
+    response = access(client, token, user.id)
+
+    assert response.json()['allowed'] is False
+    assert session.scalar(select(AccessLog.allowed_access)) is False
+    session.refresh(user)
+    assert user.last_access_time is None
+
+
+@pytest.mark.usefixtures('device')
+def test_inactive_user_is_denied(client, token, session, user, environment):
+    grant(session, user, environment)
+    user.status = UserStatus.inactive
+    session.commit()
+
+    response = access(client, token, user.id)
+
+    assert response.json()['allowed'] is False
+
+
+@pytest.mark.parametrize(
+    ('serial_number', 'user_id', 'message'),
+    [('door-2', None, 'Device not found'), ('door-1', 999, 'User not found')],
+)
+@pytest.mark.usefixtures('device')
+def test_unknown_device_or_user_is_not_found(  # noqa: PLR0913, PLR0917
+    client, token, session, user, environment, serial_number, user_id, message
+):
+    response = access(client, token, user_id or user.id, serial_number)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': message}
+    assert session.scalar(select(AccessLog)) is None
+
+
+def log_row(**values):
+    return {
+        'id': uuid4(),
+        'user_id': None,
+        'user_name': 'User Teste',
+        'user_name_unaccent': 'User Teste',
+        'user_email': 'user_teste@example.com',
+        'user_cpf': '111.111.111-11',
+        'user_phone_number': '(82) 91111-1111',
+        'environment_id': None,
+        'environment_name': 'Laboratório',
+        'environment_name_unaccent': 'Laboratorio',
+        'access_time': datetime.now(tz=UTC),
+        'allowed_access': True,
+        **values,
+    }
+
+
+def logged(session):
+    return session.scalar(select(func.count()).select_from(AccessLog))
+
+
+def write(writer, bind, rows):
+    async def scenario():
+        writer.start(bind)
+        for row in rows:
+            await writer.put(row)
+        await writer.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def writer(tmp_path):
+    return AccessLogWriter(
+        batch_size=3,
+        flush_interval=0.05,
+        max_pending=2,
+        spool_path=str(tmp_path / 'access_log.spool'),
+    )
+
+
+def test_writer_batches_rows(session, async_engine, writer):
+    write(writer, async_engine, [log_row() for _ in range(7)])
+
+    assert logged(session) == 7  # noqa: PLR2004
+    stats = writer.stats()
+    assert (stats['written'], stats['batches']) == (7, 3)
+    assert stats['backpressure_waits'] > 0
+
+
+def test_writer_spools_while_database_is_unavailable(
+    session, async_engine, writer
+):
+    unavailable = create_async_engine(
+        'postgresql+psycopg://postgres@/postgres?host=/nonexistent'
+    )
+    write(writer, unavailable, [log_row(), log_row()])
+
+    assert session.scalar(select(AccessLog)) is None
+    spooled = writer.spool_path.read_text().splitlines()
+    assert len(spooled) == 2  # noqa: PLR2004
+
+    write(writer, async_engine, [log_row()])
+
+    assert logged(session) == 3  # noqa: PLR2004
+    assert not writer.spool_path.exists()
+    assert writer.stats()['replayed'] == 2  # noqa: PLR2004
+
+
+def test_writer_keeps_rows_spooled_during_a_replay(
+    session, async_engine, writer, monkeypatch
+):
+    unavailable = create_async_engine(
+        'postgresql+psycopg://postgres@/postgres?host=/nonexistent'
+    )
+    write(writer, unavailable, [log_row(), log_row()])
+    write_rows = writer._write
+    calls = []
+
+    async def write_while_another_process_spools(rows):
+        calls.append(rows)
+        if len(calls) == 2:  # noqa: PLR2004
+            append_rows(writer.spool_path, [log_row()])
+        return await write_rows(rows)
+
+    monkeypatch.setattr(writer, '_write', write_while_another_process_spools)
+    write(writer, async_engine, [log_row()])
+
+    assert logged(session) == 3  # noqa: PLR2004
+    assert not writer.replay_path.exists()
+    assert writer.spool_path.exists()
+
+    write(writer, async_engine, [log_row()])
+
+    assert logged(session) == 5  # noqa: PLR2004
+    assert not writer.spool_path.exists()
+
+
+def test_writer_keeps_running_after_a_failed_replay(
+    session, async_engine, writer
+):
+    writer.spool_path.write_text('not a row\n')
+
+    write(writer, async_engine, [log_row()])
+    write(writer, async_engine, [log_row()])
+
+    assert logged(session) == 2  # noqa: PLR2004
+
+
+def test_writer_holds_rows_the_spool_cannot_take(
+    session, async_engine, writer, tmp_path
+):
+    unavailable = create_async_engine(
+        'postgresql+psycopg://postgres@/postgres?host=/nonexistent'
+    )
+    writer.spool_path = tmp_path / 'missing' / 'access_log.spool'
+    write(writer, unavailable, [log_row(), log_row(), log_row()])
+
+    stats = writer.stats()
+    assert stats['spool_errors'] > 0
+    # two rows are held; the oldest was dropped past max_pending
+    assert (stats['held'], stats['dropped']) == (2, 1)
+
+    write(writer, async_engine, [log_row()])
+
+    assert logged(session) == 3  # noqa: PLR2004
+    assert writer.stats()['held'] == 0
+
+
+def test_writer_sets_rejected_rows_aside(session, async_engine, writer):
+    write(writer, async_engine, [log_row(), log_row(user_id=999)])
+
+    assert logged(session) == 1
+    assert '"user_id": 999' in writer.rejected_path.read_text()
+    assert writer.stats()['rejected'] == 1
+
+
+def test_writer_adds_batches_to_the_rollups_once(
+    session, async_engine, writer, environment
+):
+    hour = datetime(2025, 3, 1, 8, tzinfo=UTC)
+    rows = [
+        log_row(
+            environment_id=environment.id,
+            access_time=hour.replace(minute=minute),
+            allowed_access=minute % 20 != 0,
+        )
+        for minute in range(0, 60, 10)
+    ] + [
+        log_row(
+            environment_id=environment.id, access_time=hour.replace(hour=9)
+        )
+    ]
+    write(writer, async_engine, rows)
+    # replayed rows are skipped, and so not counted again
+    write(writer, async_engine, rows)
+
+    stats = session.scalars(
+        select(AccessStatsHourly).order_by(AccessStatsHourly.hour)
+    ).all()
+    assert [(stat.allowed, stat.denied) for stat in stats] == [(3, 3), (1, 0)]
+    assert not check_stats(session.connection())
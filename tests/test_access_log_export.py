@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from uuid import uuid4
+
+import pytest
+
+from web_backend.models import AccessLog, Environment
+from web_backend.routers import access_log
+
+START = datetime(2025, 3, 1, 8)
+
+
+@pytest.fixture
+def environments(session, super_admin):
+    environments = [
+        Environment(
+            name=name, name_unaccent=name, creator_admin_id=super_admin.id
+        )
+        for name in ('Laboratório', 'Recepção')
+    ]
+    session.add_all(environments)
+    session.commit()
+
+    return environments
+
+
+@pytest.fixture
+def logs(session, user, environments):
+    # one access per hour, alternating environments; every third denied
+    logs = []
+    for hour in range(7):
+        environment = environments[hour % 2]
+        log = AccessLog(
+            user_id=user.id,
+            user_name=user.name,
+            user_name_unaccent=user.name_unaccent,
+            user_email=user.email,
+            user_cpf=user.cpf,
+            user_phone_number=user.phone_number,
+            environment_id=environment.id,
+            environment_name=environment.name,
+            environment_name_unaccent=environment.name_unaccent,
+            allowed_access=bool(hour % 3),
+        )
+        log.id = uuid4()
+        log.access_time = START + timedelta(hours=hour)
+        logs.append(log)
+    session.add_all(logs)
+    session.commit()
+
+    return logs
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(access_log.settings, 'ACCESS_LOG_EXPORT_BATCH_SIZE', 2)
+
+
+def export(client, token, encoding='identity', **params):
+    return client.get(
+        '/access-logs/export',
+        params=params,
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Accept-Encoding': encoding,
+        },
+    )
+
+
+def test_export_csv_oldest_first(client, token, logs):
+    response = export(client, token)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'text/csv; charset=utf-8'
+    assert 'content-encoding' not in response.headers
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['id'] for row in rows] == [str(log.id) for log in logs]
+    assert rows[0] == {
+        'id': str(logs[0].id),
+        'user_id': str(logs[0].user_id),
+        'user_name': 'User Teste',
+        'user_name_unaccent': 'User Teste',
+        'user_email': 'user_teste@example.com',
+        'user_cpf': '111.111.111-11',
+        'user_phone_number': '(82) 91111-1111',
+        'environment_id': str(logs[0].environment_id),
+        'environment_name': 'Laboratório',
+        'environment_name_unaccent': 'Laboratório',
+        'access_time': '2025-03-01 08:00:00',
+        'allowed_access': 'f',
+    }
+
+
+def test_export_ndjson_with_filters_gzipped(client, token, environments, logs):
+    response = export(
+        client,
+        token,
+        encoding='gzip',
+        format='ndjson',
+        environment_id=environments[0].id,
+        allowed_access=True,
+        **{'from': '2025-03-01T09:00'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['access_time'] for row in rows] == [
+        '2025-03-01T10:00:00',
+        '2025-03-01T12:00:00',
+    ]
+    assert all(row['allowed_access'] is True for row in rows)
+
+
+def test_export_of_nothing_is_just_the_header(client, token):
+    response = export(client, token)
+
+    assert response.text.splitlines() == [
+        ','.join(column.key for column in AccessLog.__table__.columns)
+    ]
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import date, datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from web_backend.models import AccessLog
+from web_backend.utils.access_log_partitions import (
+    MAINTENANCE_LOCK,
+    maintain_partitions,
+    maintain_partitions_periodically,
+    partition_months,
+    try_maintain_partitions,
+)
+
+
+def log(access_time):
+    access_log = AccessLog(
+        user_id=None,
+        user_name='Usuário',
+        user_name_unaccent='Usuario',
+        user_email='usuario@example.com',
+        user_cpf='111.111.111-11',
+        user_phone_number='(82) 91111-1111',
+        environment_id=None,
+        environment_name='Laboratório',
+        environment_name_unaccent='Laboratorio',
+        allowed_access=True,
+    )
+    access_log.id = uuid4()
+    access_log.access_time = access_time
+    return access_log
+
+
+def count(session, table):
+    return session.scalar(text(f'SELECT count(*) FROM {table}'))
+
+
+@pytest.fixture
+def connection(session):
+    return session.connection()
+
+
+def test_creates_current_and_upcoming_months(connection):
+    result = maintain_partitions(
+        connection, today=date(2025, 11, 15), months_ahead=2
+    )
+
+    assert result == {
+        'created': [
+            'access_log_p2025_11',
+            'access_log_p2025_12',
+            'access_log_p2026_01',
+        ],
+        'expired': [],
+    }
+    assert maintain_partitions(
+        connection, today=date(2025, 11, 20), months_ahead=2
+    ) == {'created': [], 'expired': []}
+
+
+def test_rows_in_the_default_partition_are_moved(session, connection):
+    session.add_all([log(datetime(2025, 3, 10)), log(datetime(2025, 4, 2))])
+    session.flush()
+
+    maintain_partitions(connection, today=date(2025, 3, 1), months_ahead=0)
+
+    assert count(session, 'access_log_p2025_03') == 1
+    assert count(session, 'access_log_default') == 1
+    assert count(session, 'access_log') == 2  # noqa: PLR2004
+
+
+@pytest.mark.parametrize('drop_expired', [True, False])
+def test_expires_months_past_retention(session, connection, drop_expired):
+    maintain_partitions(connection, today=date(2025, 1, 1), months_ahead=0)
+    session.add_all([log(datetime(2025, 1, 5)), log(datetime(2024, 6, 1))])
+    session.flush()
+
+    result = maintain_partitions(
+        connection,
+        today=date(2025, 4, 1),
+        months_ahead=0,
+        retention_months=2,
+        drop_expired=drop_expired,
+    )
+
+    assert result['expired'] == ['access_log_p2025_01']
+    assert list(partition_months(connection)) == [date(2025, 4, 1)]
+    assert count(session, 'access_log') == 0
+    detached = session.scalar(
+        text("SELECT to_regclass('access_log_p2025_01') IS NOT NULL")
+    )
+    assert detached is not drop_expired
+    if detached:
+        assert count(session, 'access_log_p2025_01') == 1
+        session.execute(text('DROP TABLE access_log_p2025_01'))
+
+
+def test_queries_by_time_only_scan_matching_partitions(session, connection):
+    maintain_partitions(connection, today=date(2025, 1, 1), months_ahead=2)
+
+    plan = '\n'.join(
+        session.scalars(
+            text(
+                'EXPLAIN SELECT * FROM access_log '
+                "WHERE access_time >= '2025-02-01' "
+                "AND access_time < '2025-03-01'"
+            )
+        )
+    )
+
+    assert 'access_log_p2025_02' in plan
+    assert 'access_log_p2025_01' not in plan
+    assert 'access_log_p2025_03' not in plan
+    assert 'access_log_default' not in plan
+
+
+def test_maintenance_runs_in_one_process_at_a_time(engine, connection):
+    with engine.connect() as other:
+        other.execute(
+            text('SELECT pg_advisory_lock(:key)'), {'key': MAINTENANCE_LOCK}
+        )
+        try:
+            assert try_maintain_partitions(connection) is None
+        finally:
+            other.execute(
+                text('SELECT pg_advisory_unlock(:key)'),
+                {'key': MAINTENANCE_LOCK},
+            )
+            other.commit()
+
+    assert try_maintain_partitions(connection)['created']
+
+
+def test_maintenance_runs_periodically(session, async_engine):
+    async def scenario():
+        task = asyncio.create_task(
+            maintain_partitions_periodically(async_engine, 0.01)
+        )
+        async with asyncio.timeout(5):
+            while not await has_partitions():
+                await asyncio.sleep(0.01)
+        task.cancel()
+
+    async def has_partitions():
+        async with async_engine.connect() as connection:
+            return bool(await connection.run_sync(partition_months))
+
+    asyncio.run(scenario())
+
+    assert partition_months(session.connection())
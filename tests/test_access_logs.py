@@ -0,0 +1,222 @@
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from uuid import uuid4
+
+import pytest
+
+from web_backend.models import AccessLog, User
+from web_backend.routers import environment as environment_router
+
+START = datetime(2025, 3, 1, 8)
+
+
+@pytest.fixture
+def visitor(session, super_admin):
+    visitor = User(
+        registered_by_admin_id=super_admin.id,
+        name='Visitante',
+        name_unaccent='Visitante',
+        email='visitante@example.com',
+        date_of_birth=date(2000, 1, 1),
+        cpf='222.222.222-22',
+        phone_number='(82) 92222-2222',
+    )
+    session.add(visitor)
+    session.commit()
+
+    return visitor
+
+
+@pytest.fixture
+def logs(session, user, visitor, environment):
+    # one access per hour; every third one is the visitor's, denied
+    logs = []
+    for hour in range(12):
+        by = user if hour % 3 else visitor
+        log = AccessLog(
+            user_id=by.id,
+            user_name=by.name,
+            user_name_unaccent=by.name_unaccent,
+            user_email=by.email,
+            user_cpf=by.cpf,
+            user_phone_number=by.phone_number,
+            environment_id=environment.id,
+            environment_name=environment.name,
+            environment_name_unaccent=environment.name_unaccent,
+            allowed_access=bool(hour % 3),
+        )
+        log.id = uuid4()
+        log.access_time = START + timedelta(hours=hour)
+        logs.append(log)
+    session.add_all(logs)
+    session.commit()
+
+    return logs
+
+
+def access_times(response):
+    assert response.status_code == HTTPStatus.OK
+    return [
+        datetime.fromisoformat(item['access_time'])
+        for item in response.json()['items']
+    ]
+
+
+def test_environment_logs_are_newest_first(client, environment, logs):
+    response = client.get(f'/environments/logs/{environment.id}')
+
+    assert access_times(response) == sorted(
+        (log.access_time for log in logs), reverse=True
+    )
+
+
+def test_environment_logs_estimate_and_cap_offset(
+    client, environment, logs, monkeypatch
+):
+    response = client.get(
+        f'/environments/logs/{environment.id}', params={'size': 5}
+    )
+
+    assert response.json()['count'] == 'estimate'
+
+    monkeypatch.setattr(
+        environment_router.settings, 'ACCESS_LOG_MAX_OFFSET', 5
+    )
+    response = client.get(
+        f'/environments/logs/{environment.id}',
+        params={'size': 5, 'page': 2, 'count': 'exact'},
+    )
+
+    assert response.json()['total'] == len(logs)
+
+    response = client.get(
+        f'/environments/logs/{environment.id}', params={'size': 5, 'page': 3}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {
+        'message': 'Pages cannot start past row 5; '
+        'use the cursor endpoint to go further'
+    }
+
+
+def test_environment_logs_between_times(client, environment, logs):
+    response = client.get(
+        f'/environments/logs/{environment.id}',
+        params={
+            'from': (START + timedelta(hours=2)).isoformat(),
+            'to': (START + timedelta(hours=5)).isoformat(),
+        },
+    )
+
+    assert access_times(response) == [
+        START + timedelta(hours=hour) for hour in (4, 3, 2)
+    ]
+
+
+@pytest.mark.parametrize(
+    ('params', 'hours'),
+    [
+        ({'allowed_access': False}, [9, 6, 3, 0]),
+        ({'allowed_access': True, 'from': '2025-03-01T15:00'}, [11, 10, 8, 7]),
+        ({'user_name': 'visitante'}, [9, 6, 3, 0]),
+    ],
+)
+def test_environment_logs_filters(  # noqa: PLR0913, PLR0917
+    client, token, environment, logs, params, hours
+):
+    response = client.get(
+        f'/environments/logs/{environment.id}/cursor',
+        params=params,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert access_times(response) == [
+        START + timedelta(hours=hour) for hour in hours
+    ]
+
+
+def test_environment_logs_by_user_across_cursor_pages(
+    client, token, user, environment, logs
+):
+    times, cursor = [], None
+    while True:
+        response = client.get(
+            f'/environments/logs/{environment.id}/cursor',
+            params={'user_id': user.id, 'size': 3, 'cursor': cursor},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        times += access_times(response)
+        cursor = response.json()['next_page']
+        if cursor is None:
+            break
+
+    assert times == [
+        log.access_time for log in reversed(logs) if log.user_id == user.id
+    ]
+
+
+def test_environment_logs_cursor_requires_an_admin(client, environment):
+    response = client.get(f'/environments/logs/{environment.id}/cursor')
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def history(client, token, user_id, **params):
+    return client.get(
+        f'/users/{user_id}/access-logs',
+        params=params,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_user_history_is_newest_first(client, token, user, logs):
+    response = history(client, token, user.id, allowed_access=True)
+
+    assert access_times(response) == [
+        log.access_time for log in reversed(logs) if log.user_id == user.id
+    ]
+    assert response.json()['items'][0] == {
+        'environment_id': logs[-1].environment_id,
+        'environment_name': 'Laboratório',
+        'allowed_access': True,
+        'access_time': logs[-1].access_time.isoformat(),
+    }
+
+
+def test_user_history_filters(client, token, visitor, environment, logs):
+    response = history(
+        client,
+        token,
+        visitor.id,
+        environment_id=environment.id,
+        allowed_access=False,
+        **{'from': '2025-03-01T09:00', 'to': '2025-03-01T17:00'},
+    )
+
+    assert access_times(response) == [
+        START + timedelta(hours=hour) for hour in (6, 3)
+    ]
+    assert not access_times(
+        history(client, token, visitor.id, environment_name='Recepção')
+    )
+
+
+def test_user_history_across_cursor_pages(client, token, user, logs):
+    times, cursor = [], None
+    while True:
+        response = history(client, token, user.id, size=3, cursor=cursor)
+        times += access_times(response)
+        cursor = response.json()['next_page']
+        if cursor is None:
+            break
+
+    assert len(times) == 8  # noqa: PLR2004
+    assert times == sorted(times, reverse=True)
+
+
+def test_user_history_of_unknown_user(client, token):
+    response = history(client, token, 999)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'User not found!'}
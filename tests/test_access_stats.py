@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import update
+
+from web_backend.models import AccessLog, AccessStatsHourly
+from web_backend.utils.access_stats import backfill_stats, check_stats
+
+START = datetime(2025, 3, 1, 22)
+
+
+@pytest.fixture
+def logs(session, environment):
+    # every 20 minutes for four hours, across midnight; every third denied
+    logs = []
+    for index in range(12):
+        log = AccessLog(
+            user_id=None,
+            user_name='Usuário',
+            user_name_unaccent='Usuario',
+            user_email='usuario@example.com',
+            user_cpf='111.111.111-11',
+            user_phone_number='(82) 91111-1111',
+            environment_id=environment.id,
+            environment_name=environment.name,
+            environment_name_unaccent=environment.name_unaccent,
+            allowed_access=bool(index % 3),
+        )
+        log.id = uuid4()
+        log.access_time = START + timedelta(minutes=20 * index)
+        logs.append(log)
+    session.add_all(logs)
+    session.commit()
+
+    return logs
+
+
+def stats(client, token, environment_id, **params):
+    return client.get(
+        f'/environments/{environment_id}/stats',
+        params=params,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_backfill_counts_the_raw_log(session, environment, logs):
+    assert len(check_stats(session.connection())) == 4  # noqa: PLR2004
+
+    written = backfill_stats(session.connection())
+
+    assert written == 4  # noqa: PLR2004
+    assert not check_stats(session.connection())
+
+
+def test_check_reports_drifted_hours(session, environment, logs):
+    backfill_stats(session.connection())
+    session.execute(
+        update(AccessStatsHourly)
+        .where(AccessStatsHourly.hour == START)
+        .values(allowed=AccessStatsHourly.allowed + 1)
+    )
+
+    assert check_stats(session.connection()) == [
+        {
+            'environment_id': environment.id,
+            'hour': START,
+            'expected': {'allowed': 2, 'denied': 1},
+            'actual': {'allowed': 3, 'denied': 1},
+        }
+    ]
+
+    backfill_stats(session.connection(), START, START + timedelta(hours=1))
+
+    assert not check_stats(session.connection())
+
+
+def test_stats_by_hour_and_day(client, token, session, environment, logs):
+    backfill_stats(session.connection())
+    session.commit()
+
+    response = stats(client, token, environment.id)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'environment_id': environment.id,
+        'granularity': 'hour',
+        'items': [
+            {
+                'period': (START + timedelta(hours=hour)).isoformat(),
+                'allowed': 2,
+                'denied': 1,
+            }
+            for hour in range(4)
+        ],
+    }
+
+    response = stats(
+        client,
+        token,
+        environment.id,
+        granularity='day',
+        **{'from': '2025-03-01T23:00', 'to': '2025-03-03T00:00'},
+    )
+
+    assert response.json()['items'] == [
+        {'period': '2025-03-01T00:00:00', 'allowed': 2, 'denied': 1},
+        {'period': '2025-03-02T00:00:00', 'allowed': 4, 'denied': 2},
+    ]
+
+
+def test_stats_of_unknown_environment(client, token):
+    response = stats(client, token, 999)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'Environment not found'}
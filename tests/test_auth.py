@@ -1,5 +1,10 @@
 from http import HTTPStatus
 
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from web_backend.security import verify_password
+
 
 def test_login_for_acces_token_does_not_exist(client):
     response = client.post(
@@ -25,3 +30,25 @@ def test_login_for_access_token_incorrect_password(client, admin):
 
     assert response.status_code == HTTPStatus.BAD_REQUEST
     assert response.json() == {'detail': 'Incorrect email or password'}
+
+
+def test_login_rehashes_password_with_outdated_parameters(
+    client, session, super_admin
+):
+    old_context = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=8192),))
+    super_admin.password = old_context.hash(super_admin.clean_password)
+    session.commit()
+    old_hash = super_admin.password
+
+    response = client.post(
+        url='/auth/token',
+        data={
+            'username': super_admin.email,
+            'password': super_admin.clean_password,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    session.refresh(super_admin)
+    assert super_admin.password != old_hash
+    assert verify_password(super_admin.clean_password, super_admin.password)
@@ -0,0 +1,57 @@
+from web_backend.utils.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_hit_and_miss():
+    cache = TTLCache(maxsize=2, ttl=10)
+
+    assert cache.get('a') is None
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_ttl_cache_entries_expire():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=2, ttl=10, timer=timer)
+    cache.set('a', 1)
+
+    timer.now = 10
+
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3  # noqa: PLR2004
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_cache_pop_and_clear():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.pop('a')
+    assert cache.get('a') is None
+
+    cache.clear()
+    assert cache.get('b') is None
@@ -0,0 +1,53 @@
+from http import HTTPStatus
+
+from web_backend.database import build_engine, engine_options, pool_status
+from web_backend.settings import Settings
+
+
+def test_engine_options_follow_settings():
+    settings = Settings(
+        DB_POOL_SIZE=3,
+        DB_MAX_OVERFLOW=2,
+        DB_POOL_TIMEOUT=1.5,
+        DB_POOL_RECYCLE=600,
+        DB_POOL_PRE_PING=True,
+        DB_STATEMENT_TIMEOUT_MS=2000,
+    )
+
+    options = engine_options(settings)
+
+    assert options['pool_size'] == 3  # noqa: PLR2004
+    assert options['max_overflow'] == 2  # noqa: PLR2004
+    assert options['pool_timeout'] == 1.5  # noqa: PLR2004
+    assert options['pool_recycle'] == 600  # noqa: PLR2004
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'options': '-c statement_timeout=2000'}
+
+
+def test_engine_options_without_statement_timeout():
+    options = engine_options(Settings(DB_STATEMENT_TIMEOUT_MS=0))
+
+    assert options['connect_args'] == {}
+
+
+def test_pool_status_of_unused_engine():
+    engine = build_engine(Settings(DB_POOL_SIZE=4, DB_MAX_OVERFLOW=1))
+
+    status = pool_status(engine)
+
+    assert status['pool_size'] == 4  # noqa: PLR2004
+    assert status['max_overflow'] == 1
+    assert status['checked_out'] == 0
+    assert status['overflow'] == 0
+    assert status['checkouts'] == 0
+    assert status['avg_wait_seconds'] == 0.0
+
+
+def test_get_database_pool_status(client, token):
+    response = client.get(
+        '/metrics/database-pool',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()) == {'sync_pool', 'async_pool'}
@@ -0,0 +1,170 @@
+import re
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from web_backend.models import Device, Environment, User
+from web_backend.models.user_environment import association_table
+
+
+@pytest.fixture
+def environment(session, super_admin):
+    environment = Environment(
+        name='Auditório',
+        name_unaccent='Auditorio',
+        creator_admin_id=super_admin.id,
+    )
+    session.add(environment)
+    session.flush()
+    session.add_all(
+        User(
+            registered_by_admin_id=super_admin.id,
+            name=f'Membro {number}',
+            name_unaccent=f'Membro {number}',
+            email=f'membro{number}@example.com',
+            date_of_birth=date(2000, 1, 1),
+            cpf=f'{number:03d}.444.444-44',
+            phone_number=f'(82) 9{number:04d}-4444',
+        )
+        for number in range(50)
+    )
+    session.flush()
+    session.execute(
+        insert(association_table),
+        [
+            {'user_id': user_id, 'enviroment_id': environment.id}
+            for user_id in session.scalars(select(User.id))
+        ],
+    )
+    session.add(
+        Device(
+            serial_number='AUD-1',
+            environment_id=environment.id,
+            environment=environment,
+            creator_admin_id=super_admin.id,
+        )
+    )
+    session.commit()
+
+    return environment
+
+
+@pytest.fixture
+def statements(async_engine):
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def commits(async_engine):
+    commits = []
+
+    def record(connection):
+        commits.append(connection)
+
+    event.listen(async_engine.sync_engine, 'commit', record)
+    yield commits
+    event.remove(async_engine.sync_engine, 'commit', record)
+
+
+def assert_no_members_loaded(statements):
+    assert not [
+        statement
+        for statement in statements
+        if 'users_environments' in statement or 'FROM users' in statement
+    ]
+
+
+def test_create_environment_queries(  # noqa: PLR0913, PLR0917
+    client, token, session, environment, statements, commits
+):
+    device = session.query(Device).one()
+    response = client.post(
+        '/environments/',
+        data={'name': 'Biblioteca', 'photo': '', 'devices_ids': [device.id]},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert (
+        response.json()['devices'][0]['environment_id']
+        == (response.json()['id'])
+    )
+    assert_no_members_loaded(statements)
+    assert len(statements) == 6  # noqa: PLR2004
+    assert len(commits) == 1
+
+
+def test_update_environment_queries(  # noqa: PLR0913, PLR0917
+    client, token, session, environment, statements, commits
+):
+    device = session.query(Device).one()
+    response = client.put(
+        f'/environments/{environment.id}',
+        data={
+            'name': 'Auditório Central',
+            'photo': '',
+            'devices_ids': [device.id],
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['environment_updated']['name'] == (
+        'Auditório Central'
+    )
+    assert_no_members_loaded(statements)
+    assert len(statements) == 8  # noqa: PLR2004
+    assert len(commits) == 1
+
+
+def test_environment_devices_queries(
+    client, token, session, environment, statements
+):
+    device = session.query(Device).one()
+    response = client.get(
+        f'/environments/devices/{environment.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json() == {'environment_devices': [str(device.id)]}
+    assert_no_members_loaded(statements)
+    assert len(statements) == 3  # noqa: PLR2004
+
+
+def test_delete_environment_queries(  # noqa: PLR0913, PLR0917
+    client, token, session, environment, statements
+):
+    device = session.query(Device).one()
+    client.get(
+        f'/users_environments/1/{environment.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    statements.clear()
+
+    response = client.delete(
+        f'/environments/{environment.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not [
+        statement
+        for statement in statements
+        if re.search(r'FROM users\b', statement)
+    ]
+    assert len(statements) == 4  # noqa: PLR2004
+    session.refresh(device)
+    assert device.environment_id is None
+    response = client.get(
+        f'/users_environments/1/{environment.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.json() == {'message': 'Environment not found!'}
@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event
+
+from web_backend.models import Photo, PhotoKind
+from web_backend.routers import environment as environment_router
+from web_backend.routers import user as user_router
+
+
+@pytest.fixture
+def photos(session, user, environment):
+    session.add_all(
+        Photo(
+            kind=kind,
+            owner_id=owner_id,
+            extension='.jpg',
+            size=1024,
+            sha256='ab' * 32,
+        )
+        for kind, owner_id in (
+            (PhotoKind.users_photos, user.id),
+            (PhotoKind.environments_photos, environment.id),
+        )
+    )
+    session.commit()
+
+
+def get_all(client, token, monkeypatch, fast):
+    for router in (user_router, environment_router):
+        monkeypatch.setattr(router.settings, 'FAST_JSON_RESPONSES', fast)
+
+    responses = [
+        client.get(path, headers={'Authorization': f'Bearer {token}'})
+        for path in (
+            '/users/',
+            '/users/?count=none&size=1&page=2',
+            '/users/1',
+            '/users/999',
+            '/environments/?name=lab',
+            '/environments/1',
+        )
+    ]
+
+    return [(response.status_code, response.json()) for response in responses]
+
+
+@pytest.mark.usefixtures('photos')
+def test_fast_responses_match_validated_ones(
+    client, token, async_engine, monkeypatch
+):
+    expected = get_all(client, token, monkeypatch, fast=False)
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    assert expected[0][1]['items'][0]['photo_url']
+    # the detail endpoints list the same URLs as the listings
+    assert (
+        expected[2][1]['thumbnail_url']
+        == (expected[0][1]['items'][0]['thumbnail_url'])
+    )
+    assert (
+        expected[5][1]['thumbnail_url']
+        == (expected[4][1]['items'][0]['thumbnail_url'])
+    )
+    assert expected[5][1]['thumbnail_url'].endswith('?size=thumbnail')
+    assert expected[3][0] == HTTPStatus.NOT_FOUND
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+    try:
+        assert get_all(client, token, monkeypatch, fast=True) == expected
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+    # only the columns of the response are selected
+    assert not [
+        statement
+        for statement in statements
+        if 'registered_by_admin_id' in statement
+        or 'name_unaccent' in statement.split('FROM')[0]
+    ]
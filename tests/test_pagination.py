@@ -0,0 +1,252 @@
+import asyncio
+from base64 import b64encode
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.models import AccessLog, Environment, User
+from web_backend.utils.pagination import estimate_count
+
+
+@pytest.fixture
+def users(session, super_admin):
+    # two users per name, so pages must fall back on id to stay stable
+    users = [
+        User(
+            registered_by_admin_id=super_admin.id,
+            name=f'User {index // 2}',
+            name_unaccent=f'User {index // 2}',
+            email=f'user{index}@example.com',
+            date_of_birth=date(2000, 1, 1),
+            cpf=f'000.000.000-{index:02}',
+            phone_number=f'(82) 90000-00{index:02}',
+        )
+        for index in range(7)
+    ]
+    session.add_all(users)
+    session.commit()
+
+    return users
+
+
+def walk_cursor(client, token, url, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get(
+            url,
+            params={**params, 'size': 2, 'cursor': cursor},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        page = response.json()
+        ids += [item['id'] for item in page['items']]
+        cursor = page['next_page']
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('sort_by', ['name', 'email'])
+@pytest.mark.parametrize('sort_order', ['ascending', 'descending'])
+def test_users_cursor_visits_every_user_once_in_order(
+    client, token, users, sort_by, sort_order
+):
+    ids = walk_cursor(
+        client,
+        token,
+        '/users/cursor',
+        sort_by=sort_by,
+        sort_order=sort_order,
+    )
+
+    expected = sorted(
+        users,
+        key=lambda user: (getattr(user, sort_by), user.id),
+        reverse=sort_order == 'descending',
+    )
+    assert ids == [user.id for user in expected]
+
+
+def test_users_cursor_applies_filters(client, token, users):
+    ids = walk_cursor(
+        client, token, '/users/cursor', name='User 1', sort_order='ascending'
+    )
+
+    assert ids == [users[2].id, users[3].id]
+
+
+def test_users_cursor_rejects_invalid_cursor(client, token, users):
+    response = client.get(
+        '/users/cursor',
+        params={'cursor': 'not-a-cursor!', 'sort_order': 'ascending'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_environments_cursor(client, token, session, super_admin):
+    environments = [
+        Environment(
+            name=f'Environment {index}',
+            name_unaccent=f'Environment {index}',
+            creator_admin_id=super_admin.id,
+        )
+        for index in range(5)
+    ]
+    session.add_all(environments)
+    session.commit()
+
+    ids = walk_cursor(client, token, '/environments/cursor')
+
+    assert ids == [environment.id for environment in environments]
+
+
+def test_access_log_cursor_is_newest_first(
+    client, token, session, super_admin, users
+):
+    environment = Environment(
+        name='Lab', name_unaccent='Lab', creator_admin_id=super_admin.id
+    )
+    session.add(environment)
+    session.commit()
+
+    logs = [
+        AccessLog(
+            user_id=user.id,
+            user_name=user.name,
+            user_name_unaccent=user.name_unaccent,
+            user_email=user.email,
+            user_cpf=user.cpf,
+            user_phone_number=user.phone_number,
+            environment_id=environment.id,
+            environment_name=environment.name,
+            environment_name_unaccent=environment.name_unaccent,
+            allowed_access=True,
+        )
+        for user in users
+    ]
+    session.add_all(logs)
+    session.commit()
+
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(
+            f'/environments/logs/{environment.id}/cursor',
+            params={'size': 3, 'cursor': cursor},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        pages.append(response.json()['items'])
+        cursor = response.json()['next_page']
+        if cursor is None:
+            break
+
+    items = [item for page in pages for item in page]
+    expected = sorted(
+        logs, key=lambda log: (log.access_time, log.id), reverse=True
+    )
+    assert [item['user_id'] for item in items] == [
+        log.user_id for log in expected
+    ]
+
+
+@pytest.mark.parametrize(
+    'bookmark',
+    [
+        'garbage',
+        '>i:abc',
+        '>i:1',
+        '>s:User 0~i:1~i:3',
+        '>s:User 0~s:1',
+    ],
+)
+def test_users_cursor_rejects_cursor_of_another_ordering(
+    client, token, users, bookmark
+):
+    response = client.get(
+        '/users/cursor',
+        params={'cursor': b64encode(bookmark.encode()).decode()},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'message': 'Invalid cursor'}
+
+
+@pytest.mark.parametrize(
+    ('params', 'expected'),
+    [
+        ({}, (7, 4)),
+        ({'count': 'exact'}, (7, 4)),
+        ({'count': 'capped', 'count_cap': 3}, (3, 2)),
+        ({'count': 'capped', 'count_cap': 50}, (7, 4)),
+        ({'count': 'none'}, (None, None)),
+    ],
+)
+def test_users_count_modes(client, token, users, params, expected):
+    response = client.get(
+        '/users/',
+        params={**params, 'size': 2, 'sort_order': 'ascending'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    page = response.json()
+    assert page['count'] == params.get('count', 'exact')
+    assert (page['total'], page['pages']) == expected
+    assert [item['id'] for item in page['items']] == [
+        users[0].id,
+        users[1].id,
+    ]
+
+
+def test_users_estimated_count(client, token, session, users):
+    session.execute(text('ANALYZE users'))
+
+    response = client.get(
+        '/users/',
+        params={'count': 'estimate', 'sort_order': 'ascending'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['count'] == 'estimate'
+    assert response.json()['total'] == len(users)
+
+
+def test_estimated_count_of_in_filter(session, async_engine, users):
+    session.execute(text('ANALYZE users'))
+    session.commit()
+    query = select(User).where(User.id.in_([user.id for user in users[:3]]))
+
+    async def estimate():
+        async with AsyncSession(async_engine) as async_session:
+            return await estimate_count(async_session, query)
+
+    assert asyncio.run(estimate()) == 3  # noqa: PLR2004
+
+
+def test_filtered_count_counts_matches_only(client, token, users):
+    response = client.get(
+        '/users/',
+        params={'name': 'User 1', 'count': 'exact', 'sort_order': 'ascending'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['total'] == 2  # noqa: PLR2004
+
+
+def test_devices_without_count(client, token):
+    response = client.get(
+        '/devices/',
+        params={'count': 'none'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total'] is None
+    assert response.json()['items'] == []
@@ -0,0 +1,54 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from web_backend.utils.password import (
+    hash_password,
+    verify_and_update_password,
+)
+from web_backend.utils.process_pool import BoundedProcessPool
+
+
+def test_verify_and_update_password_keeps_current_hash():
+    hashed = hash_password('senha')
+
+    assert verify_and_update_password('senha', hashed) == (True, None)
+    assert verify_and_update_password('errada', hashed) == (False, None)
+
+
+def test_verify_and_update_password_rehashes_old_parameters():
+    old_context = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=8192),))
+    hashed = old_context.hash('senha')
+
+    valid, updated_hash = verify_and_update_password('senha', hashed)
+
+    assert valid
+    assert updated_hash is not None
+    assert verify_and_update_password('senha', updated_hash) == (True, None)
+
+
+def test_bounded_process_pool_runs_in_worker():
+    pool = BoundedProcessPool(max_workers=1, max_queue=0)
+
+    try:
+        hashed = asyncio.run(pool.run(hash_password, 'senha'))
+    finally:
+        pool.shutdown()
+
+    assert verify_and_update_password('senha', hashed) == (True, None)
+    assert pool.pending == 0
+
+
+def test_bounded_process_pool_rejects_when_saturated():
+    pool = BoundedProcessPool(max_workers=1, max_queue=1)
+    pool.pending = 2
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(pool.run(hash_password, 'senha'))
+
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert pool.stats()['rejected'] == 1
@@ -0,0 +1,354 @@
+import io
+from datetime import date
+from http import HTTPStatus
+
+from PIL import Image
+from sqlalchemy import event, func, insert, select
+
+from web_backend.models import Environment, User
+from web_backend.models.user import UserStatus
+from web_backend.models.user_environment import association_table
+from web_backend.utils import derivatives, upload_photo
+from web_backend.utils import permissions as permissions_module
+from web_backend.utils.permission_matrix import PermissionMatrix
+from web_backend.utils.permissions import permissions
+
+
+def check(client, token, user_id, environment_id):
+    return client.get(
+        f'/users_environments/{user_id}/{environment_id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def change(client, token, method, user_id, environment_id):
+    return client.request(
+        method,
+        f'/users_environments/{user_id}/{environment_id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_matrix_folds_status_into_grants():
+    matrix = PermissionMatrix()
+    matrix.load([(1, True), (2, False)], [3, 700], [(1, 3), (2, 3), (1, 700)])
+
+    assert matrix.allowed(1, 3)
+    assert matrix.allowed(1, 700)
+    assert matrix.granted(2, 3)
+    assert not matrix.allowed(2, 3)
+    assert not matrix.allowed(1, 4)
+    assert not matrix.allowed(5000, 3)
+
+    matrix.set_user(2, active=True)
+    matrix.revoke(1, 3)
+    matrix.drop_environment(700)
+
+    assert matrix.allowed(2, 3)
+    assert not matrix.allowed(1, 3)
+    assert not matrix.granted(1, 700)
+    assert not matrix.has_environment(700)
+
+
+def test_matrix_grows_past_its_capacity():
+    matrix = PermissionMatrix()
+    matrix.load([], [], [])
+
+    matrix.set_user(100_000, active=True)
+    matrix.add_environment(1_000)
+    matrix.grant(100_000, 1_000)
+    matrix.drop_user(100_000)
+    matrix.set_user(100_000, active=True)
+
+    assert matrix.has_environment(1_000)
+    assert not matrix.granted(100_000, 1_000)
+
+
+def test_matrix_replays_changes_made_while_loading():
+    matrix = PermissionMatrix()
+    matrix.apply([('grant', 1, 1)])
+    matrix.begin_load()
+    matrix.apply([('grant', 1, 2)])
+    matrix.load([(1, True)], [1, 2], [])
+
+    assert matrix.allowed(1, 2)
+    assert not matrix.allowed(1, 1)
+
+    matrix.begin_load()
+    matrix.apply([('revoke', 1, 2), ('grant', 1, 1)])
+
+    assert matrix.allowed(1, 1)
+
+    matrix.load([(1, True)], [1, 2], [(1, 2)])
+
+    assert matrix.allowed(1, 1)
+    assert not matrix.allowed(1, 2)
+
+
+def test_grants_made_through_the_api_update_the_matrix(
+    client, token, user, environment
+):
+    check(client, token, user.id, environment.id)
+    response = change(client, token, 'POST', user.id, environment.id)
+
+    assert response.status_code == HTTPStatus.OK
+    assert permissions.allowed(user.id, environment.id)
+    assert check(client, token, user.id, environment.id).json() == {
+        'user_id': user.id,
+        'environment_id': environment.id,
+        'allowed': True,
+    }
+
+    response = change(client, token, 'POST', user.id, environment.id)
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    response = change(client, token, 'DELETE', user.id, environment.id)
+
+    assert response.status_code == HTTPStatus.OK
+    assert not check(client, token, user.id, environment.id).json()['allowed']
+
+    response = change(client, token, 'DELETE', user.id, environment.id)
+    assert response.status_code == HTTPStatus.CONFLICT
+
+
+def test_conflicts_and_reloads_see_other_processes_writes(  # noqa: PLR0913, PLR0917
+    client, token, session, user, environment, monkeypatch
+):
+    check(client, token, user.id, environment.id)
+    # written as another process would, without telling the matrix
+    session.execute(
+        insert(association_table).values(
+            user_id=user.id, enviroment_id=environment.id
+        )
+    )
+    session.commit()
+
+    response = change(client, token, 'POST', user.id, environment.id)
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert not check(client, token, user.id, environment.id).json()['allowed']
+
+    monkeypatch.setattr(
+        permissions_module.settings, 'PERMISSIONS_RELOAD_SECONDS', 0
+    )
+
+    assert check(client, token, user.id, environment.id).json()['allowed']
+
+
+def test_orm_changes_update_the_matrix(
+    client, token, session, user, environment
+):
+    check(client, token, user.id, environment.id)
+    user.environments.append(environment)
+    session.commit()
+
+    assert permissions.allowed(user.id, environment.id)
+
+    user.status = UserStatus.inactive
+    session.commit()
+
+    assert not check(client, token, user.id, environment.id).json()['allowed']
+
+    session.delete(environment)
+    session.commit()
+
+    response = check(client, token, user.id, environment.id)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'Environment not found!'}
+
+
+def test_rolled_back_changes_are_discarded(
+    client, token, session, user, environment
+):
+    check(client, token, user.id, environment.id)
+    user.environments.append(environment)
+    session.flush()
+    session.rollback()
+
+    assert not permissions.granted(user.id, environment.id)
+
+
+def test_check_unknown_user(client, token, environment):
+    response = check(client, token, 999, environment.id)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'User not found!'}
+
+
+def test_created_user_is_allowed_in_their_environments(
+    client, token, environment, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(upload_photo.settings, 'UPLOADS_DIR', str(tmp_path))
+    monkeypatch.setattr(derivatives.settings, 'UPLOADS_DIR', str(tmp_path))
+    check(client, token, 1, environment.id)
+    photo = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(photo, 'PNG')
+    response = client.post(
+        '/users/',
+        data={
+            'name': 'Novo Usuário',
+            'email': 'novo@example.com',
+            'date_of_birth': '2000-01-01',
+            'cpf': '333.333.333-33',
+            'phone_number': '(82) 93333-3333',
+            'environment_ids': [environment.id],
+        },
+        files={'photo': ('novo.png', photo.getvalue(), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    user_id = response.json()['user_created']['id']
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert check(client, token, user_id, environment.id).json()['allowed']
+
+
+def change_grants(client, token, method, environment_id, selection):
+    return client.request(
+        method,
+        f'/environments/{environment_id}/grants',
+        json=selection,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_grants_by_filter_and_ids(  # noqa: PLR0913, PLR0917
+    client, token, session, super_admin, user, environment
+):
+    others = [
+        User(
+            registered_by_admin_id=super_admin.id,
+            name=f'Aluno {number}',
+            name_unaccent=f'Aluno {number}',
+            email=f'aluno{number}@example.com',
+            date_of_birth=date(2000, 1, 1),
+            cpf=f'{number:03d}.222.222-22',
+            phone_number=f'(82) 9{number:04d}-2222',
+        )
+        for number in range(3)
+    ]
+    others[2].status = UserStatus.inactive
+    session.add_all(others)
+    session.commit()
+    check(client, token, user.id, environment.id)
+
+    response = change_grants(
+        client,
+        token,
+        'POST',
+        environment.id,
+        {'filter': {'name': 'aluno', 'status': 'active'}},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'matched': 2, 'changed': 2}
+    assert permissions.allowed(others[0].id, environment.id)
+    assert not permissions.granted(others[2].id, environment.id)
+    assert not permissions.granted(user.id, environment.id)
+
+    response = change_grants(
+        client,
+        token,
+        'POST',
+        environment.id,
+        {'user_ids': [user.id, others[0].id, 999]},
+    )
+
+    assert response.json() == {'matched': 2, 'changed': 1}
+    assert check(client, token, user.id, environment.id).json()['allowed']
+
+    response = change_grants(
+        client, token, 'DELETE', environment.id, {'filter': {'name': 'aluno'}}
+    )
+
+    assert response.json() == {'matched': 3, 'changed': 2}
+    assert not permissions.granted(others[0].id, environment.id)
+    assert permissions.allowed(user.id, environment.id)
+    assert (
+        session.scalar(select(func.count()).select_from(association_table))
+        == 1
+    )
+
+
+def test_grants_need_a_known_environment_and_one_selection(
+    client, token, user, environment
+):
+    response = change_grants(
+        client, token, 'POST', 999, {'user_ids': [user.id]}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'Environment not found!'}
+
+    response = change_grants(
+        client,
+        token,
+        'DELETE',
+        environment.id,
+        {'user_ids': [user.id], 'filter': {'name': 'user'}},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_user_environments_are_updated_by_difference(  # noqa: PLR0913, PLR0917
+    client, token, session, async_engine, super_admin, user
+):
+    environments = [
+        Environment(
+            name=f'Sala {number}',
+            name_unaccent=f'Sala {number}',
+            creator_admin_id=super_admin.id,
+        )
+        for number in range(40)
+    ]
+    session.add_all(environments)
+    session.commit()
+    ids = [environment.id for environment in environments]
+    check(client, token, user.id, ids[0])
+    statements = []
+
+    def put(environment_ids):
+        statements.clear()
+        return client.put(
+            f'/users/{user.id}',
+            data={
+                'name': '',
+                'cpf': '',
+                'phone_number': '',
+                'status': '',
+                'photo': '',
+                'environment_ids': environment_ids,
+            },
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+    try:
+        response = put([*ids[:2], 999])
+        few = len(statements)
+
+        assert response.json()['environment_ids'] == ids[:2]
+        assert response.json()['invalid_environment_ids'] == [999]
+
+        response = put(ids[1:])
+
+        assert len(statements) == few
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+
+    assert sorted(response.json()['environment_ids']) == ids[1:]
+    assert not permissions.granted(user.id, ids[0])
+    assert all(permissions.allowed(user.id, env_id) for env_id in ids[1:])
+    assert (
+        sorted(
+            session.scalars(
+                select(association_table.c.enviroment_id).where(
+                    association_table.c.user_id == user.id
+                )
+            )
+        )
+        == ids[1:]
+    )
@@ -0,0 +1,330 @@
+import hashlib
+import io
+from http import HTTPStatus
+
+import pytest
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.models import Photo, PhotoKind
+from web_backend.utils import derivatives
+from web_backend.utils.sync_photos import sync_photos
+from web_backend.utils.upload_photo import settings, sniff_extension
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 64
+JPEG = b'\xff\xd8\xff\xe0' + b'1' * 64
+PNG_VERSION = hashlib.sha256(PNG).hexdigest()[:16]
+JPEG_VERSION = hashlib.sha256(JPEG).hexdigest()[:16]
+commit = AsyncSession.commit
+
+
+@pytest.fixture(autouse=True)
+def uploads_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('UPLOADS_DIR', str(tmp_path))
+    monkeypatch.setattr(settings, 'UPLOADS_DIR', str(tmp_path))
+    monkeypatch.setattr(derivatives.settings, 'UPLOADS_DIR', str(tmp_path))
+    return tmp_path
+
+
+def camera_photo(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (2000, 1000), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def derivative_sizes(photos_dir, user_id):
+    sizes = {}
+    for path in photos_dir.glob(f'{user_id}.*.*.jpg'):
+        with Image.open(path) as image:
+            sizes[path.name.split('.')[1]] = image.size
+    return sizes
+
+
+def upload(client, token, user_id, name, content):
+    return client.post(
+        f'/users/upload-image/{user_id}',
+        files={'photo': (name, content, 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_upload_registers_photo(client, token, session, user):
+    response = upload(client, token, user.id, 'me.png', PNG)
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['photo_url'] == (
+        f'http://testserver/photos/users_photos/{user.id}/{PNG_VERSION}'
+    )
+    photo = session.scalar(select(Photo).where(Photo.owner_id == user.id))
+    assert photo.kind == PhotoKind.users_photos
+    assert photo.extension == '.png'
+    assert photo.size == len(PNG)
+    assert len(photo.sha256) == 64  # noqa: PLR2004
+
+
+def test_replacing_photo_removes_previous_file(
+    client, token, session, user, uploads_dir
+):
+    upload(client, token, user.id, 'me.png', PNG)
+    upload(client, token, user.id, 'me.jpg', JPEG)
+
+    photos_dir = uploads_dir / 'users_photos'
+    assert [path.name for path in photos_dir.iterdir()] == [
+        f'{user.id}.{JPEG_VERSION}.jpg'
+    ]
+    photos = session.scalars(select(Photo)).all()
+    assert [photo.extension for photo in photos] == ['.jpg']
+
+
+def test_uncommitted_replacement_keeps_previous_photo(
+    client, token, user, uploads_dir, monkeypatch
+):
+    photo_url = upload(client, token, user.id, 'me.png', PNG).json()
+    photo_url = photo_url['photo_url']
+
+    async def fail(self):
+        raise RuntimeError
+
+    monkeypatch.setattr(AsyncSession, 'commit', fail)
+    with pytest.raises(RuntimeError):
+        upload(client, token, user.id, 'me.jpg', JPEG)
+    monkeypatch.setattr(AsyncSession, 'commit', commit)
+
+    response = client.get(photo_url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == PNG
+
+
+def test_photo_url_comes_from_registry(client, token, user, uploads_dir):
+    upload(client, token, user.id, 'me.png', PNG)
+    (uploads_dir / 'users_photos' / f'{user.id}.{PNG_VERSION}.png').unlink()
+
+    response = client.get(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.json()['photo_url'] == (
+        f'http://testserver/photos/users_photos/{user.id}/{PNG_VERSION}'
+    )
+
+
+def test_user_listing_includes_photo_urls(client, token, user):
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert not response.json()['items'][0]['photo_url']
+
+    upload(client, token, user.id, 'me.png', PNG)
+
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.json()['items'][0]['photo_url'] == (
+        f'http://testserver/photos/users_photos/{user.id}/{PNG_VERSION}'
+    )
+
+
+def test_sync_photos_indexes_files_on_disk(session, uploads_dir):
+    photos_dir = uploads_dir / 'environments_photos'
+    photos_dir.mkdir()
+    (photos_dir / '7.png').write_bytes(PNG)
+    (photos_dir / f'8.{JPEG_VERSION}.jpg').write_bytes(JPEG)
+    (photos_dir / f'8.card.{JPEG_VERSION}.jpg').write_bytes(JPEG)
+    (photos_dir / 'notes.txt').write_bytes(b'not a photo')
+
+    sync_photos(session)
+
+    photos = session.scalars(select(Photo).order_by(Photo.owner_id)).all()
+    assert [
+        (photo.kind, photo.owner_id, photo.extension, photo.size)
+        for photo in photos
+    ] == [
+        (PhotoKind.environments_photos, 7, '.png', len(PNG)),
+        (PhotoKind.environments_photos, 8, '.jpg', len(JPEG)),
+    ]
+    assert (photos_dir / f'7.{PNG_VERSION}.png').read_bytes() == PNG
+
+
+def test_extension_comes_from_content(client, token, session, user):
+    upload(client, token, user.id, 'photo.bin', JPEG)
+
+    photo = session.scalar(select(Photo).where(Photo.owner_id == user.id))
+    assert photo.file_name == f'{user.id}.{JPEG_VERSION}.jpg'
+
+
+@pytest.mark.parametrize(
+    ('head', 'extension'),
+    [
+        (PNG, '.png'),
+        (JPEG, '.jpg'),
+        (b'RIFF\x00\x00\x00\x00WEBPVP8 ', '.webp'),
+    ],
+)
+def test_sniff_extension(head, extension):
+    assert sniff_extension(head) == extension
+
+
+def test_upload_rejects_non_images(client, token, user, uploads_dir):
+    response = upload(client, token, user.id, 'me.png', b'GIF89a' + PNG)
+
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    assert list((uploads_dir / 'users_photos').iterdir()) == []
+
+
+def test_rejected_upload_keeps_previous_photo(
+    client, token, user, uploads_dir, monkeypatch
+):
+    upload(client, token, user.id, 'me.png', PNG)
+    monkeypatch.setattr(settings, 'PHOTO_MAX_BYTES', len(JPEG) - 1)
+
+    response = upload(client, token, user.id, 'me.jpg', JPEG)
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    photos_dir = uploads_dir / 'users_photos'
+    assert [path.name for path in photos_dir.iterdir()] == [
+        f'{user.id}.{PNG_VERSION}.png'
+    ]
+    assert (photos_dir / f'{user.id}.{PNG_VERSION}.png').read_bytes() == PNG
+
+
+def test_upload_generates_derivatives(client, token, user, uploads_dir):
+    upload(client, token, user.id, 'me.jpg', camera_photo())
+
+    assert derivative_sizes(uploads_dir / 'users_photos', user.id) == {
+        'recognition': (1024, 512),
+        'card': (480, 240),
+        'thumbnail': (160, 80),
+    }
+
+
+def test_missing_derivative_is_rendered_on_request(
+    client, token, user, uploads_dir
+):
+    upload(client, token, user.id, 'me.jpg', camera_photo())
+    photos_dir = uploads_dir / 'users_photos'
+    for path in photos_dir.glob(f'{user.id}.*.*.jpg'):
+        path.unlink()
+
+    response = client.get(
+        f'/photos/users_photos/{user.id}', params={'size': 'card'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'image/jpeg'
+    assert Image.open(io.BytesIO(response.content)).size == (480, 240)
+    assert list(derivative_sizes(photos_dir, user.id)) == ['card']
+
+
+def test_replacing_photo_removes_previous_derivatives(
+    client, token, session, user, uploads_dir
+):
+    upload(client, token, user.id, 'me.jpg', camera_photo('red'))
+    upload(client, token, user.id, 'me.jpg', camera_photo('blue'))
+
+    photo = session.scalar(select(Photo).where(Photo.owner_id == user.id))
+    names = {
+        path.name
+        for path in (uploads_dir / 'users_photos').glob(f'{user.id}.*.*.jpg')
+    }
+    assert names == {
+        f'{user.id}.{size}.{photo.sha256[:16]}.jpg'
+        for size in ('recognition', 'card', 'thumbnail')
+    }
+
+
+def test_photo_of_unknown_owner_is_not_found(client):
+    response = client.get('/photos/users_photos/999', params={'size': 'card'})
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'Photo not found'}
+
+
+def test_listing_includes_thumbnail_urls(client, token, user):
+    upload(client, token, user.id, 'me.jpg', camera_photo())
+
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    photo = response.json()['items'][0]
+    assert photo['thumbnail_url'] == f'{photo["photo_url"]}?size=thumbnail'
+
+
+def test_versioned_photo_is_immutable(client, token, user):
+    response = upload(client, token, user.id, 'me.png', PNG)
+    photo_url = response.json()['photo_url']
+
+    response = client.get(photo_url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == PNG
+    assert response.headers['etag'] == f'"{PNG_VERSION}-original"'
+    assert 'immutable' in response.headers['cache-control']
+
+
+@pytest.mark.parametrize(
+    'if_none_match',
+    [
+        f'"{PNG_VERSION}-original"',
+        f'W/"{PNG_VERSION}-original"',
+        f'"other", "{PNG_VERSION}-original"',
+        '*',
+    ],
+)
+def test_matching_etag_is_not_modified(
+    client, token, user, uploads_dir, if_none_match
+):
+    response = upload(client, token, user.id, 'me.png', PNG)
+    photo_url = response.json()['photo_url']
+    (uploads_dir / 'users_photos' / f'{user.id}.{PNG_VERSION}.png').unlink()
+
+    response = client.get(photo_url, headers={'If-None-Match': if_none_match})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not response.content
+    assert response.headers['etag'] == f'"{PNG_VERSION}-original"'
+
+
+def test_unversioned_photo_is_revalidated(client, token, user):
+    upload(client, token, user.id, 'me.png', PNG)
+
+    response = client.get(
+        f'/photos/users_photos/{user.id}',
+        headers={'If-None-Match': '"stale-original"'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['cache-control'] == 'no-cache'
+
+
+def test_replaced_version_redirects_to_current(client, token, user):
+    old_url = upload(client, token, user.id, 'me.png', PNG).json()
+    old_url = old_url['photo_url']
+    new_url = upload(client, token, user.id, 'me.jpg', JPEG).json()
+    new_url = new_url['photo_url']
+
+    response = client.get(f'{old_url}?size=thumbnail', follow_redirects=False)
+
+    assert new_url != old_url
+    assert response.status_code == HTTPStatus.TEMPORARY_REDIRECT
+    assert response.headers['location'] == f'{new_url}?size=thumbnail'
+
+
+def test_sync_photos_if_empty_keeps_registered_kinds(
+    client, token, session, user, uploads_dir
+):
+    upload(client, token, user.id, 'photo.png', PNG)
+    photos_dir = uploads_dir / 'environments_photos'
+    photos_dir.mkdir(exist_ok=True)
+    (photos_dir / '7.png').write_bytes(PNG)
+    (uploads_dir / 'users_photos' / '9.png').write_bytes(PNG)
+
+    sync_photos(session, if_empty=True)
+
+    photos = session.scalars(select(Photo).order_by(Photo.owner_id)).all()
+    assert [(photo.kind, photo.owner_id) for photo in photos] == [
+        (PhotoKind.users_photos, user.id),
+        (PhotoKind.environments_photos, 7),
+    ]
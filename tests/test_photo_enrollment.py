@@ -0,0 +1,198 @@
+import io
+import zipfile
+from datetime import date
+from http import HTTPStatus
+
+import numpy as np
+import pytest
+from PIL import Image
+from sqlalchemy import select
+
+from web_backend.models import FaceEmbedding, Photo, User
+from web_backend.utils import derivatives, face, photo_enrollment
+from web_backend.utils.gallery import DESCRIPTOR_SIZE
+from web_backend.utils.upload_photo import settings
+
+
+@pytest.fixture(autouse=True)
+def uploads_dir(tmp_path, monkeypatch):
+    for module_settings in (
+        settings,
+        derivatives.settings,
+        photo_enrollment.settings,
+    ):
+        monkeypatch.setattr(module_settings, 'UPLOADS_DIR', str(tmp_path))
+    face.gallery.load([], b'')
+    face.gallery.loaded = False
+    return tmp_path
+
+
+@pytest.fixture
+def other(session, user):
+    other = User(
+        registered_by_admin_id=user.registered_by_admin_id,
+        name='Other',
+        name_unaccent='Other',
+        email='other@example.com',
+        date_of_birth=date(2000, 1, 1),
+        cpf='222.222.222-22',
+        phone_number='(82) 92222-2222',
+    )
+    session.add(other)
+    session.commit()
+
+    return other
+
+
+def photo_of(color, format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 400), color).save(buffer, format)
+    return buffer.getvalue()
+
+
+def archive_of(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def enroll(client, token, content):
+    return client.post(
+        '/users/photos/bulk',
+        files={'archive': ('photos.zip', content, 'application/zip')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def poll(client, token, job_id):
+    return client.get(
+        f'/users/photos/bulk/{job_id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_enroll_photos_from_archive(  # noqa: PLR0913, PLR0917
+    client, token, session, user, other, uploads_dir
+):
+    content = archive_of({
+        f'{user.cpf}.jpg': photo_of('red'),
+        f'fotos/{other.email}.png': photo_of('blue', 'PNG'),
+        f'{user.id:04d}.jpg': photo_of('green'),
+        '999999.jpg': photo_of('white'),
+        'notes.txt': b'not a photo',
+        '__MACOSX/._notes.txt': b'',
+    })
+
+    response = enroll(client, token, content)
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json()['total'] == 5  # noqa: PLR2004
+    job = poll(client, token, response.json()['id']).json()
+    assert job['status'] == 'done'
+    assert job['processed'] == 5  # noqa: PLR2004
+    assert job['enrolled'] == 2  # noqa: PLR2004
+    files = {file['file']: file for file in job['files']}
+    assert files[f'{user.cpf}.jpg']['user_id'] == user.id
+    assert files[f'fotos/{other.email}.png']['status'] == 'enrolled'
+    assert files[f'{user.id:04d}.jpg']['status'] == 'duplicate'
+    assert files['999999.jpg']['status'] == 'unmatched'
+    assert files['notes.txt']['status'] == 'unmatched'
+    assert files[f'{user.cpf}.jpg']['face_indexed'] is None
+
+    photos = session.scalars(select(Photo).order_by(Photo.owner_id)).all()
+    assert [(photo.owner_id, photo.extension) for photo in photos] == [
+        (user.id, '.jpg'),
+        (other.id, '.png'),
+    ]
+    photos_dir = uploads_dir / 'users_photos'
+    assert sorted(path.name for path in photos_dir.glob(f'{user.id}.*')) == [
+        f'{user.id}.{photos[0].version}.jpg',
+        f'{user.id}.card.{photos[0].version}.jpg',
+        f'{user.id}.recognition.{photos[0].version}.jpg',
+        f'{user.id}.thumbnail.{photos[0].version}.jpg',
+    ]
+
+
+def test_enrollment_replaces_photos_and_reports_invalid_ones(  # noqa: PLR0913, PLR0917
+    client, token, session, user, other, uploads_dir
+):
+    enroll(client, token, archive_of({f'{user.id}.jpg': photo_of('red')}))
+
+    response = enroll(
+        client,
+        token,
+        archive_of({
+            f'{user.id}.png': photo_of('blue', 'PNG'),
+            f'{other.id}.jpg': b'\xff\xd8\xff' + b'0' * 64,
+        }),
+    )
+    files = poll(client, token, response.json()['id']).json()['files']
+
+    assert [file['status'] for file in files] == ['enrolled', 'invalid']
+    assert files[1]['detail'] == 'Photo cannot be decoded'
+    photos_dir = uploads_dir / 'users_photos'
+    assert not list(photos_dir.glob(f'{other.id}*'))
+    photo = session.scalar(select(Photo).where(Photo.owner_id == user.id))
+    assert photo.extension == '.png'
+    assert sorted(path.name for path in photos_dir.glob(f'{user.id}.*')) == [
+        f'{user.id}.{photo.version}.png',
+        f'{user.id}.card.{photo.version}.jpg',
+        f'{user.id}.recognition.{photo.version}.jpg',
+        f'{user.id}.thumbnail.{photo.version}.jpg',
+    ]
+
+
+def test_enrollment_indexes_faces(client, token, session, user, monkeypatch):
+    async def extract_descriptor(image):
+        descriptor = np.zeros(DESCRIPTOR_SIZE, np.float32)
+        descriptor[0] = 1
+        return descriptor
+
+    monkeypatch.setattr(
+        photo_enrollment, 'face_recognition_available', lambda: True
+    )
+    monkeypatch.setattr(
+        photo_enrollment, 'extract_descriptor', extract_descriptor
+    )
+
+    response = enroll(
+        client, token, archive_of({f'{user.email}.jpg': photo_of('red')})
+    )
+    job = poll(client, token, response.json()['id']).json()
+
+    assert job['files'][0]['face_indexed'] is True
+    assert user.id in face.gallery
+    embedding = session.scalar(
+        select(FaceEmbedding).where(FaceEmbedding.user_id == user.id)
+    )
+    assert (
+        embedding.photo_version
+        == session.scalar(
+            select(Photo).where(Photo.owner_id == user.id)
+        ).version
+    )
+
+
+def test_enrollment_rejects_other_archives(client, token, monkeypatch):
+    response = enroll(client, token, b'not a zip')
+
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    assert response.json() == {
+        'message': 'Photos must be sent in a ZIP archive'
+    }
+
+    monkeypatch.setattr(
+        photo_enrollment.settings, 'PHOTO_ENROLLMENT_MAX_BYTES', 10
+    )
+    response = enroll(client, token, archive_of({'1.jpg': photo_of('red')}))
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+def test_unknown_job_is_not_found(client, token):
+    response = poll(client, token, 'missing')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'message': 'Job not found!'}
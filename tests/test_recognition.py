@@ -0,0 +1,199 @@
+import io
+from datetime import date
+from http import HTTPStatus
+
+import numpy as np
+import pytest
+from PIL import Image
+from sqlalchemy import select
+
+from web_backend.models import FaceEmbedding, User
+from web_backend.routers import recognition
+from web_backend.utils import derivatives, face
+from web_backend.utils.gallery import DESCRIPTOR_SIZE, FaceGallery
+from web_backend.utils.upload_photo import settings
+
+
+@pytest.fixture(autouse=True)
+def empty_gallery(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'UPLOADS_DIR', str(tmp_path))
+    monkeypatch.setattr(derivatives.settings, 'UPLOADS_DIR', str(tmp_path))
+    face.gallery.load([], b'')
+    face.gallery.loaded = False
+
+
+@pytest.fixture
+def fake_recognition(monkeypatch):
+    # the descriptor of a solid-color photo is its normalized color
+    async def extract_descriptor(image):
+        source = io.BytesIO(image) if isinstance(image, bytes) else image
+        with Image.open(source) as photo:
+            color = photo.convert('RGB').getpixel((0, 0))
+        descriptor = np.zeros(DESCRIPTOR_SIZE, np.float32)
+        descriptor[:3] = np.array(color) / 255
+        return descriptor
+
+    monkeypatch.setattr(face, 'face_recognition_available', lambda: True)
+    monkeypatch.setattr(face, 'extract_descriptor', extract_descriptor)
+    monkeypatch.setattr(recognition, 'extract_descriptor', extract_descriptor)
+
+
+def photo_of(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def descriptor(*values):
+    vector = np.zeros(DESCRIPTOR_SIZE, np.float32)
+    vector[: len(values)] = values
+    return vector
+
+
+def enroll(client, token, user_id, color):
+    return client.post(
+        f'/users/upload-image/{user_id}',
+        files={'photo': ('me.png', photo_of(color), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def identify(client, token, color, **params):
+    return client.post(
+        '/recognition/identify',
+        params=params,
+        files={'photo': ('probe.png', photo_of(color), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_gallery_search_orders_by_distance():
+    gallery = FaceGallery()
+    gallery.add(1, descriptor(1.0))
+    gallery.add(2, descriptor(0.0, 0.5))
+    gallery.add(3, descriptor(0.1))
+
+    matches = gallery.search(descriptor(0.2), limit=2)
+
+    assert [user_id for user_id, _ in matches] == [3, 2]
+    assert matches[0][1] == pytest.approx(0.1)
+
+
+def test_gallery_replaces_and_removes_users():
+    gallery = FaceGallery()
+    for user_id in range(1, 2000):
+        gallery.add(user_id, descriptor(user_id))
+
+    gallery.add(5, descriptor(-1.0))
+    gallery.remove(1)
+
+    assert len(gallery) == 1998  # noqa: PLR2004
+    assert 1 not in gallery
+    assert gallery.search(descriptor(-1.0)) == [(5, 0.0)]
+    assert gallery.search(descriptor(1999.0))[0][0] == 1999  # noqa: PLR2004
+
+
+def test_gallery_loads_from_bytes():
+    gallery = FaceGallery()
+    gallery.load([7, 8], descriptor(1.0).tobytes() + descriptor(2.0).tobytes())
+    gallery.add(7, descriptor(3.0))
+
+    assert gallery.search(descriptor(3.0), limit=5) == [(7, 0.0), (8, 1.0)]
+
+
+def test_identify_without_dlib_is_unavailable(client, token):
+    response = identify(client, token, 'red')
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.json() == {'message': 'Face recognition is not available'}
+
+
+@pytest.mark.usefixtures('fake_recognition')
+def test_upload_enrolls_face_and_identify_finds_it(
+    client, token, session, user
+):
+    other = User(
+        registered_by_admin_id=user.registered_by_admin_id,
+        name='Other',
+        name_unaccent='Other',
+        email='other@example.com',
+        date_of_birth=date(2000, 1, 1),
+        cpf='222.222.222-22',
+        phone_number='(82) 92222-2222',
+    )
+    session.add(other)
+    session.commit()
+
+    enroll(client, token, user.id, 'red')
+    enroll(client, token, other.id, 'blue')
+    face.gallery.loaded = False
+
+    response = identify(client, token, 'red', limit=2)
+
+    assert response.status_code == HTTPStatus.OK
+    assert [match['user_id'] for match in response.json()['matches']] == [
+        user.id
+    ]
+    embedding = session.scalar(
+        select(FaceEmbedding).where(FaceEmbedding.user_id == user.id)
+    )
+    assert len(embedding.descriptor) == DESCRIPTOR_SIZE * 4
+
+
+@pytest.mark.usefixtures('fake_recognition')
+def test_deleted_user_leaves_gallery(client, token, user):
+    enroll(client, token, user.id, 'red')
+    assert user.id in face.gallery
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert user.id not in face.gallery
+    assert not identify(client, token, 'red').json()['matches']
+
+
+@pytest.mark.usefixtures('fake_recognition')
+def test_identify_confirms_matches_made_stale_by_other_processes(
+    client, token, session, user
+):
+    enroll(client, token, user.id, 'red')
+    # another process re-enrolls the user with another face
+    embedding = session.scalar(
+        select(FaceEmbedding).where(FaceEmbedding.user_id == user.id)
+    )
+    embedding.descriptor = descriptor(0.0, 0.0, 1.0).tobytes()
+    session.commit()
+
+    assert not identify(client, token, 'red').json()['matches']
+    assert identify(client, token, 'blue').json()['matches']
+
+    # and then deletes it
+    session.delete(embedding)
+    session.commit()
+
+    assert not identify(client, token, 'blue').json()['matches']
+    assert user.id not in face.gallery
+
+
+@pytest.mark.usefixtures('fake_recognition')
+def test_gallery_reloads_enrollments_of_other_processes(
+    client, token, session, user, monkeypatch
+):
+    assert not identify(client, token, 'red').json()['matches']
+    session.add(
+        FaceEmbedding(
+            user_id=user.id,
+            photo_version='0' * 16,
+            descriptor=descriptor(1.0).tobytes(),
+        )
+    )
+    session.commit()
+
+    assert not identify(client, token, 'red').json()['matches']
+
+    monkeypatch.setattr(face.settings, 'FACE_GALLERY_RELOAD_SECONDS', 0)
+
+    assert identify(client, token, 'red').json()['matches'][0]['user_id'] == (
+        user.id
+    )
@@ -0,0 +1,128 @@
+import json
+from http import HTTPStatus
+
+from sqlalchemy import select
+
+from web_backend.models import User
+from web_backend.models.user import UserStatus
+from web_backend.utils import user_import
+from web_backend.utils.permissions import permissions
+
+HEADER = 'name,email,date_of_birth,cpf,phone_number\n'
+
+
+def import_file(client, token, filename, content, content_type='text/csv'):
+    return client.post(
+        '/users/bulk',
+        files={'file': (filename, content.encode(), content_type)},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+
+def test_import_csv_creates_users(client, token, session, super_admin):
+    # loads the permission matrix, which must then learn of the new users
+    client.get(
+        '/users_environments/0/0', headers={'Authorization': f'Bearer {token}'}
+    )
+    content = HEADER + (
+        'Ana Júlia,ana@example.com,2000-01-01,222.222.222-22,(82) 92222-2222\n'
+        'Bruno,bruno@example.com,1999-05-10,333.333.333-33,(82) 93333-3333\n'
+    )
+
+    response = import_file(client, token, 'users.csv', content)
+    users = session.scalars(select(User).order_by(User.id)).all()
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'created': 2,
+        'invalid': 0,
+        'conflicts': 0,
+        'rows': [
+            {
+                'row': number,
+                'status': 'created',
+                'user_id': user.id,
+                'detail': None,
+            }
+            for number, user in enumerate(users, start=1)
+        ],
+    }
+    assert [user.name_unaccent for user in users] == ['Ana Julia', 'Bruno']
+    assert {user.registered_by_admin_id for user in users} == {super_admin.id}
+    assert {user.status for user in users} == {UserStatus.active}
+    assert all(permissions.has_user(user.id) for user in users)
+
+
+def test_import_reports_invalid_and_conflicting_rows(client, token, user):
+    content = HEADER + (
+        # taken by `user`
+        f'Outro,{user.email},2000-01-01,222.222.222-22,(82) 92222-2222\n'
+        'Carla,carla@example.com,2000-01-01,444.444.444-44,(82) 94444-4444\n'
+        # bad CPF, then bad date
+        'Davi,davi@example.com,2000-01-01,44444444444,(82) 95555-5555\n'
+        'Eva,eva@example.com,ontem,666.666.666-66,(82) 96666-6666\n'
+        # repeat the CPF, then the email, of row 2
+        'Fábio,fabio@example.com,2000-01-01,444.444.444-44,(82) 97777-7777\n'
+        'Gil,carla@example.com,2000-01-01,555.555.555-55,(82) 98888-8888\n'
+    )
+
+    response = import_file(client, token, 'users.csv', content)
+    rows = response.json()['rows']
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['created'] == 1
+    assert response.json()['invalid'] == 2  # noqa: PLR2004
+    assert response.json()['conflicts'] == 3  # noqa: PLR2004
+    assert [row['status'] for row in rows] == [
+        'conflict',
+        'created',
+        'invalid',
+        'invalid',
+        'conflict',
+        'conflict',
+    ]
+    assert rows[0]['detail'] == 'Email already in use!'
+    assert rows[2]['detail'].startswith('cpf: ')
+    assert rows[3]['detail'].startswith('date_of_birth: ')
+    assert rows[4]['detail'] == 'CPF repeats row 2'
+    assert rows[5]['detail'] == 'Email repeats row 2'
+    assert rows[5]['user_id'] is None
+
+
+def test_import_ndjson(client, token, session):
+    line = json.dumps({
+        'name': 'Gabi',
+        'email': 'gabi@example.com',
+        'date_of_birth': '2001-02-03',
+        'cpf': '888.888.888-88',
+        'phone_number': '(82) 98888-8888',
+    })
+    content = f'{line}\n\nnot json\n[1, 2]\n'
+
+    response = import_file(
+        client, token, 'users.ndjson', content, 'application/octet-stream'
+    )
+    rows = response.json()['rows']
+
+    assert response.status_code == HTTPStatus.OK
+    assert [row['status'] for row in rows] == ['created', 'invalid', 'invalid']
+    assert rows[1]['detail'].startswith('Invalid JSON')
+    assert session.scalar(
+        select(User.name).where(User.id == rows[0]['user_id'])
+    )
+
+
+def test_import_rejects_unknown_and_oversized_files(
+    client, token, monkeypatch
+):
+    response = import_file(client, token, 'users.xlsx', HEADER, 'x/y')
+
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    assert response.json() == {
+        'message': 'Users must be sent as CSV or NDJSON'
+    }
+
+    monkeypatch.setattr(user_import.settings, 'USER_IMPORT_MAX_BYTES', 10)
+    response = import_file(client, token, 'users.csv', HEADER)
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
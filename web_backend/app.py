@@ -1,5 +1,9 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from http import HTTPStatus
+from pathlib import Path
 
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,28 +12,66 @@ from fastapi.staticfiles import StaticFiles
 from fastapi_pagination import add_pagination
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from web_backend.database import async_engine
+from web_backend.models import PhotoKind
 from web_backend.routers import (
+    access_log,
     admin,
     auth,
     device,
     environment,
     environment_user,
+    metrics,
+    photo,
+    recognition,
     user,
 )
 from web_backend.schemas import ExistingUser, Message
+from web_backend.security import password_pool
+from web_backend.settings import Settings
+from web_backend.utils.access_log_partitions import (
+    maintain_partitions_periodically,
+)
+from web_backend.utils.access_log_writer import access_log_writer
+from web_backend.utils.derivatives import derivative_pool
+from web_backend.utils.face import face_pool
+
+settings = Settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREAD_LIMITER_TOKENS
+    maintenance = None
+    if settings.ACCESS_LOG_MAINTENANCE_INTERVAL_SECONDS:
+        maintenance = asyncio.create_task(
+            maintain_partitions_periodically(
+                async_engine, settings.ACCESS_LOG_MAINTENANCE_INTERVAL_SECONDS
+            )
+        )
+    yield
+    if maintenance is not None:
+        maintenance.cancel()
+        with suppress(asyncio.CancelledError):
+            await maintenance
+    await access_log_writer.close()
+    password_pool.shutdown()
+    derivative_pool.shutdown()
+    face_pool.shutdown()
+    await async_engine.dispose()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 add_pagination(app)
-app.mount(
-    '/environments_photos',
-    StaticFiles(directory='uploads/environments_photos'),
-    name='environments_photos',
-)
-app.mount(
-    '/users_photos',
-    StaticFiles(directory='uploads/users_photos'),
-    name='users_photos',
-)
+for kind in PhotoKind:
+    photos_dir = Path(settings.UPLOADS_DIR) / kind.value
+    photos_dir.mkdir(parents=True, exist_ok=True)
+    app.mount(
+        f'/{kind.value}',
+        StaticFiles(directory=photos_dir),
+        name=kind.value,
+    )
 
 origins = [
     'http://localhost:3000',
@@ -49,6 +91,10 @@ app.include_router(admin.router)
 app.include_router(environment.router)
 app.include_router(environment_user.router)
 app.include_router(device.router)
+app.include_router(metrics.router)
+app.include_router(photo.router)
+app.include_router(recognition.router)
+app.include_router(access_log.router)
 
 
 @app.exception_handler(StarletteHTTPException)
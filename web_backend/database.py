@@ -1,11 +1,130 @@
-from sqlalchemy import create_engine
+import time
+from threading import Lock
+
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from web_backend.settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL)
+
+class _CheckoutTimingMixin:
+    """
+    Record how long callers wait in `_do_get` for a pooled connection,
+    which includes opening a new one when the pool has room to grow.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(settings: Settings) -> dict:
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args['options'] = (
+            f'-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}'
+        )
+
+    return {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'connect_args': connect_args,
+    }
+
+
+def build_engine(settings: Settings | None = None) -> Engine:
+    settings = settings or Settings()
+    return create_engine(
+        settings.DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        **engine_options(settings),
+    )
+
+
+def build_async_engine(settings: Settings | None = None) -> AsyncEngine:
+    settings = settings or Settings()
+    return create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=InstrumentedAsyncQueuePool,
+        **engine_options(settings),
+    )
+
+
+def pool_status(engine: Engine | AsyncEngine) -> dict:
+    pool = engine.pool
+    status = {
+        'pool_size': pool.size(),
+        'max_overflow': getattr(pool, '_max_overflow', 0),
+        'checked_out': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+    }
+    if isinstance(pool, _CheckoutTimingMixin):
+        status.update(
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            total_wait_seconds=pool.total_wait_seconds,
+            avg_wait_seconds=(
+                pool.total_wait_seconds / pool.checkouts
+                if pool.checkouts
+                else 0.0
+            ),
+            max_wait_seconds=pool.max_wait_seconds,
+        )
+    return status
+
+
+engine = build_engine()
+async_engine = build_async_engine()
+async_session_maker = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
 def get_session():  # pragma: no cover
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():  # pragma: no cover
+    async with async_session_maker() as session:
+        yield session
@@ -1,8 +1,11 @@
 from .access_log import AccessLog
+from .access_stats import AccessStatsHourly
 from .admin import Admin
 from .base import table_registry
 from .device import Device
 from .environment import Environment
+from .face_embedding import FaceEmbedding
+from .photo import Photo, PhotoKind
 from .user import User
 
 __all__ = [
@@ -12,4 +15,8 @@ __all__ = [
     'User',
     'Device',
     'AccessLog',
+    'AccessStatsHourly',
+    'Photo',
+    'PhotoKind',
+    'FaceEmbedding',
 ]
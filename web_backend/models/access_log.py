@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import ForeignKey, Index, func
+from sqlalchemy import DDL, ForeignKey, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import table_registry
@@ -27,8 +27,9 @@ class AccessLog:
     environment_name: Mapped[str] = mapped_column(init=True)
     environment_name_unaccent: Mapped[str] = mapped_column(init=True)
 
+    # part of the key because the table is partitioned by it
     access_time: Mapped[datetime] = mapped_column(
-        init=False, server_default=func.now()
+        init=False, primary_key=True, server_default=func.now()
     )
     allowed_access: Mapped[bool] = mapped_column(init=True, nullable=False)
 
@@ -45,4 +46,26 @@ class AccessLog:
             postgresql_using='gin',
             postgresql_ops={'environment_name_unaccent': 'gin_trgm_ops'},
         ),
+        Index(
+            'idx_access_log_environment_id_access_time_id',
+            'environment_id',
+            'access_time',
+            'id',
+        ),
+        Index(
+            'idx_access_log_user_id_access_time_id',
+            'user_id',
+            'access_time',
+            'id',
+        ),
+        {'postgresql_partition_by': 'RANGE (access_time)'},
     )
+
+
+# Monthly partitions are managed by `utils/access_log_partitions.py`;
+# rows outside all of them land here instead of failing
+event.listen(
+    AccessLog.__table__,
+    'after_create',
+    DDL('CREATE TABLE access_log_default PARTITION OF access_log DEFAULT'),
+)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import table_registry
+
+
+@table_registry.mapped_as_dataclass
+class AccessStatsHourly:
+    """
+    Allowed and denied accesses per environment and hour, kept up to date
+    with `access_log` by `utils/access_stats.py`.
+    """
+
+    __tablename__ = 'access_stats_hourly'
+
+    environment_id: Mapped[int] = mapped_column(
+        ForeignKey('environments.id', ondelete='CASCADE'), primary_key=True
+    )
+    # start of the hour, in the same time zone as `access_log.access_time`
+    hour: Mapped[datetime] = mapped_column(primary_key=True)
+    allowed: Mapped[int] = mapped_column(default=0)
+    denied: Mapped[int] = mapped_column(default=0)
@@ -17,3 +17,8 @@ class Admin:
     name: Mapped[str] = mapped_column()
     phone_number: Mapped[str] = mapped_column(unique=True)
     super_admin: Mapped[bool] = mapped_column()
+    # bumped when the password changes, revoking the tokens issued before;
+    # rehashing the same password keeps it
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
@@ -21,7 +21,7 @@ class Device:
         ForeignKey('environments.id')
     )
     environment: Mapped['Environment'] = relationship(  # noqa: F821  # type: ignore
-        back_populates='devices', single_parent=True
+        back_populates='devices', single_parent=True, lazy='raise'
     )
     creator_admin_id: Mapped[int] = mapped_column(ForeignKey('admins.id'))
 
@@ -22,14 +22,25 @@ class Environment:
         init=False, server_default=func.now(), onupdate=func.now()
     )
     creator_admin_id: Mapped[int] = mapped_column(ForeignKey('admins.id'))
+    # an environment may have tens of thousands of users: both collections
+    # must be loaded on purpose, or queried directly
     users: Mapped[Optional[list['User']]] = relationship(  # noqa: F821  # type: ignore
-        secondary=association_table, back_populates='environments', init=False
+        secondary=association_table,
+        back_populates='environments',
+        init=False,
+        lazy='raise',
     )
     devices: Mapped[Optional[list['Device']]] = relationship(  # noqa: F821  # type: ignore
-        back_populates='environment', init=False
+        back_populates='environment', init=False, lazy='raise'
     )
     last_accessed_by_user_id: Mapped[Optional[int]] = mapped_column(
-        ForeignKey('users.id'), init=False, nullable=True
+        ForeignKey(
+            'users.id',
+            use_alter=True,
+            name='environments_last_accessed_by_user_id_fkey',
+        ),
+        init=False,
+        nullable=True,
     )
     last_accessed_by_user_name: Mapped[Optional[str]] = mapped_column(
         init=False,
@@ -46,22 +57,5 @@ class Environment:
             postgresql_using='gin',
             postgresql_ops={'name_unaccent': 'gin_trgm_ops'},
         ),
+        Index('idx_environments_name_id', 'name', 'id'),
     )
-
-    def as_dict(self) -> dict:
-        return {
-            'id': self.id,
-            'name': self.name,
-            'name_unaccent': self.name_unaccent,
-            'created_at': (
-                self.created_at.isoformat() if self.created_at else None
-            ),
-            'updated_at': (
-                self.updated_at.isoformat() if self.updated_at else None
-            ),
-            'creator_admin_id': self.creator_admin_id,
-            'users': ([user.id for user in self.users] if self.users else []),
-            'devices': (
-                [device.id for device in self.devices] if self.devices else []
-            ),
-        }
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, LargeBinary, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import table_registry
+
+
+@table_registry.mapped_as_dataclass
+class FaceEmbedding:
+    __tablename__ = 'face_embeddings'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    # version of the photo the descriptor was computed from
+    photo_version: Mapped[str] = mapped_column()
+    # 128 float32 values, in native byte order
+    descriptor: Mapped[bytes] = mapped_column(LargeBinary)
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,44 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import Enum, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import table_registry
+
+
+class PhotoKind(str, enum.Enum):
+    users_photos = 'users_photos'
+    environments_photos = 'environments_photos'
+
+
+@table_registry.mapped_as_dataclass
+class Photo:
+    __tablename__ = 'photos'
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    kind: Mapped[PhotoKind] = mapped_column(
+        Enum(
+            PhotoKind,
+            values_callable=lambda enum_class: [
+                kind.value for kind in enum_class
+            ],
+        )
+    )
+    owner_id: Mapped[int] = mapped_column()
+    extension: Mapped[str] = mapped_column()
+    size: Mapped[int] = mapped_column()
+    sha256: Mapped[str] = mapped_column()
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (UniqueConstraint('kind', 'owner_id'),)
+
+    @property
+    def file_name(self) -> str:
+        return f'{self.owner_id}.{self.version}{self.extension}'
+
+    @property
+    def version(self) -> str:
+        return self.sha256[:16]
@@ -65,4 +65,6 @@ class User:
             postgresql_using='gin',
             postgresql_ops={'name_unaccent': 'gin_trgm_ops'},
         ),
+        Index('idx_users_name_id', 'name', 'id'),
+        Index('idx_users_email_id', 'email', 'id'),
     )
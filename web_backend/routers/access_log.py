@@ -0,0 +1,54 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.database import get_async_session
+from web_backend.schemas import AccessLogExportFilter
+from web_backend.security import get_current_admin
+from web_backend.settings import Settings
+from web_backend.utils.access_log_export import MEDIA_TYPES, stream_export
+
+settings = Settings()
+
+router = APIRouter(prefix='/access-logs', tags=['access-logs'])
+
+
+@router.get(
+    path='/export',
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            'content': {media_type: {} for media_type in MEDIA_TYPES.values()},
+            'description': 'The matching rows, oldest first',
+        }
+    },
+    dependencies=[Depends(get_current_admin)],
+)
+async def export_access_logs(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[AccessLogExportFilter, Query()],
+) -> StreamingResponse:
+    compress = 'gzip' in request.headers.get('accept-encoding', '')
+    headers = {
+        'Content-Disposition': (
+            f'attachment; filename="access_logs.{filters.format.value}"'
+        ),
+        'Vary': 'Accept-Encoding',
+    }
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+
+    return StreamingResponse(
+        stream_export(
+            session.bind,
+            filters,
+            settings.ACCESS_LOG_EXPORT_BATCH_SIZE,
+            compress,
+        ),
+        media_type=MEDIA_TYPES[filters.format],
+        headers=headers,
+    )
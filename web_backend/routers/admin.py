@@ -3,9 +3,9 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from web_backend.database import get_session
+from web_backend.database import get_async_session
 from web_backend.models import Admin
 from web_backend.schemas import (
     AdminProfile,
@@ -15,7 +15,11 @@ from web_backend.schemas import (
     HTTPExceptionResponse,
     Message,
 )
-from web_backend.security import get_current_admin, get_password_hash
+from web_backend.security import (
+    AdminPrincipal,
+    get_current_admin,
+    get_password_hash_async,
+)
 
 router = APIRouter(prefix='/admins', tags=['admins'])
 
@@ -23,17 +27,17 @@ router = APIRouter(prefix='/admins', tags=['admins'])
 @router.post(
     path='/', status_code=HTTPStatus.CREATED, response_model=AdminPublic
 )
-def create_admin(
+async def create_admin(
     admin: AdminSchema,
-    session: Annotated[Session, Depends(get_session)],
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
 ) -> Message:
     if not current_admin.super_admin:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough perission'
         )
 
-    admin_db = session.scalar(
+    admin_db = await session.scalar(
         select(Admin).where((Admin.email == admin.email))
     )
 
@@ -44,13 +48,13 @@ def create_admin(
 
     admin_db = Admin(
         email=admin.email,
-        password=get_password_hash(admin.password),
+        password=await get_password_hash_async(admin.password),
         super_admin=admin.super_admin,
     )
 
     session.add(admin_db)
-    session.commit()
-    session.refresh(admin_db)
+    await session.commit()
+    await session.refresh(admin_db)
 
     return admin_db
 
@@ -61,15 +65,15 @@ def create_admin(
     response_model=Admins,
     responses={HTTPStatus.FORBIDDEN: {'model': HTTPExceptionResponse}},
 )
-def get_admins(
-    session: Annotated[Session, Depends(get_session)],
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
+async def get_admins(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
 ) -> Admins:
     if not current_admin.super_admin:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
-    admins = session.scalars(select(Admin)).all()
+    admins = (await session.scalars(select(Admin))).all()
     return {'admins': admins}
 
 
@@ -79,25 +83,25 @@ def get_admins(
     response_model=Message,
     responses={HTTPStatus.FORBIDDEN: {'model': HTTPExceptionResponse}},
 )
-def delete_admin(
+async def delete_admin(
     admin_id: int,
-    session: Annotated[Session, Depends(get_session)],
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
 ) -> Message:
     if not current_admin.super_admin:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
 
-    admin_db = session.scalar(select(Admin).where(Admin.id == admin_id))
+    admin_db = await session.scalar(select(Admin).where(Admin.id == admin_id))
 
-    if not admin_id:
+    if not admin_db:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Admin not found'
         )
 
-    session.delete(admin_db)
-    session.commit()
+    await session.delete(admin_db)
+    await session.commit()
 
     return {'message': 'Admin deleted successfully'}
 
@@ -107,5 +111,17 @@ def delete_admin(
     status_code=HTTPStatus.OK,
     response_model=AdminProfile,
 )
-def get_admin_profile(current_admin: Admin = Depends(get_current_admin)):
-    return current_admin
+async def get_admin_profile(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
+):
+    admin_db = await session.scalar(
+        select(Admin).where(Admin.id == current_admin.id)
+    )
+
+    if not admin_db:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Admin not found'
+        )
+
+    return admin_db
@@ -3,15 +3,18 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from web_backend.database import get_session
+from web_backend.database import get_async_session
 from web_backend.models import Admin
 from web_backend.schemas import (
     Token,
 )
-from web_backend.security import create_access_token, verify_password
+from web_backend.security import (
+    create_access_token,
+    verify_password_async,
+)
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
@@ -20,11 +23,11 @@ router = APIRouter(prefix='/auth', tags=['auth'])
     '/token',
     response_model=Token,
 )
-def login_for_admin_token(
-    session: Annotated[Session, Depends(get_session)],
+async def login_for_admin_token(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ):
-    admin = session.scalar(
+    admin = await session.scalar(
         select(Admin).where(Admin.email == form_data.username)
     )
 
@@ -34,12 +37,27 @@ def login_for_admin_token(
             detail='Incorrect email or password',
         )
 
-    if not verify_password(form_data.password, admin.password):
+    valid, updated_hash = await verify_password_async(
+        form_data.password, admin.password
+    )
+
+    if not valid:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': admin.email})
+    if updated_hash:
+        # the same password, so the admin's other tokens stay valid
+        await session.execute(
+            update(Admin)
+            .where(Admin.id == admin.id)
+            .values(password=updated_hash)
+        )
+        await session.commit()
+
+    access_token = create_access_token(
+        data={'sub': admin.email, 'ver': admin.token_version}
+    )
 
     return {'access_token': access_token, 'token_type': 'Bearer'}
@@ -3,15 +3,21 @@ from typing import Annotated, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
 from sqlalchemy import select
-from sqlalchemy.orm import Session
-
-from web_backend.database import get_session
-from web_backend.models import Admin, Device, Environment
-from web_backend.schemas import DeviceSchema, Message
-from web_backend.security import get_current_admin
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.database import get_async_session
+from web_backend.models import Device, Environment
+from web_backend.schemas import (
+    AccessDecision,
+    AccessRequest,
+    CountPage,
+    DeviceSchema,
+    Message,
+)
+from web_backend.security import AdminPrincipal, get_current_admin
+from web_backend.utils.access import check_access
+from web_backend.utils.pagination import paginate_counted
 
 router = APIRouter(prefix='/devices', tags=['devices'])
 
@@ -22,15 +28,15 @@ router = APIRouter(prefix='/devices', tags=['devices'])
     responses={HTTPStatus.NOT_FOUND: {'model': Message}},
     response_model=DeviceSchema,
 )
-def create_device(
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
-    session: Annotated[Session, Depends(get_session)],
+async def create_device(
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     serial_number: str,
     environment_id: int | None = None,
 ) -> DeviceSchema:
     environment = None
     if environment_id:
-        environment = session.scalar(
+        environment = await session.scalar(
             select(Environment).where(Environment.id == environment_id)
         )
 
@@ -40,7 +46,7 @@ def create_device(
                 detail='Environment not found',
             )
 
-    device = session.scalar(
+    device = await session.scalar(
         select(Device).where(Device.serial_number == serial_number)
     )
 
@@ -58,8 +64,8 @@ def create_device(
     )
 
     session.add(device)
-    session.commit()
-    session.refresh(device)
+    await session.commit()
+    await session.refresh(device)
 
     return device
 
@@ -67,21 +73,21 @@ def create_device(
 @router.get(
     path='/',
     status_code=HTTPStatus.OK,
-    response_model=Page[DeviceSchema],
+    response_model=CountPage[DeviceSchema],
     dependencies=[Depends(get_current_admin)],
 )
-def get_devices(
-    session: Annotated[Session, Depends(get_session)],
+async def get_devices(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     serial_number: Optional[str] = Query(
         None, description='Filter by serial number'
     ),
-) -> Page[DeviceSchema]:
+) -> CountPage[DeviceSchema]:
     query = select(Device)
 
     if serial_number:
         query = query.where(Device.serial_number.like(f'%{serial_number}%'))
 
-    return paginate(session, query)
+    return await paginate_counted(session, query)
 
 
 @router.delete(
@@ -90,19 +96,19 @@ def get_devices(
     response_model=Message,
     dependencies=[Depends(get_current_admin)],
 )
-def delete_device(
-    session: Annotated[Session, Depends(get_session)],
+async def delete_device(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     id: UUID,
 ) -> Message:
-    device = session.scalar(select(Device).where(Device.id == id))
+    device = await session.scalar(select(Device).where(Device.id == id))
 
     if device is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='device not found'
         )
 
-    session.delete(device)
-    session.commit()
+    await session.delete(device)
+    await session.commit()
 
     return {'message': 'Device deleted successfully'}
 
@@ -113,13 +119,13 @@ def delete_device(
     response_model=DeviceSchema,
     dependencies=[Depends(get_current_admin)],
 )
-def update_device(
+async def update_device(
     id: UUID,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     serial_number: Optional[str] = None,
     environment_id: Optional[int] = None,
 ) -> DeviceSchema:
-    device = session.scalar(select(Device).where(Device.id == id))
+    device = await session.scalar(select(Device).where(Device.id == id))
 
     if device is None:
         raise HTTPException(
@@ -130,7 +136,7 @@ def update_device(
         device.serial_number = serial_number
 
     if environment_id:
-        environment = session.scalar(
+        environment = await session.scalar(
             select(Environment).where(Environment.id == environment_id)
         )
 
@@ -140,11 +146,12 @@ def update_device(
                 detail='Environment not found',
             )
 
+        await session.refresh(device, ['environment'])
         device.environment = environment
         device.environment_id = environment.id
 
-    session.commit()
-    session.refresh(device)
+    await session.commit()
+    await session.refresh(device)
 
     return device
 
@@ -155,10 +162,13 @@ def update_device(
     response_model=DeviceSchema,
     dependencies=[Depends(get_current_admin)],
 )
-def get_device_by_id(
-    device_id: UUID, session: Annotated[Session, Depends(get_session)]
+async def get_device_by_id(
+    device_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> Device:
-    device_db = session.scalar(select(Device).where(Device.id == device_id))
+    device_db = await session.scalar(
+        select(Device).where(Device.id == device_id)
+    )
 
     if device_db is None:
         raise HTTPException(
@@ -166,3 +176,18 @@ def get_device_by_id(
         )
 
     return device_db
+
+
+@router.post(
+    path='/{serial_number}/access',
+    status_code=HTTPStatus.OK,
+    response_model=AccessDecision,
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def device_access(
+    serial_number: str,
+    access: AccessRequest,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> AccessDecision:
+    return await check_access(session, serial_number, access.user_id)
@@ -4,40 +4,119 @@ from uuid import UUID
 
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     File,
     Form,
     HTTPException,
+    Query,
     Request,
     UploadFile,
 )
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import asc, desc, select
-from sqlalchemy.orm import Session
+from fastapi_pagination.cursor import CursorPage
+from sqlalchemy import asc, delete, desc, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from unidecode import unidecode
 
-from web_backend.database import get_session
-from web_backend.models import AccessLog, Admin, Environment, User
+from web_backend.database import get_async_session
+from web_backend.models import (
+    AccessLog,
+    AccessStatsHourly,
+    Device,
+    Environment,
+    PhotoKind,
+    User,
+)
+from web_backend.models.user_environment import association_table
 from web_backend.schemas import (
+    AccessLogFilter,
+    AccessStatsFilter,
+    CountPage,
     EnvironmentCreated,
     EnvironmentFilter,
+    EnvironmentGrantsChanged,
     EnvironmentLog,
-    EnvironmentPublic,
     EnvironmentPublicWithPhotoURL,
     EnvironmentSchema,
+    EnvironmentStats,
     EnvironmentUpdated,
+    EstimatedCountPage,
     Message,
     PhotoUploaded,
     UserNameId,
+    UserSelection,
 )
-from web_backend.security import get_current_admin
+from web_backend.security import AdminPrincipal, get_current_admin
+from web_backend.settings import Settings
+from web_backend.utils.access_log import NEWEST_FIRST, filter_access_log
 from web_backend.utils.environment import relate_devices_to_environment
-from web_backend.utils.file_path import file_path
-from web_backend.utils.upload_photo import upload_photo
+from web_backend.utils.fast_json import RowSerializer
+from web_backend.utils.pagination import (
+    paginate_counted,
+    paginate_cursor,
+    paginate_rows,
+)
+from web_backend.utils.permissions import (
+    grant_environment_to_users,
+    record_changes,
+    revoke_environment_from_users,
+)
+from web_backend.utils.photo import (
+    get_photo,
+    photo_url,
+    store_photo,
+    with_photo_urls,
+)
+from web_backend.utils.user import selected_users
+
+settings = Settings()
 
 router = APIRouter(prefix='/environments', tags=['environments'])
 
+ENVIRONMENT_ROWS = RowSerializer(EnvironmentPublicWithPhotoURL, Environment)
+
+
+def environments_query(filters: EnvironmentFilter):
+    query = select(Environment)
+    if filters.name:
+        query = query.where(
+            Environment.name_unaccent.ilike(f'%{unidecode(filters.name)}%')
+        )
+
+    return query
+
+
+def environments_order(filters: EnvironmentFilter):
+    if (
+        filters.sort_order
+        == EnvironmentFilter.AscendingOrDescending.descending
+    ):
+        return [desc(Environment.name), desc(Environment.id)]
+    return [asc(Environment.name), asc(Environment.id)]
+
+
+def access_log_query(environment_id: int, filters: AccessLogFilter):
+    return filter_access_log(
+        select(AccessLog).where(AccessLog.environment_id == environment_id),
+        filters,
+    )
+
+
+def access_stats_query(environment_id: int, filters: AccessStatsFilter):
+    # reads the hourly rollups only, never the raw log
+    period = func.date_trunc(filters.granularity.value, AccessStatsHourly.hour)
+    query = select(
+        period.label('period'),
+        func.sum(AccessStatsHourly.allowed).label('allowed'),
+        func.sum(AccessStatsHourly.denied).label('denied'),
+    ).where(AccessStatsHourly.environment_id == environment_id)
+    if filters.start:
+        query = query.where(AccessStatsHourly.hour >= filters.start)
+    if filters.end:
+        query = query.where(AccessStatsHourly.hour < filters.end)
+
+    return query.group_by(period).order_by(period)
+
 
 @router.post(
     path='/',
@@ -62,19 +141,20 @@ router = APIRouter(prefix='/environments', tags=['environments'])
         },
     },
 )
-def create_environment(  # noqa PLR0913
+async def create_environment(  # noqa PLR0913
     request: Request,
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
-    session: Annotated[Session, Depends(get_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
     environment: Annotated[EnvironmentSchema, Depends()],
     photo: Annotated[UploadFile | str, File()] = None,
     devices_ids: Annotated[list[UUID] | None, Form()] = None,
 ) -> EnvironmentCreated:
-    environment_db = session.scalar(
-        select(Environment).where(Environment.name == environment.name)
+    repeated_name = await session.scalar(
+        select(Environment.id).where(Environment.name == environment.name)
     )
 
-    if environment_db:
+    if repeated_name:
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail='Environment name already in use',
@@ -87,24 +167,52 @@ def create_environment(  # noqa PLR0913
     )
 
     session.add(environment_db)
-    session.commit()
-    session.refresh(environment_db)
+    await session.flush()
 
-    devices = relate_devices_to_environment(
+    devices = await relate_devices_to_environment(
         session, environment_db, devices_ids
     )
 
-    photo_url = ''
+    photo_db = None
     if not isinstance(photo, str):
-        upload_photo(photo, environment_db.id, 'environments_photos')
-        photo_url = file_path(environment_db.id, 'environments_photos')
-        photo_url = str(request.base_url) + photo_url
+        photo_db = await store_photo(
+            session,
+            photo,
+            environment_db.id,
+            PhotoKind.environments_photos,
+            background_tasks,
+        )
 
-    environment_dict = environment_db.as_dict()
-    environment_dict['photo_url'] = photo_url
-    environment_dict['devices'] = devices if devices else None
+    await session.commit()
+    await session.refresh(environment_db)
 
-    return environment_dict
+    return {
+        'id': environment_db.id,
+        'created_at': environment_db.created_at,
+        'updated_at': environment_db.updated_at,
+        'creator_admin_id': environment_db.creator_admin_id,
+        'photo_url': photo_url(request, photo_db),
+        'devices': devices if devices else None,
+    }
+
+
+@router.get(
+    path='/cursor',
+    status_code=HTTPStatus.OK,
+    response_model=CursorPage[EnvironmentPublicWithPhotoURL],
+    dependencies=[Depends(get_current_admin)],
+)
+async def get_environments_cursor(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[EnvironmentFilter, Depends()],
+) -> CursorPage[EnvironmentPublicWithPhotoURL]:
+    return await paginate_cursor(
+        session,
+        environments_query(filters),
+        environments_order(filters),
+        with_photo_urls(session, request, PhotoKind.environments_photos),
+    )
 
 
 @router.get(
@@ -114,24 +222,30 @@ def create_environment(  # noqa PLR0913
     responses={HTTPStatus.NOT_FOUND: {'model': Message}},
     dependencies=[Depends(get_current_admin)],
 )
-def get_environment_by_id(
+async def get_environment_by_id(
     environment_id: int,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> EnvironmentPublicWithPhotoURL:
-    environment_db = session.scalar(
-        select(Environment).where(Environment.id == environment_id)
-    )
+    query = select(Environment).where(Environment.id == environment_id)
+    if settings.FAST_JSON_RESPONSES:
+        environment_db = await session.execute(ENVIRONMENT_ROWS.project(query))
+        environment_db = environment_db.mappings().one_or_none()
+    else:
+        environment_db = await session.scalar(query)
 
     if environment_db is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
         )
 
-    file = file_path(environment_db.id, 'environments_photos')
-    environment_db.photo_url = ''
-    if file:
-        environment_db.photo_url = str(request.base_url) + file
+    if settings.FAST_JSON_RESPONSES:
+        environment_db = dict(environment_db)
+    await with_photo_urls(session, request, PhotoKind.environments_photos)([
+        environment_db
+    ])
+    if settings.FAST_JSON_RESPONSES:
+        return ENVIRONMENT_ROWS.row_response(environment_db)
 
     return environment_db
 
@@ -139,38 +253,38 @@ def get_environment_by_id(
 @router.get(
     path='/',
     status_code=HTTPStatus.OK,
-    response_model=Page[EnvironmentPublic],
+    response_model=CountPage[EnvironmentPublicWithPhotoURL],
     dependencies=[Depends(get_current_admin)],
 )
-def get_environments(
-    session: Annotated[Session, Depends(get_session)],
+async def get_environments(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     filters: Annotated[EnvironmentFilter, Depends()],
-) -> Page[EnvironmentPublic]:
-    query = select(Environment)
-    if filters.name:
-        query = query.where(
-            Environment.name_unaccent.ilike(f'%{unidecode(filters.name)}%')
+) -> CountPage[EnvironmentPublicWithPhotoURL]:
+    query = environments_query(filters).order_by(*environments_order(filters))
+    transformer = with_photo_urls(
+        session, request, PhotoKind.environments_photos
+    )
+    if settings.FAST_JSON_RESPONSES:
+        return await paginate_rows(
+            session, query, ENVIRONMENT_ROWS, transformer
         )
 
-    query = query.order_by(
-        desc(Environment.name)
-        if filters.sort_order
-        == EnvironmentFilter.AscendingOrDescending.descending
-        else asc(Environment.name)
-    )
-    return paginate(session, query)
+    return await paginate_counted(session, query, transformer)
 
 
 @router.get(
     path='/logs/{environment_id}',
     status_code=HTTPStatus.OK,
-    response_model=Page[EnvironmentLog],
+    response_model=EstimatedCountPage[EnvironmentLog],
+    responses={HTTPStatus.BAD_REQUEST: {'model': Message}},
 )
-def get_access_log(
+async def get_access_log(
     environment_id: int,
-    session: Annotated[Session, Depends(get_session)],
-) -> Page[EnvironmentLog]:
-    environment_db = session.scalar(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[AccessLogFilter, Query()],
+) -> EstimatedCountPage[EnvironmentLog]:
+    environment_db = await session.scalar(
         select(Environment).where(Environment.id == environment_id)
     )
 
@@ -179,9 +293,69 @@ def get_access_log(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
         )
 
-    query = select(AccessLog).where(AccessLog.environment_id == environment_id)
+    return await paginate_counted(
+        session,
+        access_log_query(environment_id, filters).order_by(*NEWEST_FIRST),
+        max_offset=settings.ACCESS_LOG_MAX_OFFSET,
+    )
+
 
-    return paginate(session, query)
+@router.get(
+    path='/logs/{environment_id}/cursor',
+    status_code=HTTPStatus.OK,
+    response_model=CursorPage[EnvironmentLog],
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def get_access_log_cursor(
+    environment_id: int,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[AccessLogFilter, Query()],
+) -> CursorPage[EnvironmentLog]:
+    environment_db = await session.scalar(
+        select(Environment).where(Environment.id == environment_id)
+    )
+
+    if not environment_db:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
+        )
+
+    return await paginate_cursor(
+        session, access_log_query(environment_id, filters), NEWEST_FIRST
+    )
+
+
+@router.get(
+    path='/{environment_id}/stats',
+    status_code=HTTPStatus.OK,
+    response_model=EnvironmentStats,
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def get_environment_stats(
+    environment_id: int,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[AccessStatsFilter, Query()],
+) -> EnvironmentStats:
+    environment_db = await session.scalar(
+        select(Environment.id).where(Environment.id == environment_id)
+    )
+
+    if environment_db is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
+        )
+
+    periods = await session.execute(
+        access_stats_query(environment_id, filters)
+    )
+
+    return {
+        'environment_id': environment_id,
+        'granularity': filters.granularity,
+        'items': periods.mappings().all(),
+    }
 
 
 @router.delete(
@@ -190,13 +364,13 @@ def get_access_log(
     response_model=Message,
     responses={HTTPStatus.NOT_FOUND: {'model': Message}},
 )
-def delete_environment(
+async def delete_environment(
     environment_id: int,
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
-    session: Annotated[Session, Depends(get_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> Message:
-    environment_db = session.scalar(
-        select(Environment).where(Environment.id == environment_id)
+    environment_db = await session.scalar(
+        select(Environment.id).where(Environment.id == environment_id)
     )
 
     if environment_db is None:
@@ -204,8 +378,22 @@ def delete_environment(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
         )
 
-    session.delete(environment_db)
-    session.commit()
+    # set-based, rather than loading every user and device to unlink them
+    await session.execute(
+        delete(association_table).where(
+            association_table.c.enviroment_id == environment_id
+        )
+    )
+    await session.execute(
+        update(Device)
+        .where(Device.environment_id == environment_id)
+        .values(environment_id=None)
+    )
+    await session.execute(
+        delete(Environment).where(Environment.id == environment_id)
+    )
+    record_changes(session.sync_session, ('drop_environment', environment_id))
+    await session.commit()
 
     return {'message': 'Environment deleted successfully!'}
 
@@ -230,15 +418,16 @@ def delete_environment(
         },
     },
 )
-def update_environment(  # noqa PLR0913
+async def update_environment(  # noqa PLR0913
     environment_id: int,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
     new_environment: Annotated[EnvironmentSchema, Depends()],
     photo: Annotated[UploadFile | str, File()] = None,
     devices_ids: Annotated[list[UUID] | None, Form()] = None,
 ) -> EnvironmentUpdated:
-    environment_db = session.scalar(
+    environment_db = await session.scalar(
         select(Environment).where(Environment.id == environment_id)
     )
 
@@ -248,38 +437,48 @@ def update_environment(  # noqa PLR0913
         )
 
     if new_environment.name:
-        environment_db_repeated_name = session.scalar(
-            select(Environment).where(Environment.name == new_environment.name)
+        repeated_name_id = await session.scalar(
+            select(Environment.id).where(
+                Environment.name == new_environment.name
+            )
         )
 
-        if environment_db_repeated_name:
-            if environment_db != environment_db_repeated_name:
+        if repeated_name_id:
+            if environment_db.id != repeated_name_id:
                 raise HTTPException(
                     status_code=HTTPStatus.CONFLICT,
                     detail='Environment name already in use',
                 )
         environment_db.name = new_environment.name
         environment_db.name_unaccent = unidecode(new_environment.name)
-        session.commit()
-        session.refresh(environment_db)
 
-    devices = relate_devices_to_environment(
+    devices = await relate_devices_to_environment(
         session, environment_db, devices_ids
     )
 
     if not isinstance(photo, str):
-        upload_photo(photo, environment_db.id, 'environments_photos')
-
-    photo_url = file_path(environment_db.id, 'environments_photos')
-    if photo_url:
-        photo_url = str(request.base_url) + photo_url
+        photo_db = await store_photo(
+            session,
+            photo,
+            environment_db.id,
+            PhotoKind.environments_photos,
+            background_tasks,
+        )
+    else:
+        photo_db = await get_photo(
+            session, environment_db.id, PhotoKind.environments_photos
+        )
 
-    environment_dict = environment_db.as_dict()
-    environment_dict['photo_url'] = photo_url
+    await session.commit()
+    await session.refresh(environment_db)
 
     return {
         'message': 'Environment updated successfully!',
-        'environment_updated': environment_dict,
+        'environment_updated': {
+            'name': environment_db.name,
+            'updated_at': environment_db.updated_at,
+            'photo_url': photo_url(request, photo_db),
+        },
         'devices': devices if devices else None,
     }
 
@@ -287,15 +486,15 @@ def update_environment(  # noqa PLR0913
 @router.get(
     path='/users/{environment_id}',
     status_code=HTTPStatus.OK,
-    response_model=Page[UserNameId],
+    response_model=CountPage[UserNameId],
     dependencies=[Depends(get_current_admin)],
 )
-def get_environment_users(
+async def get_environment_users(
     environment_id: int,
-    session: Annotated[Session, Depends(get_session)],
-) -> Page[UserNameId]:
-    environment_db = session.scalar(
-        select(Environment).where(Environment.id == environment_id)
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> CountPage[UserNameId]:
+    environment_db = await session.scalar(
+        select(Environment.id).where(Environment.id == environment_id)
     )
 
     if environment_db is None:
@@ -309,7 +508,66 @@ def get_environment_users(
         .where(Environment.id == environment_id)
     )
 
-    return paginate(session, query)
+    return await paginate_counted(session, query)
+
+
+async def change_grants(
+    environment_id: int,
+    selection: UserSelection,
+    session: AsyncSession,
+    change,
+) -> EnvironmentGrantsChanged:
+    environment_db = await session.scalar(
+        select(Environment.id).where(Environment.id == environment_id)
+    )
+
+    if environment_db is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Environment not found!'
+        )
+
+    conditions = selected_users(selection)
+    matched = await session.scalar(
+        select(func.count()).select_from(User).where(*conditions)
+    )
+    changed = await change(session, environment_id, conditions)
+    await session.commit()
+
+    return EnvironmentGrantsChanged(matched=matched, changed=changed)
+
+
+@router.post(
+    path='/{environment_id}/grants',
+    status_code=HTTPStatus.OK,
+    response_model=EnvironmentGrantsChanged,
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def grant_environment(
+    environment_id: int,
+    selection: UserSelection,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> EnvironmentGrantsChanged:
+    return await change_grants(
+        environment_id, selection, session, grant_environment_to_users
+    )
+
+
+@router.delete(
+    path='/{environment_id}/grants',
+    status_code=HTTPStatus.OK,
+    response_model=EnvironmentGrantsChanged,
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def revoke_environment(
+    environment_id: int,
+    selection: UserSelection,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> EnvironmentGrantsChanged:
+    return await change_grants(
+        environment_id, selection, session, revoke_environment_from_users
+    )
 
 
 @router.post(
@@ -318,13 +576,14 @@ def get_environment_users(
     response_model=PhotoUploaded,
     dependencies=[Depends(get_current_admin)],
 )
-def environment_photo_upload(
+async def environment_photo_upload(
     environment_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
     request: Request,
     photo: Annotated[UploadFile, File()],
 ) -> PhotoUploaded:
-    environment_db = session.scalar(
+    environment_db = await session.scalar(
         select(Environment).where(Environment.id == environment_id)
     )
 
@@ -333,13 +592,18 @@ def environment_photo_upload(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
         )
 
-    upload_photo(photo, environment_id, 'environments_photos')
-    photo_url = file_path(environment_db.id, 'environments_photos')
-    photo_url = str(request.base_url) + photo_url
+    photo_db = await store_photo(
+        session,
+        photo,
+        environment_id,
+        PhotoKind.environments_photos,
+        background_tasks,
+    )
+    await session.commit()
 
     return {
         'message': 'Image uploaded successfully!',
-        'photo_url': photo_url,
+        'photo_url': photo_url(request, photo_db),
     }
 
 
@@ -349,12 +613,12 @@ def environment_photo_upload(
     response_model=dict,
     dependencies=[Depends(get_current_admin)],
 )
-def get_environment_devices(
+async def get_environment_devices(
     environment_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> dict:
-    environment_db = session.scalar(
-        select(Environment).where(Environment.id == environment_id)
+    environment_db = await session.scalar(
+        select(Environment.id).where(Environment.id == environment_id)
     )
 
     if environment_db is None:
@@ -362,4 +626,7 @@ def get_environment_devices(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found'
         )
 
-    return {'environment_devices': environment_db.as_dict()['devices']}
+    devices_ids = await session.scalars(
+        select(Device.id).where(Device.environment_id == environment_id)
+    )
+    return {'environment_devices': list(devices_ids)}
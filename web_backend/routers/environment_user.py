@@ -3,38 +3,75 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from web_backend.database import get_session
+from web_backend.database import get_async_session
 from web_backend.models import Environment, User
 from web_backend.schemas import (
     EnvironmentAdded,
+    EnvironmentPermission,
     Message,
 )
 from web_backend.security import get_current_admin
+from web_backend.utils.permissions import (
+    grant_environment,
+    load_permissions,
+    revoke_environment,
+)
 
 router = APIRouter(prefix='/users_environments', tags=['users_evironments'])
 
 
+@router.get(
+    '/{user_id}/{environment_id}',
+    status_code=HTTPStatus.OK,
+    response_model=EnvironmentPermission,
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def check_environment_permission(
+    user_id: int,
+    environment_id: int,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> EnvironmentPermission:
+    permissions = await load_permissions(session)
+
+    if not permissions.has_user(user_id):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
+        )
+
+    if not permissions.has_environment(environment_id):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Environment not found!'
+        )
+
+    return EnvironmentPermission(
+        user_id=user_id,
+        environment_id=environment_id,
+        allowed=permissions.allowed(user_id, environment_id),
+    )
+
+
 @router.post(
     '/{user_id}/{environment_id}',
     status_code=HTTPStatus.OK,
     response_model=EnvironmentAdded,
     dependencies=[Depends(get_current_admin)],
 )
-def add_environment_permission(
+async def add_environment_permission(
     user_id: int,
     environment_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> EnvironmentAdded:
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if user_db is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
 
-    env_db = session.scalar(
+    env_db = await session.scalar(
         select(Environment).where(Environment.id == environment_id)
     )
 
@@ -43,15 +80,13 @@ def add_environment_permission(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found!'
         )
 
-    if env_db in user_db.environments:
+    if not await grant_environment(session, user_id, environment_id):
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail='User already has this environment!',
         )
 
-    user_db.environments.append(env_db)
-    session.commit()
-    session.refresh(user_db)
+    await session.commit()
 
     return EnvironmentAdded(
         message='Environment added successfully',
@@ -60,24 +95,24 @@ def add_environment_permission(
 
 
 @router.delete(
-    path='{user_id}/{environment_id}',
+    path='/{user_id}/{environment_id}',
     status_code=HTTPStatus.OK,
     response_model=Message,
     dependencies=[Depends(get_current_admin)],
 )
-def remove_environment_permission(
+async def remove_environment_permission(
     user_id: int,
     environment_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> Message:
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if user_db is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
 
-    env_db = session.scalar(
+    env_db = await session.scalar(
         select(Environment).where(Environment.id == environment_id)
     )
 
@@ -86,14 +121,12 @@ def remove_environment_permission(
             status_code=HTTPStatus.NOT_FOUND, detail='Environment not found!'
         )
 
-    if env_db not in user_db.environments:
+    if not await revoke_environment(session, user_id, environment_id):
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail='User does not have this environment!',
         )
 
-    user_db.environments.remove(env_db)
-    session.commit()
-    session.refresh(user_db)
+    await session.commit()
 
     return {'message': 'Environment removed from user successfully!'}
@@ -0,0 +1,84 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+
+from web_backend.database import async_engine, engine, pool_status
+from web_backend.schemas import (
+    AccessLogWriterStats,
+    CacheStats,
+    DatabasePools,
+    HTTPExceptionResponse,
+    ProcessPoolStats,
+)
+from web_backend.security import (
+    admin_cache,
+    get_current_super_admin,
+    password_pool,
+)
+from web_backend.utils.access_log_writer import access_log_writer
+from web_backend.utils.derivatives import derivative_pool
+from web_backend.utils.face import face_pool
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['metrics'],
+    dependencies=[Depends(get_current_super_admin)],
+    responses={HTTPStatus.FORBIDDEN: {'model': HTTPExceptionResponse}},
+)
+
+
+@router.get(
+    path='/database-pool',
+    status_code=HTTPStatus.OK,
+    response_model=DatabasePools,
+)
+async def get_database_pool_status() -> DatabasePools:
+    return {
+        'sync_pool': pool_status(engine),
+        'async_pool': pool_status(async_engine),
+    }
+
+
+@router.get(
+    path='/admin-cache',
+    status_code=HTTPStatus.OK,
+    response_model=CacheStats,
+)
+async def get_admin_cache_stats() -> CacheStats:
+    return admin_cache.stats()
+
+
+@router.get(
+    path='/password-pool',
+    status_code=HTTPStatus.OK,
+    response_model=ProcessPoolStats,
+)
+async def get_password_pool_stats() -> ProcessPoolStats:
+    return password_pool.stats()
+
+
+@router.get(
+    path='/derivative-pool',
+    status_code=HTTPStatus.OK,
+    response_model=ProcessPoolStats,
+)
+async def get_derivative_pool_stats() -> ProcessPoolStats:
+    return derivative_pool.stats()
+
+
+@router.get(
+    path='/face-pool',
+    status_code=HTTPStatus.OK,
+    response_model=ProcessPoolStats,
+)
+async def get_face_pool_stats() -> ProcessPoolStats:
+    return face_pool.stats()
+
+
+@router.get(
+    path='/access-log-writer',
+    status_code=HTTPStatus.OK,
+    response_model=AccessLogWriterStats,
+)
+async def get_access_log_writer_stats() -> AccessLogWriterStats:
+    return access_log_writer.stats()
@@ -0,0 +1,81 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.database import get_async_session
+from web_backend.models import Photo, PhotoKind
+from web_backend.schemas import Message, PhotoSize
+from web_backend.utils.photo import get_photo, photo_response, photo_url
+
+router = APIRouter(prefix='/photos', tags=['photos'])
+
+# a versioned URL always names the same bytes
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+PHOTO_RESPONSES = {
+    HTTPStatus.NOT_MODIFIED: {'description': 'Not Modified'},
+    HTTPStatus.NOT_FOUND: {'model': Message},
+    HTTPStatus.UNPROCESSABLE_ENTITY: {'model': Message},
+    HTTPStatus.SERVICE_UNAVAILABLE: {'model': Message},
+}
+
+
+async def get_registered_photo(
+    kind: PhotoKind,
+    owner_id: int,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> Photo:
+    photo = await get_photo(session, owner_id, kind)
+
+    if photo is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Photo not found'
+        )
+
+    return photo
+
+
+@router.get(
+    path='/{kind}/{owner_id}',
+    status_code=HTTPStatus.OK,
+    response_class=FileResponse,
+    responses=PHOTO_RESPONSES,
+)
+async def get_photo_file(
+    request: Request,
+    photo: Annotated[Photo, Depends(get_registered_photo)],
+    size: PhotoSize = PhotoSize.original,
+) -> Response:
+    return await photo_response(request, photo, size, REVALIDATE)
+
+
+@router.get(
+    path='/{kind}/{owner_id}/{version}',
+    status_code=HTTPStatus.OK,
+    response_class=FileResponse,
+    responses={
+        **PHOTO_RESPONSES,
+        HTTPStatus.TEMPORARY_REDIRECT: {
+            'description': 'The photo was replaced; redirects to its '
+            'current version'
+        },
+    },
+)
+async def get_photo_version(
+    version: str,
+    request: Request,
+    photo: Annotated[Photo, Depends(get_registered_photo)],
+    size: PhotoSize = PhotoSize.original,
+) -> Response:
+    if version != photo.version:
+        return RedirectResponse(
+            photo_url(request, photo, size),
+            status_code=HTTPStatus.TEMPORARY_REDIRECT,
+            headers={'Cache-Control': REVALIDATE},
+        )
+
+    return await photo_response(request, photo, size, IMMUTABLE)
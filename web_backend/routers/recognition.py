@@ -0,0 +1,62 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from anyio import to_thread
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.database import get_async_session
+from web_backend.schemas import FaceMatches, Message
+from web_backend.security import get_current_admin
+from web_backend.utils.face import (
+    confirm_matches,
+    extract_descriptor,
+    load_gallery,
+    settings,
+)
+from web_backend.utils.upload_photo import read_photo
+
+router = APIRouter(
+    prefix='/recognition',
+    tags=['recognition'],
+    dependencies=[Depends(get_current_admin)],
+)
+
+
+@router.post(
+    path='/identify',
+    status_code=HTTPStatus.OK,
+    response_model=FaceMatches,
+    responses={
+        HTTPStatus.REQUEST_ENTITY_TOO_LARGE: {'model': Message},
+        HTTPStatus.UNSUPPORTED_MEDIA_TYPE: {'model': Message},
+        HTTPStatus.UNPROCESSABLE_ENTITY: {'model': Message},
+        HTTPStatus.SERVICE_UNAVAILABLE: {'model': Message},
+    },
+)
+async def identify(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    photo: Annotated[UploadFile, File()],
+    limit: Annotated[int, Query(ge=1, le=20)] = 1,
+) -> FaceMatches:
+    descriptor = await extract_descriptor(await read_photo(photo))
+
+    if descriptor is None:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='No face found in the photo',
+        )
+
+    gallery = await load_gallery(session)
+    # numpy releases the GIL for the matrix product of large galleries
+    matches = await to_thread.run_sync(gallery.search, descriptor, limit)
+    # other processes may have deleted or re-enrolled these users
+    matches = await confirm_matches(session, descriptor, matches)
+
+    return {
+        'matches': [
+            {'user_id': user_id, 'distance': distance}
+            for user_id, distance in matches
+            if distance <= settings.FACE_MATCH_THRESHOLD
+        ]
+    }
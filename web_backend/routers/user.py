@@ -4,42 +4,103 @@ from typing import Annotated
 
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     File,
     Form,
     HTTPException,
+    Query,
     Request,
     UploadFile,
 )
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi_pagination.cursor import CursorPage
 from sqlalchemy import asc, desc, select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from unidecode import unidecode
 
-from web_backend.database import get_session
-from web_backend.models import Admin, Environment, User
+from web_backend.database import get_async_session
+from web_backend.models import AccessLog, Environment, PhotoKind, User
 from web_backend.schemas import (
+    CountPage,
     EnvironmentPublic,
     Message,
+    PhotoEnrollmentJob,
     PhotoUploaded,
+    UserAccessLog,
+    UserAccessLogFilter,
     UserFilter,
+    UserImportReport,
     UserPublic,
     UserPublicWithUrl,
     UserSchema,
     UserSchemaPut,
 )
-from web_backend.security import get_current_admin
-from web_backend.utils.file_path import file_path
-from web_backend.utils.upload_photo import upload_photo
+from web_backend.security import AdminPrincipal, get_current_admin
+from web_backend.settings import Settings
+from web_backend.utils.access_log import NEWEST_FIRST, filter_access_window
+from web_backend.utils.face import gallery
+from web_backend.utils.fast_json import RowSerializer
+from web_backend.utils.pagination import (
+    paginate_counted,
+    paginate_cursor,
+    paginate_rows,
+)
+from web_backend.utils.photo import (
+    get_photo,
+    photo_url,
+    store_photo,
+    with_photo_urls,
+)
+from web_backend.utils.photo_enrollment import (
+    create_job,
+    enrollment_jobs,
+    run_job,
+    save_archive,
+)
 from web_backend.utils.user import (
+    filter_users,
     verify_environment_ids,
-    verify_environment_ids_put,
     verify_repeated_fields,
 )
+from web_backend.utils.user_import import import_users, read_import
+
+settings = Settings()
 
 router = APIRouter(prefix='/users', tags=['users'])
 
+USER_ROWS = RowSerializer(UserPublicWithUrl, User)
+
+
+def users_query(filters: UserFilter):
+    return filter_users(select(User), filters)
+
+
+def users_order(filters: UserFilter):
+    column = User.name
+    if filters.sort_by:
+        column = getattr(User, filters.sort_by.value)
+
+    # id breaks ties so the order, and the cursor built on it, is total
+    if filters.sort_order == UserFilter.AscendingOrDescending.descending:
+        return [desc(column), desc(User.id)]
+    return [asc(column), asc(User.id)]
+
+
+def user_access_log_query(user_id: int, filters: UserAccessLogFilter):
+    query = filter_access_window(
+        select(AccessLog).where(AccessLog.user_id == user_id), filters
+    )
+    if filters.environment_id is not None:
+        query = query.where(AccessLog.environment_id == filters.environment_id)
+    if filters.environment_name:
+        query = query.where(
+            AccessLog.environment_name_unaccent.ilike(
+                f'%{unidecode(filters.environment_name)}%'
+            )
+        )
+
+    return query
+
 
 @router.post(
     path='/',
@@ -61,14 +122,15 @@ router = APIRouter(prefix='/users', tags=['users'])
         },
     },
 )
-def create_user(
-    session: Annotated[Session, Depends(get_session)],
+async def create_user(  # noqa PLR0913
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
     user_form: Annotated[UserSchema, Depends()],
-    current_admin: Annotated[Admin, Depends(get_current_admin)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
     photo: Annotated[UploadFile | str, File()] = None,
     environment_ids: Annotated[list[int] | None, Form()] = None,
 ):
-    verify_repeated_fields(user_form, session)
+    await verify_repeated_fields(user_form, session)
 
     user_db = User(
         **user_form.model_dump(),
@@ -76,18 +138,26 @@ def create_user(
         registered_by_admin_id=current_admin.id,
     )
     session.add(user_db)
-    session.commit()
-    session.refresh(user_db)
+    await session.flush()
+
+    existing_ids, invalid_environment_ids = await verify_environment_ids(
+        environment_ids, session, user_db
+    )
 
     photo_ans = ''
 
     if not isinstance(photo, str):
         photo_ans = photo.filename
-        upload_photo(photo, user_db.id, 'users_photos')
+        await store_photo(
+            session,
+            photo,
+            user_db.id,
+            PhotoKind.users_photos,
+            background_tasks,
+        )
 
-    existing_ids, invalid_environment_ids = verify_environment_ids(
-        environment_ids, session, user_db
-    )
+    await session.commit()
+    await session.refresh(user_db)
 
     user_public = UserPublic.model_validate(user_db)
 
@@ -100,6 +170,23 @@ def create_user(
     }
 
 
+@router.post(
+    path='/bulk',
+    response_model=UserImportReport,
+    responses={
+        HTTPStatus.UNSUPPORTED_MEDIA_TYPE: {'model': Message},
+        HTTPStatus.REQUEST_ENTITY_TOO_LARGE: {'model': Message},
+    },
+)
+async def import_users_file(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
+    file: Annotated[UploadFile, File()],
+):
+    text, format = await read_import(file)
+    return await import_users(session, text, format, current_admin.id)
+
+
 @router.delete(
     path='/{user_id}',
     status_code=HTTPStatus.OK,
@@ -107,22 +194,42 @@ def create_user(
     responses={HTTPStatus.NOT_FOUND: {'model': Message}},
     dependencies=[Depends(get_current_admin)],
 )
-def delete_user(
+async def delete_user(
     user_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> Message:
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if user_db is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
-    session.delete(user_db)
-    session.commit()
+    await session.delete(user_db)
+    await session.commit()
+    gallery.remove(user_id)
 
     return {'message': 'User deleted successfully!'}
 
 
+@router.get(
+    path='/cursor',
+    status_code=HTTPStatus.OK,
+    response_model=CursorPage[UserPublicWithUrl],
+    dependencies=[Depends(get_current_admin)],
+)
+async def get_users_cursor(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[UserFilter, Depends()],
+) -> CursorPage[UserPublicWithUrl]:
+    return await paginate_cursor(
+        session,
+        users_query(filters),
+        users_order(filters),
+        with_photo_urls(session, request, PhotoKind.users_photos),
+    )
+
+
 @router.get(
     path='/{user_id}',
     status_code=HTTPStatus.OK,
@@ -130,22 +237,28 @@ def delete_user(
     responses={HTTPStatus.NOT_FOUND: {'model': Message}},
     dependencies=[Depends(get_current_admin)],
 )
-def get_user_by_id(
+async def get_user_by_id(
     user_id: int,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
 ) -> UserPublicWithUrl:
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    query = select(User).where(User.id == user_id)
+    if settings.FAST_JSON_RESPONSES:
+        user_db = await session.execute(USER_ROWS.project(query))
+        user_db = user_db.mappings().one_or_none()
+    else:
+        user_db = await session.scalar(query)
 
     if user_db is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
 
-    file = file_path(user_db.id, 'users_photos')
-    user_db.photo_url = ''
-    if file:
-        user_db.photo_url = str(request.base_url) + file
+    if settings.FAST_JSON_RESPONSES:
+        user_db = dict(user_db)
+    await with_photo_urls(session, request, PhotoKind.users_photos)([user_db])
+    if settings.FAST_JSON_RESPONSES:
+        return USER_ROWS.row_response(user_db)
 
     return user_db
 
@@ -153,46 +266,33 @@ def get_user_by_id(
 @router.get(
     path='/',
     status_code=HTTPStatus.OK,
-    response_model=Page[UserPublic],
+    response_model=CountPage[UserPublicWithUrl],
     dependencies=[Depends(get_current_admin)],
 )
-def get_users(
-    session: Annotated[Session, Depends(get_session)],
+async def get_users(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
     filters: Annotated[UserFilter, Depends()],
-) -> Page[UserPublic]:
-    query = select(User)
-    if filters.name:
-        query = query.where(
-            User.name_unaccent.ilike(f'%{unidecode(filters.name)}%')
-        )
+) -> CountPage[UserPublicWithUrl]:
+    query = users_query(filters).order_by(*users_order(filters))
+    transformer = with_photo_urls(session, request, PhotoKind.users_photos)
+    if settings.FAST_JSON_RESPONSES:
+        return await paginate_rows(session, query, USER_ROWS, transformer)
 
-    if filters.status:
-        query = query.where(User.status == filters.status)
-
-    column = User.name
-    if filters.sort_by:
-        column = getattr(User, filters.sort_by.value)
-
-    query = query.order_by(
-        desc(column)
-        if filters.sort_order == UserFilter.AscendingOrDescending.descending
-        else asc(column)
-    )
-
-    return paginate(session, query)
+    return await paginate_counted(session, query, transformer)
 
 
 @router.get(
     path='/environments/{user_id}',
     status_code=HTTPStatus.OK,
-    response_model=Page[EnvironmentPublic],
+    response_model=CountPage[EnvironmentPublic],
     dependencies=[Depends(get_current_admin)],
 )
-def get_user_environments(
+async def get_user_environments(
     user_id: int,
-    session: Annotated[Session, Depends(get_session)],
-) -> Page[EnvironmentPublic]:
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> CountPage[EnvironmentPublic]:
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if user_db is None:
         raise HTTPException(
@@ -203,7 +303,31 @@ def get_user_environments(
         select(Environment).join(User.environments).where(User.id == user_id)
     )
 
-    return paginate(session, query)
+    return await paginate_counted(session, query)
+
+
+@router.get(
+    path='/{user_id}/access-logs',
+    status_code=HTTPStatus.OK,
+    response_model=CursorPage[UserAccessLog],
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def get_user_access_logs(
+    user_id: int,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    filters: Annotated[UserAccessLogFilter, Query()],
+) -> CursorPage[UserAccessLog]:
+    user_db = await session.scalar(select(User.id).where(User.id == user_id))
+
+    if user_db is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
+        )
+
+    return await paginate_cursor(
+        session, user_access_log_query(user_id, filters), NEWEST_FIRST
+    )
 
 
 @router.post(
@@ -212,26 +336,73 @@ def get_user_environments(
     response_model=PhotoUploaded,
     dependencies=[Depends(get_current_admin)],
 )
-def perfil_photo_upload(
+async def perfil_photo_upload(
     user_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
     photo: Annotated[UploadFile, File()],
 ):
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if not user_db:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
 
-    upload_photo(photo, user_db.id, 'users_photos')
+    photo_db = await store_photo(
+        session,
+        photo,
+        user_db.id,
+        PhotoKind.users_photos,
+        background_tasks,
+    )
+    await session.commit()
 
     return {
         'message': 'Image uploaded successfully!',
-        'filename': photo.filename,
+        'photo_url': photo_url(request, photo_db),
     }
 
 
+@router.post(
+    path='/photos/bulk',
+    status_code=HTTPStatus.ACCEPTED,
+    response_model=PhotoEnrollmentJob,
+    responses={
+        HTTPStatus.UNSUPPORTED_MEDIA_TYPE: {'model': Message},
+        HTTPStatus.REQUEST_ENTITY_TOO_LARGE: {'model': Message},
+    },
+    dependencies=[Depends(get_current_admin)],
+)
+async def enroll_photos(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
+    archive: Annotated[UploadFile, File()],
+):
+    path, names = await save_archive(archive)
+    job = create_job(names)
+    background_tasks.add_task(run_job, job, path, names, session.bind)
+
+    return job
+
+
+@router.get(
+    path='/photos/bulk/{job_id}',
+    response_model=PhotoEnrollmentJob,
+    responses={HTTPStatus.NOT_FOUND: {'model': Message}},
+    dependencies=[Depends(get_current_admin)],
+)
+async def get_photo_enrollment(job_id: str):
+    job = enrollment_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Job not found!'
+        )
+
+    return job
+
+
 @router.put(
     path='/{user_id}',
     status_code=HTTPStatus.CREATED,
@@ -253,22 +424,23 @@ def perfil_photo_upload(
     },
     dependencies=[Depends(get_current_admin)],
 )
-def update_user(  # noqa PLR0913
+async def update_user(  # noqa PLR0913
     user_id: int,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    background_tasks: BackgroundTasks,
     request: Request,
     user_form: Annotated[UserSchemaPut, Depends()],
     photo: Annotated[UploadFile | str, File()] = None,
     environment_ids: Annotated[list[int] | None, Form()] = None,
 ):
-    user_db = session.scalar(select(User).where(User.id == user_id))
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if user_db is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
 
-    verify_repeated_fields(user_form, session)
+    await verify_repeated_fields(user_form, session)
 
     for field, value in user_form.model_dump(exclude_unset=True).items():
         if not (
@@ -278,26 +450,30 @@ def update_user(  # noqa PLR0913
         ):
             setattr(user_db, field, value)
 
-    session.commit()
-    session.refresh(user_db)
+    existing_ids, invalid_environment_ids = await verify_environment_ids(
+        environment_ids, session, user_db, replace=True
+    )
 
     if not isinstance(photo, str):
-        upload_photo(photo, user_db.id, 'users_photos')
-
-    photo_url = file_path(user_db.id, 'users_photos')
-    if photo_url:
-        photo_url = str(request.base_url) + photo_url
+        photo_db = await store_photo(
+            session,
+            photo,
+            user_db.id,
+            PhotoKind.users_photos,
+            background_tasks,
+        )
+    else:
+        photo_db = await get_photo(session, user_db.id, PhotoKind.users_photos)
 
-    existing_ids, invalid_environment_ids = verify_environment_ids_put(
-        environment_ids, session, user_db
-    )
+    await session.commit()
+    await session.refresh(user_db)
 
     user_public = UserPublic.model_validate(user_db)
 
     return {
         'message': 'User updated successfully',
         'user_created': user_public,
-        'photo_url': photo_url,
+        'photo_url': photo_url(request, photo_db),
         'environment_ids': existing_ids,
         'invalid_environment_ids': invalid_environment_ids,
     }
@@ -1,28 +1,65 @@
+from .access_log import (
+    AccessLogExportFilter,
+    AccessLogFilter,
+    AccessLogWindow,
+    AccessStatsFilter,
+    AccessStatsPeriod,
+    AccessTimeRange,
+    EnvironmentStats,
+    UserAccessLog,
+    UserAccessLogFilter,
+)
 from .admin import AdminDB, AdminProfile, AdminPublic, Admins, AdminSchema
-from .device import DeviceSchema
+from .device import AccessDecision, AccessRequest, DeviceSchema
 from .environment import (
     EnvironmentAdded,
     EnvironmentCreated,
     EnvironmentFilter,
+    EnvironmentGrantsChanged,
     EnvironmentLog,
+    EnvironmentPermission,
     EnvironmentPublic,
     EnvironmentPublicWithPhotoURL,
     EnvironmentSchema,
     EnvironmentUpdated,
 )
 from .message import HTTPExceptionResponse, Message
-from .photo import PhotoUploaded
+from .metrics import (
+    AccessLogWriterStats,
+    CacheStats,
+    DatabasePools,
+    PoolStatus,
+    ProcessPoolStats,
+)
+from .pagination import (
+    CountMode,
+    CountPage,
+    CountParams,
+    EstimatedCountPage,
+    EstimatedCountParams,
+)
+from .photo import (
+    PhotoEnrollment,
+    PhotoEnrollmentJob,
+    PhotoSize,
+    PhotoUploaded,
+)
+from .recognition import FaceMatch, FaceMatches
 from .token import Token, TokenData
 from .user import (
     ExistingUser,
     UserCreated,
     UserFilter,
+    UserImportReport,
+    UserImportResult,
+    UserImportRow,
     UserNameId,
     UserPatch,
     UserPublic,
     UserPublicWithUrl,
     UserSchema,
     UserSchemaPut,
+    UserSelection,
     UserUpdated,
 )
 
@@ -48,12 +85,44 @@ __all__ = [
     'UserUpdated',
     'UserNameId',
     'UserFilter',
+    'UserImportReport',
+    'UserImportResult',
+    'UserImportRow',
+    'UserSelection',
     'PhotoUploaded',
+    'PhotoEnrollment',
+    'PhotoEnrollmentJob',
     'EnvironmentCreated',
     'EnvironmentFilter',
+    'EnvironmentGrantsChanged',
     'EnvironmentPublicWithPhotoURL',
     'DeviceSchema',
     'UserPublicWithUrl',
     'UserSchemaPut',
     'EnvironmentLog',
+    'AccessLogFilter',
+    'AccessLogExportFilter',
+    'AccessLogWindow',
+    'UserAccessLog',
+    'UserAccessLogFilter',
+    'AccessTimeRange',
+    'AccessStatsFilter',
+    'AccessStatsPeriod',
+    'EnvironmentStats',
+    'EnvironmentPermission',
+    'DatabasePools',
+    'PoolStatus',
+    'CacheStats',
+    'ProcessPoolStats',
+    'AccessLogWriterStats',
+    'CountMode',
+    'CountPage',
+    'CountParams',
+    'EstimatedCountPage',
+    'EstimatedCountParams',
+    'PhotoSize',
+    'FaceMatch',
+    'FaceMatches',
+    'AccessDecision',
+    'AccessRequest',
 ]
@@ -0,0 +1,89 @@
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, Optional
+
+from fastapi import Query
+from pydantic import BaseModel, ConfigDict
+
+
+class AccessTimeRange(BaseModel):
+    # `from` is a keyword, so the fields are named `start` and `end`
+    model_config = ConfigDict(populate_by_name=True)
+
+    start: Annotated[
+        datetime | None,
+        Query(None, alias='from', description='Accesses at or after'),
+    ] = None
+    end: Annotated[
+        datetime | None,
+        Query(None, alias='to', description='Accesses before'),
+    ] = None
+
+
+class AccessLogWindow(AccessTimeRange):
+    allowed_access: Annotated[
+        bool | None,
+        Query(None, description='Only allowed or only denied accesses'),
+    ] = None
+
+
+class AccessLogFilter(AccessLogWindow):
+    user_id: Annotated[
+        int | None, Query(None, description='Filter by user id')
+    ] = None
+    user_name: Annotated[
+        str | None, Query(None, description='Filter by user name')
+    ] = None
+
+
+class AccessLogExportFilter(AccessLogFilter):
+    class Format(str, Enum):
+        csv = 'csv'
+        ndjson = 'ndjson'
+
+    format: Annotated[
+        Format,
+        Query(Format.csv, description='One row per line, as CSV or JSON'),
+    ] = Format.csv
+    environment_id: Annotated[
+        int | None, Query(None, description='Filter by environment id')
+    ] = None
+
+
+class UserAccessLogFilter(AccessLogWindow):
+    environment_id: Annotated[
+        int | None, Query(None, description='Filter by environment id')
+    ] = None
+    environment_name: Annotated[
+        str | None, Query(None, description='Filter by environment name')
+    ] = None
+
+
+class UserAccessLog(BaseModel):
+    environment_id: Optional[int]
+    environment_name: str
+    allowed_access: bool
+    access_time: datetime
+
+
+class AccessStatsFilter(AccessTimeRange):
+    class Granularity(str, Enum):
+        hour = 'hour'
+        day = 'day'
+
+    granularity: Annotated[
+        Granularity,
+        Query(Granularity.hour, description='Length of each period'),
+    ] = Granularity.hour
+
+
+class AccessStatsPeriod(BaseModel):
+    period: datetime
+    allowed: int
+    denied: int
+
+
+class EnvironmentStats(BaseModel):
+    environment_id: int
+    granularity: AccessStatsFilter.Granularity
+    items: list[AccessStatsPeriod]
@@ -8,3 +8,13 @@ class DeviceSchema(BaseModel):
     serial_number: str
     environment_id: int | None
     creator_admin_id: int
+
+
+class AccessRequest(BaseModel):
+    user_id: int
+
+
+class AccessDecision(BaseModel):
+    allowed: bool
+    user_id: int
+    environment_id: int
@@ -27,6 +27,7 @@ class EnvironmentPublic(EnvironmentSchema):
 
 class EnvironmentPublicWithPhotoURL(EnvironmentPublic):
     photo_url: str
+    thumbnail_url: str = ''
 
 
 class EnvironmentCreated(BaseModel):
@@ -60,6 +61,17 @@ class EnvironmentAdded(Message):
     environment_added: EnvironmentAux
 
 
+class EnvironmentPermission(BaseModel):
+    user_id: int
+    environment_id: int
+    allowed: bool
+
+
+class EnvironmentGrantsChanged(BaseModel):
+    matched: int
+    changed: int
+
+
 class EnvironmentFilter(BaseModel):
     class AscendingOrDescending(str, Enum):
         ascending = 'ascending'
@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+
+
+class PoolStatus(BaseModel):
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    avg_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class DatabasePools(BaseModel):
+    sync_pool: PoolStatus
+    async_pool: PoolStatus
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+
+
+class ProcessPoolStats(BaseModel):
+    max_workers: int
+    max_queue: int
+    pending: int
+    rejected: int
+
+
+class AccessLogWriterStats(BaseModel):
+    pending: int
+    max_pending: int
+    batch_size: int
+    flush_interval_seconds: float
+    queued: int
+    written: int
+    batches: int
+    spooled: int
+    replayed: int
+    rejected: int
+    held: int
+    spool_errors: int
+    dropped: int
+    backpressure_waits: int
+    last_flush_seconds: float
+    max_flush_seconds: float
@@ -0,0 +1,52 @@
+from enum import Enum
+from typing import Generic, TypeVar
+
+from fastapi import Query
+from fastapi_pagination import Page, Params
+
+T = TypeVar('T')
+
+
+class CountMode(str, Enum):
+    exact = 'exact'
+    estimate = 'estimate'
+    capped = 'capped'
+    none = 'none'
+
+
+class CountParams(Params):
+    count: CountMode = Query(
+        CountMode.exact,
+        description=(
+            'How `total` is computed: exact COUNT(*), planner estimate, '
+            'COUNT(*) stopped at `count_cap`, or not at all'
+        ),
+    )
+    count_cap: int = Query(
+        1000, ge=1, le=100_000, description='Upper bound of a capped count'
+    )
+
+
+class CountPage(Page[T], Generic[T]):
+    count: CountMode
+
+    __params_type__ = CountParams
+
+
+class EstimatedCountParams(CountParams):
+    count: CountMode = Query(
+        CountMode.estimate,
+        description=(
+            'How `total` is computed: exact COUNT(*), planner estimate, '
+            'COUNT(*) stopped at `count_cap`, or not at all'
+        ),
+    )
+
+
+class EstimatedCountPage(CountPage[T], Generic[T]):
+    """
+    A `CountPage` of a large table, whose `total` is estimated unless
+    an exact count is asked for.
+    """
+
+    __params_type__ = EstimatedCountParams
@@ -1,5 +1,47 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
 from .message import Message
 
 
 class PhotoUploaded(Message):
     photo_url: str
+
+
+class PhotoSize(str, Enum):
+    original = 'original'
+    thumbnail = 'thumbnail'
+    card = 'card'
+    recognition = 'recognition'
+
+
+class PhotoEnrollment(BaseModel):
+    class Status(str, Enum):
+        enrolled = 'enrolled'
+        unmatched = 'unmatched'
+        duplicate = 'duplicate'
+        invalid = 'invalid'
+
+    file: str
+    status: Status
+    user_id: Optional[int] = None
+    # None when face recognition is not available
+    face_indexed: Optional[bool] = None
+    detail: Optional[str] = None
+
+
+class PhotoEnrollmentJob(BaseModel):
+    class Status(str, Enum):
+        queued = 'queued'
+        running = 'running'
+        done = 'done'
+        failed = 'failed'
+
+    id: str
+    status: Status
+    total: int
+    processed: int = 0
+    enrolled: int = 0
+    files: list[PhotoEnrollment] = []
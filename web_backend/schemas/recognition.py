@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class FaceMatch(BaseModel):
+    user_id: int
+    distance: float
+
+
+class FaceMatches(BaseModel):
+    matches: list[FaceMatch]
@@ -3,12 +3,24 @@ from enum import Enum
 from typing import Annotated, Optional
 
 from fastapi import Query
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    EmailStr,
+    Field,
+    model_validator,
+)
 
 from web_backend.models.user import UserStatus
 
 from .message import Message
-from .schemas_utils import form_body_user_schema, form_body_user_schema_put
+from .schemas_utils import (
+    CPF_PATTERN,
+    PHONE_NUMBER_PATTERN,
+    email_address,
+    form_body_user_schema,
+    form_body_user_schema_put,
+)
 
 
 @form_body_user_schema
@@ -34,11 +46,9 @@ class UserPatch(BaseModel):
     name: str | None = None
     email: EmailStr | None = None
     date_of_birth: date | None = None
-    cpf: Annotated[
-        str | None, Field(pattern=r'^\d{3}\.\d{3}\.\d{3}-\d{2}$')
-    ] = None
+    cpf: Annotated[str | None, Field(pattern=CPF_PATTERN)] = None
     phone_number: Annotated[
-        str | None, Field(pattern=r'^\(\d{2}\) 9\d{4}-\d{4}$')
+        str | None, Field(pattern=PHONE_NUMBER_PATTERN)
     ] = None
     status: UserStatus | None = None
 
@@ -56,6 +66,7 @@ class UserPublic(UserSchema):
 
 class UserPublicWithUrl(UserPublic):
     photo_url: str
+    thumbnail_url: str = ''
 
 
 class UserCreated(Message):
@@ -100,3 +111,41 @@ class UserFilter(BaseModel):
         AscendingOrDescending | None,
         Query(None, description='Sort in ascending or descending order'),
     ]
+
+
+class UserSelection(BaseModel):
+    user_ids: Optional[list[int]] = None
+    filter: Optional[UserFilter] = None
+
+    @model_validator(mode='after')
+    def one_selection(self):
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError('Send either user_ids or filter')
+        return self
+
+
+class UserImportRow(BaseModel):
+    name: Annotated[str, Field(min_length=1)]
+    email: Annotated[str, AfterValidator(email_address)]
+    date_of_birth: date
+    cpf: Annotated[str, Field(pattern=CPF_PATTERN)]
+    phone_number: Annotated[str, Field(pattern=PHONE_NUMBER_PATTERN)]
+
+
+class UserImportResult(BaseModel):
+    class Status(str, Enum):
+        created = 'created'
+        invalid = 'invalid'
+        conflict = 'conflict'
+
+    row: int
+    status: Status
+    user_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class UserImportReport(BaseModel):
+    created: int
+    invalid: int
+    conflicts: int
+    rows: list[UserImportResult]
@@ -1,23 +1,56 @@
 from datetime import datetime, timedelta
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, NamedTuple
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
-from pwdlib import PasswordHash
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from zoneinfo import ZoneInfo
 
-from web_backend.database import Session, get_session
+from web_backend.database import get_async_session
 from web_backend.models import Admin
 from web_backend.schemas import TokenData
 from web_backend.settings import Settings
+from web_backend.utils.cache import TTLCache
+from web_backend.utils.password import (
+    hash_password,
+    pwd_context,
+    verify_and_update_password,
+)
+from web_backend.utils.process_pool import BoundedProcessPool
 
 settings = Settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
-pwd_context = PasswordHash.recommended()
+password_pool = BoundedProcessPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+# changes made by this process evict their entries at once; the ones
+# made by other processes, including deleting an admin or changing their
+# password, only take effect once the entry expires, so the TTL bounds
+# how long a revoked admin keeps access
+admin_cache = TTLCache(
+    maxsize=settings.ADMIN_CACHE_MAX_SIZE,
+    ttl=settings.ADMIN_CACHE_TTL_SECONDS,
+)
+
+
+class AdminPrincipal(NamedTuple):
+    """
+    What requests know about the authenticated admin. It is cached in
+    `admin_cache` instead of the mapped `Admin`, which is mutable and
+    would be shared between requests.
+    """
+
+    id: int
+    email: str
+    super_admin: bool
+    token_version: int
 
 
 def get_password_hash(password: str) -> str:
@@ -28,6 +61,18 @@ def verify_password(plain_password: str, hashe_password: str) -> bool:
     return pwd_context.verify(plain_password, hashe_password)
 
 
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return await password_pool.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(
     data: dict,
 ) -> str:
@@ -42,10 +87,10 @@ def create_access_token(
     return encoded_jwt
 
 
-def get_current_admin(
+async def get_current_admin(
     token: Annotated[str, Depends(oauth2_scheme)],
-    session: Annotated[Session, Depends(get_session)],
-) -> Admin:
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> AdminPrincipal:
     credentials_exception = HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
@@ -67,11 +112,68 @@ def get_current_admin(
     except DecodeError:
         raise credentials_exception
 
-    admin = session.scalar(
-        select(Admin).where(Admin.email == token_data.username)
-    )
+    admin = admin_cache.get(token_data.username)
+    if admin is None:
+        admin = await session.execute(
+            select(
+                Admin.id, Admin.email, Admin.super_admin, Admin.token_version
+            ).where(Admin.email == token_data.username)
+        )
+        admin = admin.one_or_none()
+
+        if not admin:
+            raise credentials_exception
 
-    if not admin:
+        admin = AdminPrincipal(*admin)
+        admin_cache.set(token_data.username, admin)
+
+    # tokens carry the version they were issued for
+    if payload.get('ver') != admin.token_version:
         raise credentials_exception
 
     return admin
+
+
+async def get_current_super_admin(
+    current_admin: Annotated[AdminPrincipal, Depends(get_current_admin)],
+) -> AdminPrincipal:
+    if not current_admin.super_admin:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
+        )
+
+    return current_admin
+
+
+@event.listens_for(Admin, 'before_update')
+def _bump_token_version(mapper, connection, target: Admin) -> None:
+    """
+    Revoke the tokens of an admin whose password changes. Rehashing the
+    same password at login goes around the ORM and keeps them.
+    """
+    if inspect(target).attrs.password.history.has_changes():
+        target.token_version += 1
+
+
+@event.listens_for(Admin, 'after_update')
+@event.listens_for(Admin, 'after_delete')
+def _evict_changed_admin(mapper, connection, target: Admin) -> None:
+    """
+    Drop a changed admin from `admin_cache`, under its old email too.
+
+    The entries are evicted again after commit, so a request that reads
+    the row between flush and commit cannot keep a stale copy cached.
+    """
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    for email in emails:
+        admin_cache.pop(email)
+
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('evicted_admin_emails', set()).update(emails)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_admins(session: Session) -> None:
+    for email in session.info.pop('evicted_admin_emails', ()):
+        admin_cache.pop(email)
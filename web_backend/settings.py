@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,3 +15,42 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     UPLOADS_DIR: str
+    PHOTO_MAX_BYTES: int = 5 * 1024 * 1024
+    PHOTO_DERIVATIVE_WORKERS: int = 2
+    PHOTO_DERIVATIVE_MAX_QUEUE: int = 64
+    PHOTO_ENROLLMENT_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    PHOTO_ENROLLMENT_MAX_JOBS: int = 100
+    PHOTO_ENROLLMENT_JOB_TTL_SECONDS: float = 3600
+    FACE_LANDMARKS_MODEL: Optional[str] = None
+    FACE_RECOGNITION_MODEL: Optional[str] = None
+    FACE_MATCH_THRESHOLD: float = 0.6
+    FACE_WORKERS: int = 1
+    FACE_MAX_QUEUE: int = 32
+    ACCESS_LOG_BATCH_SIZE: int = 500
+    ACCESS_LOG_FLUSH_INTERVAL_MS: int = 200
+    ACCESS_LOG_MAX_PENDING: int = 10000
+    ACCESS_LOG_SPOOL_PATH: str = 'access_log.spool'
+    ACCESS_LOG_PARTITIONS_AHEAD: int = 3
+    ACCESS_LOG_RETENTION_MONTHS: int = 0
+    ACCESS_LOG_DROP_EXPIRED: bool = True
+    ACCESS_LOG_MAINTENANCE_INTERVAL_SECONDS: float = 24 * 60 * 60
+    ACCESS_LOG_EXPORT_BATCH_SIZE: int = 5000
+    ACCESS_LOG_MAX_OFFSET: int = 10000
+    USER_IMPORT_MAX_BYTES: int = 64 * 1024 * 1024
+    FAST_JSON_RESPONSES: bool = False
+    THREAD_LIMITER_TOKENS: int = 40
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    ADMIN_CACHE_MAX_SIZE: int = 1024
+    ADMIN_CACHE_TTL_SECONDS: float = 60
+    PERMISSIONS_RELOAD_SECONDS: float = 60
+    FACE_GALLERY_RELOAD_SECONDS: float = 60
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
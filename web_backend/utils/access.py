@@ -0,0 +1,164 @@
+from http import HTTPStatus
+from uuid import uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    and_,
+    bindparam,
+    exists,
+    func,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.models import Device, Environment, User
+from web_backend.models.user import UserStatus
+from web_backend.models.user_environment import association_table
+from web_backend.utils.access_log_writer import access_log_writer
+
+
+def access_statement():
+    """
+    Builds the single statement behind an access check, taking the
+    `serial_number` of the device and the `user_id` at it as parameters.
+    It resolves the device to its environment and decides the attempt.
+    When access is allowed, it also updates the `last_access*` columns
+    of the user and of the environment in data-modifying CTEs, so the
+    check costs one round trip. The attempt is logged separately, by
+    `access_log_writer`.
+
+    Returns:
+        Select: One row of `environment_id` and the `access_log` columns
+        of the attempt, all NULL if the user does not exist. No row means
+        the device is unknown or unassigned.
+    """
+    device = (
+        select(
+            Environment.id,
+            Environment.name,
+            Environment.name_unaccent,
+        )
+        .join(Device, Device.environment_id == Environment.id)
+        .where(Device.serial_number == bindparam('serial_number'))
+        .cte('device')
+    )
+
+    granted = exists().where(
+        association_table.c.user_id == User.id,
+        association_table.c.enviroment_id == device.c.id,
+    )
+    attempt = (
+        select(
+            User.id.label('user_id'),
+            User.name.label('user_name'),
+            User.name_unaccent.label('user_name_unaccent'),
+            User.email.label('user_email'),
+            User.cpf.label('user_cpf'),
+            User.phone_number.label('user_phone_number'),
+            device.c.id.label('environment_id'),
+            device.c.name.label('environment_name'),
+            device.c.name_unaccent.label('environment_name_unaccent'),
+            and_(User.status == UserStatus.active, granted).label(
+                'allowed_access'
+            ),
+            func.now().label('access_time'),
+        )
+        .join(device, true())
+        .where(User.id == bindparam('user_id'))
+        .cte('attempt')
+    )
+
+    # updated_at is left alone: an access is not an edit of the row
+    user_access = (
+        update(User)
+        .where(User.id == attempt.c.user_id, attempt.c.allowed_access)
+        .values(
+            last_accessed_environment_id=attempt.c.environment_id,
+            last_accessed_environment_name=attempt.c.environment_name,
+            last_access_time=attempt.c.access_time,
+            updated_at=User.updated_at,
+        )
+    )
+    environment_access = (
+        update(Environment)
+        .where(
+            Environment.id == attempt.c.environment_id,
+            attempt.c.allowed_access,
+        )
+        .values(
+            last_accessed_by_user_id=attempt.c.user_id,
+            last_accessed_by_user_name=attempt.c.user_name,
+            last_access_time=attempt.c.access_time,
+            updated_at=Environment.updated_at,
+        )
+    )
+
+    return (
+        select(
+            device.c.id.label('environment_id'),
+            *(
+                column
+                for column in attempt.c
+                if column.key != 'environment_id'
+            ),
+        )
+        .select_from(device)
+        .outerjoin(attempt, true())
+        .add_cte(
+            user_access.cte('user_access'),
+            environment_access.cte('environment_access'),
+        )
+    )
+
+
+# built once: constructing it costs as much as running it
+ACCESS_CHECK = access_statement()
+
+
+async def check_access(
+    session: AsyncSession, serial_number: str, user_id: int
+) -> dict:
+    """
+    Decides whether a user may enter the environment of a device and
+    queues the attempt for the access log.
+
+    Args:
+        session (AsyncSession): The database session.
+        serial_number (str): The serial number of the device.
+        user_id (int): The ID of the user at the device.
+
+    Returns:
+        dict: The decision, with `allowed`, `user_id` and
+        `environment_id`.
+
+    Raises:
+        HTTPException: 404 if the device is unknown or not assigned to
+        an environment, or if the user does not exist.
+    """
+    result = await session.execute(
+        ACCESS_CHECK, {'serial_number': serial_number, 'user_id': user_id}
+    )
+    decision = result.one_or_none()
+    await session.commit()
+
+    if decision is not None and decision.allowed_access is not None:
+        access_log_writer.start(session.bind)
+        await access_log_writer.put({'id': uuid4(), **decision._asdict()})
+
+    if decision is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Device not found'
+        )
+
+    if decision.allowed_access is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+        )
+
+    return {
+        'allowed': decision.allowed_access,
+        'user_id': user_id,
+        'environment_id': decision.environment_id,
+    }
@@ -0,0 +1,59 @@
+from sqlalchemy import Select, desc
+from unidecode import unidecode
+
+from web_backend.models import AccessLog
+from web_backend.schemas import AccessLogFilter, AccessLogWindow
+
+# newest first: a backward scan of the (environment_id or user_id,
+# access_time, id) indexes
+NEWEST_FIRST = [desc(AccessLog.access_time), desc(AccessLog.id)]
+
+
+def filter_access_window(query: Select, filters: AccessLogWindow) -> Select:
+    """
+    Restricts an `AccessLog` query to the time window and outcome asked
+    for. The time bounds also let Postgres skip the monthly partitions
+    outside them.
+
+    Args:
+        query (Select): The query on `AccessLog`.
+        filters (AccessLogWindow): `from` (inclusive), `to` (exclusive)
+        and `allowed_access`, each optional.
+
+    Returns:
+        Select: The restricted query.
+    """
+    if filters.start:
+        query = query.where(AccessLog.access_time >= filters.start)
+    if filters.end:
+        query = query.where(AccessLog.access_time < filters.end)
+    if filters.allowed_access is not None:
+        query = query.where(AccessLog.allowed_access == filters.allowed_access)
+
+    return query
+
+
+def filter_access_log(query: Select, filters: AccessLogFilter) -> Select:
+    """
+    Restricts an `AccessLog` query to the time window, outcome and user
+    asked for.
+
+    Args:
+        query (Select): The query on `AccessLog`.
+        filters (AccessLogFilter): The window filters of
+        `filter_access_window`, plus `user_id` and `user_name`.
+
+    Returns:
+        Select: The restricted query.
+    """
+    query = filter_access_window(query, filters)
+    if filters.user_id is not None:
+        query = query.where(AccessLog.user_id == filters.user_id)
+    if filters.user_name:
+        query = query.where(
+            AccessLog.user_name_unaccent.ilike(
+                f'%{unidecode(filters.user_name)}%'
+            )
+        )
+
+    return query
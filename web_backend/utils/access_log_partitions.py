@@ -0,0 +1,228 @@
+"""
+Maintenance of the monthly partitions of `access_log`.
+
+Creates the partitions of the current month and of the
+`ACCESS_LOG_PARTITIONS_AHEAD` months after it, and detaches or drops the
+ones older than `ACCESS_LOG_RETENTION_MONTHS` (0 keeps every month).
+Runs after migrations, from the entrypoint:
+
+    python -m web_backend.utils.access_log_partitions
+
+and then every `ACCESS_LOG_MAINTENANCE_INTERVAL_SECONDS` from the app,
+in whichever worker takes the advisory lock first.
+"""
+
+import asyncio
+import logging
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from web_backend.settings import Settings
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = 'access_log_default'
+# arbitrary, only has to differ from other advisory locks on the database
+MAINTENANCE_LOCK = 7_413_290_117
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'access_log_p{month:%Y_%m}'
+
+
+def partition_months(connection: Connection) -> dict[date, str]:
+    """
+    Lists the monthly partitions of `access_log` by the month they hold,
+    recognizing them by name.
+    """
+    names = connection.scalars(
+        text(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            "WHERE pg_inherits.inhparent = 'access_log'::regclass"
+        )
+    )
+    months = {}
+    for name in names:
+        try:
+            year, month = name.removeprefix('access_log_p').split('_')
+            months[date(int(year), int(month), 1)] = name
+        except ValueError:
+            continue
+
+    return months
+
+
+def create_partition(connection: Connection, month: date) -> str:
+    """
+    Creates the partition of a month. Rows of that month already in the
+    default partition are moved into it, since Postgres refuses to
+    create a partition whose rows the default one holds.
+
+    Args:
+        connection (Connection): The connection, inside a transaction.
+        month (date): The first day of the month.
+
+    Returns:
+        str: The name of the partition.
+    """
+    name = partition_name(month)
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    create = text(
+        f'CREATE TABLE {name} PARTITION OF access_log '
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    )
+    stray = connection.scalar(
+        text(
+            f'SELECT EXISTS (SELECT FROM {DEFAULT_PARTITION} '
+            'WHERE access_time >= :start AND access_time < :end)'
+        ),
+        bounds,
+    )
+    if not stray:
+        connection.execute(create)
+        return name
+
+    connection.execute(
+        text(f'ALTER TABLE access_log DETACH PARTITION {DEFAULT_PARTITION}')
+    )
+    connection.execute(create)
+    connection.execute(
+        text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            'WHERE access_time >= :start AND access_time < :end '
+            'RETURNING *) '
+            'INSERT INTO access_log SELECT * FROM moved'
+        ),
+        bounds,
+    )
+    connection.execute(
+        text(
+            f'ALTER TABLE access_log ATTACH PARTITION {DEFAULT_PARTITION} '
+            'DEFAULT'
+        )
+    )
+
+    return name
+
+
+def maintain_partitions(
+    connection: Connection,
+    today: date | None = None,
+    months_ahead: int = settings.ACCESS_LOG_PARTITIONS_AHEAD,
+    retention_months: int = settings.ACCESS_LOG_RETENTION_MONTHS,
+    drop_expired: bool = settings.ACCESS_LOG_DROP_EXPIRED,
+) -> dict[str, list[str]]:
+    """
+    Creates missing partitions up to `months_ahead` months from `today`
+    and expires the ones past the retention period.
+
+    Args:
+        connection (Connection): The connection, inside a transaction.
+        today (date | None): Today's date; defaults to the current one.
+        months_ahead (int): How many months after the current one must
+        have a partition.
+        retention_months (int): How many months before the current one
+        are kept; 0 keeps every month.
+        drop_expired (bool): Whether expired partitions are dropped, or
+        only detached and left as standalone tables for archiving.
+
+    Returns:
+        dict[str, list[str]]: The names of the `created` and `expired`
+        partitions.
+    """
+    current = (today or date.today()).replace(day=1)
+    month = current
+    existing = partition_months(connection)
+    created, expired = [], []
+
+    while month <= add_months(current, months_ahead):
+        if month not in existing:
+            created.append(create_partition(connection, month))
+        month = add_months(month, 1)
+
+    if retention_months:
+        cutoff = add_months(current, -retention_months)
+        for month, name in sorted(existing.items()):
+            if month >= cutoff:
+                break
+            connection.execute(
+                text(f'ALTER TABLE access_log DETACH PARTITION {name}')
+            )
+            if drop_expired:
+                connection.execute(text(f'DROP TABLE {name}'))
+            expired.append(name)
+
+        connection.execute(
+            text(
+                f'DELETE FROM {DEFAULT_PARTITION} WHERE access_time < :cutoff'
+            ),
+            {'cutoff': cutoff},
+        )
+
+    return {'created': created, 'expired': expired}
+
+
+def try_maintain_partitions(
+    connection: Connection,
+) -> Optional[dict[str, list[str]]]:
+    """
+    Runs `maintain_partitions` unless another process is running it.
+
+    Args:
+        connection (Connection): The connection, inside a transaction;
+        the lock is held until it ends.
+
+    Returns:
+        Optional[dict[str, list[str]]]: What `maintain_partitions`
+        returns, or None if the lock was taken.
+    """
+    locked = connection.scalar(
+        text('SELECT pg_try_advisory_xact_lock(:key)'),
+        {'key': MAINTENANCE_LOCK},
+    )
+    if not locked:
+        return None
+
+    return maintain_partitions(connection)
+
+
+async def maintain_partitions_periodically(
+    bind: AsyncEngine, interval: float
+) -> None:
+    """
+    Runs `try_maintain_partitions` every `interval` seconds until
+    cancelled. The first run waits a whole interval, since the
+    entrypoint runs it on start.
+
+    Args:
+        bind (AsyncEngine): The engine to connect with.
+        interval (float): Seconds between runs.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with bind.begin() as connection:
+                result = await connection.run_sync(try_maintain_partitions)
+        except Exception:
+            # retried on the next run
+            logger.exception('Cannot maintain the access log partitions')
+        else:
+            if result is not None:
+                logger.info('Access log partitions maintained: %s', result)
+
+
+if __name__ == '__main__':
+    from web_backend.database import engine
+
+    with engine.begin() as connection:
+        print(try_maintain_partitions(connection))
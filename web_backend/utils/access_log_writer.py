@@ -0,0 +1,346 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import suppress
+from datetime import datetime
+from pathlib import Path
+from uuid import UUID
+
+import psycopg
+from anyio import to_thread
+from sqlalchemy import Connection, exc
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from web_backend.models import AccessLog
+from web_backend.settings import Settings
+from web_backend.utils.access_stats import ROLLUP_UPSERT, rollup
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+ACCESS_LOG_COLUMNS = [column.key for column in AccessLog.__table__.columns]
+ACCESS_LOG_COPY = (
+    f'COPY access_log ({", ".join(ACCESS_LOG_COLUMNS)}) FROM STDIN'
+)
+# rows carry their key, so writing a spooled row twice is harmless; the
+# key comes back only when the row was new
+ACCESS_LOG_INSERT = (
+    insert(AccessLog)
+    .on_conflict_do_nothing(
+        index_elements=[AccessLog.id, AccessLog.access_time]
+    )
+    .returning(AccessLog.id)
+)
+# errors that say nothing about the rows, only that the database is away;
+# COPY runs on the driver's connection, so its errors are not wrapped
+UNAVAILABLE = (
+    exc.OperationalError,
+    exc.InterfaceError,
+    exc.TimeoutError,
+    psycopg.OperationalError,
+    psycopg.InterfaceError,
+    OSError,
+)
+REJECTED = (exc.DBAPIError, psycopg.Error)
+
+
+def insert_access_logs(connection: Connection, rows: list[dict]) -> None:
+    """
+    Writes access log rows with COPY from synchronous code, such as the
+    seed script, and adds them to the hourly rollups.
+
+    Args:
+        connection (Connection): The connection to write on; the caller
+        commits.
+        rows (list[dict]): The rows, keyed by `access_log` column.
+    """
+    driver_connection = connection.connection.driver_connection
+    with (
+        driver_connection.cursor() as cursor,
+        cursor.copy(ACCESS_LOG_COPY) as copy,
+    ):
+        for row in rows:
+            copy.write_row([row[column] for column in ACCESS_LOG_COLUMNS])
+    if stats := rollup(rows):
+        connection.execute(ROLLUP_UPSERT, stats)
+
+
+def dump_row(row: dict) -> str:
+    return json.dumps({
+        **row,
+        'id': str(row['id']),
+        'access_time': row['access_time'].isoformat(),
+    })
+
+
+def load_row(line: str) -> dict:
+    row = json.loads(line)
+    row['id'] = UUID(row['id'])
+    row['access_time'] = datetime.fromisoformat(row['access_time'])
+    return row
+
+
+def append_rows(path: Path, rows: list[dict]) -> None:
+    with path.open('a', encoding='utf-8') as spool:
+        spool.writelines(f'{dump_row(row)}\n' for row in rows)
+        spool.flush()
+        os.fsync(spool.fileno())
+
+
+class AccessLogWriter:
+    """
+    Queues access log rows in memory and writes them in batches with
+    COPY, every `batch_size` rows or `flush_interval` seconds, whichever
+    comes first. Each batch is added to the hourly rollups in the same
+    transaction.
+
+    The queue holds at most `max_pending` rows: past that, `put` waits
+    for the next batch to be written, slowing producers down instead of
+    growing without bound. While the database is unavailable, batches are
+    appended to a spool file, shared by every process, and written after
+    the next batch that succeeds; the process replaying it moves it aside
+    first, so rows spooled meanwhile wait for the next replay. Rows the
+    database rejects, such as one for a user deleted before its batch was
+    written, go to `<spool>.rejected` without losing the rest of their
+    batch. Batches the spool file cannot take either are held in memory,
+    up to `max_pending` rows, and written first with the next batch.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        spool_path: str,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spool_path = Path(spool_path)
+        self.rejected_path = Path(f'{spool_path}.rejected')
+        self.bind = None
+        self._queue = None
+        self._task = None
+        self._held = []
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.spool_errors = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def start(self, bind: AsyncEngine) -> None:
+        """
+        Starts writing on `bind` from the running event loop, unless
+        already started.
+        """
+        if self._task is None or self._task.done():
+            self.bind = bind
+            if self._queue is None:
+                self._queue = asyncio.Queue(self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, row: dict) -> None:
+        """
+        Queues a row, waiting while `max_pending` rows are queued.
+
+        Args:
+            row (dict): The row, keyed by `access_log` column.
+        """
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(row)
+        self.queued += 1
+
+    async def flush(self) -> None:
+        """
+        Waits until every row queued so far was written or spooled.
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """
+        Writes what is queued and stops, so it can be started again on
+        another event loop.
+        """
+        if self._task is None:
+            return
+
+        await self.flush()
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = self._queue = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), remaining)
+                    )
+                except TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            except Exception:
+                # later batches are still written, whatever failed here
+                logger.exception('Cannot write %d access log rows', len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list[dict]) -> None:
+        start = time.perf_counter()
+        batch, self._held = self._held + batch, []
+        try:
+            written = await self._write(batch)
+        except UNAVAILABLE:
+            await self._spool(batch)
+        else:
+            self.written += written
+            self.batches += 1
+            if self.spool_path.exists() or self.replay_path.exists():
+                await self._replay()
+        finally:
+            self.last_flush_seconds = time.perf_counter() - start
+            self.max_flush_seconds = max(
+                self.max_flush_seconds, self.last_flush_seconds
+            )
+
+    async def _spool(self, batch: list[dict]) -> None:
+        try:
+            await to_thread.run_sync(append_rows, self.spool_path, batch)
+        except OSError:
+            logger.exception(
+                'Cannot spool %d access log rows to %s; holding them',
+                len(batch),
+                self.spool_path,
+            )
+            self.spool_errors += 1
+            # the oldest rows go first once the hold is full
+            overflow = max(len(batch) - self.max_pending, 0)
+            self._held = batch[overflow:]
+            self.dropped += overflow
+        else:
+            self.spooled += len(batch)
+
+    async def _write(self, rows: list[dict]) -> int:
+        try:
+            async with self.bind.begin() as connection:
+                raw_connection = await connection.get_raw_connection()
+                async with (
+                    raw_connection.driver_connection.cursor() as cursor,
+                    cursor.copy(ACCESS_LOG_COPY) as copy,
+                ):
+                    for row in rows:
+                        await copy.write_row([
+                            row[column] for column in ACCESS_LOG_COLUMNS
+                        ])
+                if stats := rollup(rows):
+                    await connection.execute(ROLLUP_UPSERT, stats)
+            return len(rows)
+        except UNAVAILABLE:
+            raise
+        except REJECTED:
+            # retried one row at a time, skipping rows already written
+            rejected = []
+            for row in rows:
+                try:
+                    async with self.bind.begin() as connection:
+                        inserted = await connection.scalar(
+                            ACCESS_LOG_INSERT, row
+                        )
+                        # counted once, even when replayed
+                        stats = rollup([row]) if inserted else []
+                        if stats:
+                            await connection.execute(ROLLUP_UPSERT, stats)
+                except UNAVAILABLE:
+                    raise
+                except REJECTED:
+                    rejected.append(row)
+
+            if rejected:
+                await to_thread.run_sync(
+                    append_rows, self.rejected_path, rejected
+                )
+                self.rejected += len(rejected)
+
+            return len(rows) - len(rejected)
+
+    @property
+    def replay_path(self) -> Path:
+        return Path(f'{self.spool_path}.{os.getpid()}')
+
+    async def _replay(self) -> None:
+        replay_path = self.replay_path
+
+        def read_spool() -> list[dict]:
+            if not replay_path.exists():
+                os.replace(self.spool_path, replay_path)
+            with replay_path.open(encoding='utf-8') as spool:
+                return [load_row(line) for line in spool if line.strip()]
+
+        try:
+            rows = await to_thread.run_sync(read_spool)
+        except FileNotFoundError:
+            return  # taken by another process
+
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                await self._write(rows[start : start + self.batch_size])
+            replay_path.unlink()
+        except UNAVAILABLE:
+            # left in place; the rows already written are skipped next time
+            logger.warning('Cannot replay %s yet', replay_path)
+            return
+
+        self.replayed += len(rows)
+
+    def stats(self) -> dict:
+        return {
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'max_pending': self.max_pending,
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval,
+            'queued': self.queued,
+            'written': self.written,
+            'batches': self.batches,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'rejected': self.rejected,
+            'held': len(self._held),
+            'spool_errors': self.spool_errors,
+            'dropped': self.dropped,
+            'backpressure_waits': self.backpressure_waits,
+            'last_flush_seconds': self.last_flush_seconds,
+            'max_flush_seconds': self.max_flush_seconds,
+        }
+
+
+access_log_writer = AccessLogWriter(
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_MS / 1000,
+    max_pending=settings.ACCESS_LOG_MAX_PENDING,
+    spool_path=settings.ACCESS_LOG_SPOOL_PATH,
+)
@@ -0,0 +1,232 @@
+"""
+Hourly rollups of `access_log`, in `access_stats_hourly`.
+
+`access_log_writer` adds every batch it writes to the rollups, in the
+same transaction, so they never drift from the raw log. Logs written any
+other way, and the history from before the rollups existed, are counted
+by the backfill, and the check compares both:
+
+    python -m web_backend.utils.access_stats backfill [--from] [--to]
+    python -m web_backend.utils.access_stats check [--from] [--to]
+"""
+
+import argparse
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import Connection, and_, delete, func, or_, select, true
+from sqlalchemy.dialects.postgresql import insert
+
+from web_backend.models import AccessLog, AccessStatsHourly
+
+_insert = insert(AccessStatsHourly)
+# adds to the hour instead of replacing it, so concurrent writers and the
+# backfill all count
+ROLLUP_UPSERT = _insert.on_conflict_do_update(
+    index_elements=[AccessStatsHourly.environment_id, AccessStatsHourly.hour],
+    set_={
+        'allowed': AccessStatsHourly.allowed + _insert.excluded.allowed,
+        'denied': AccessStatsHourly.denied + _insert.excluded.denied,
+    },
+)
+
+
+def truncate_hour(moment: datetime) -> datetime:
+    # `access_time` has no time zone, and Postgres drops the offset of
+    # what is written to it, so the hour is the wall-clock one
+    return moment.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def rollup(rows: list[dict]) -> list[dict]:
+    """
+    Counts access log rows by environment and hour.
+
+    Args:
+        rows (list[dict]): The rows, keyed by `access_log` column.
+
+    Returns:
+        list[dict]: `access_stats_hourly` rows, ordered by key so that
+        concurrent writers lock them in the same order.
+    """
+    counts = Counter(
+        (
+            row['environment_id'],
+            truncate_hour(row['access_time']),
+            bool(row['allowed_access']),
+        )
+        for row in rows
+        if row['environment_id'] is not None
+    )
+    hours = sorted({(key[0], key[1]) for key in counts})
+
+    return [
+        {
+            'environment_id': environment_id,
+            'hour': hour,
+            'allowed': counts[environment_id, hour, True],
+            'denied': counts[environment_id, hour, False],
+        }
+        for environment_id, hour in hours
+    ]
+
+
+def log_counts(start: datetime | None, end: datetime | None):
+    hour = func.date_trunc('hour', AccessLog.access_time)
+    query = select(
+        AccessLog.environment_id.label('environment_id'),
+        hour.label('hour'),
+        func.count().filter(AccessLog.allowed_access).label('allowed'),
+        func.count().filter(~AccessLog.allowed_access).label('denied'),
+    ).where(AccessLog.environment_id.is_not(None))
+    if start:
+        query = query.where(AccessLog.access_time >= start)
+    if end:
+        query = query.where(AccessLog.access_time < end)
+
+    return query.group_by(AccessLog.environment_id, hour)
+
+
+def hour_range(column, start: datetime | None, end: datetime | None):
+    conditions = []
+    if start:
+        conditions.append(column >= start)
+    if end:
+        conditions.append(column < end)
+    return and_(true(), *conditions)
+
+
+def backfill_stats(
+    connection: Connection,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> int:
+    """
+    Recounts the rollups of the hours from `start` to `end` from the raw
+    log, replacing what they held.
+
+    Args:
+        connection (Connection): The connection, inside a transaction.
+        start (datetime | None): First hour; truncated to the hour.
+        Defaults to the oldest log.
+        end (datetime | None): Hour after the last one; truncated to the
+        hour. Defaults to the newest log.
+
+    Returns:
+        int: How many environment-hours were written.
+    """
+    start = start and truncate_hour(start)
+    end = end and truncate_hour(end)
+    connection.execute(
+        delete(AccessStatsHourly).where(
+            hour_range(AccessStatsHourly.hour, start, end)
+        )
+    )
+    counts = log_counts(start, end)
+    written = connection.scalars(
+        ROLLUP_UPSERT.from_select(
+            ['environment_id', 'hour', 'allowed', 'denied'], counts
+        ).returning(AccessStatsHourly.environment_id)
+    )
+
+    return len(written.all())
+
+
+def check_stats(
+    connection: Connection,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[dict]:
+    """
+    Compares the rollups of the hours from `start` to `end` against the
+    raw log.
+
+    Args:
+        connection (Connection): The connection.
+        start (datetime | None): First hour; truncated to the hour.
+        end (datetime | None): Hour after the last one; truncated to the
+        hour.
+
+    Returns:
+        list[dict]: The environment-hours that differ, with the
+        `expected` (raw log) and `actual` (rollup) allowed and denied
+        counts; empty when the rollups are consistent.
+    """
+    start = start and truncate_hour(start)
+    end = end and truncate_hour(end)
+    expected = log_counts(start, end).subquery()
+    actual = (
+        select(AccessStatsHourly)
+        .where(hour_range(AccessStatsHourly.hour, start, end))
+        .subquery()
+    )
+    environment_id = func.coalesce(
+        expected.c.environment_id, actual.c.environment_id
+    )
+    hour = func.coalesce(expected.c.hour, actual.c.hour)
+    differences = connection.execute(
+        select(
+            environment_id.label('environment_id'),
+            hour.label('hour'),
+            func.coalesce(expected.c.allowed, 0).label('expected_allowed'),
+            func.coalesce(expected.c.denied, 0).label('expected_denied'),
+            func.coalesce(actual.c.allowed, 0).label('actual_allowed'),
+            func.coalesce(actual.c.denied, 0).label('actual_denied'),
+        )
+        .select_from(
+            expected.join(
+                actual,
+                and_(
+                    expected.c.environment_id == actual.c.environment_id,
+                    expected.c.hour == actual.c.hour,
+                ),
+                full=True,
+            )
+        )
+        .where(
+            or_(
+                func.coalesce(expected.c.allowed, 0)
+                != func.coalesce(actual.c.allowed, 0),
+                func.coalesce(expected.c.denied, 0)
+                != func.coalesce(actual.c.denied, 0),
+            )
+        )
+        .order_by(hour, environment_id)
+    )
+
+    return [
+        {
+            'environment_id': row.environment_id,
+            'hour': row.hour,
+            'expected': {
+                'allowed': row.expected_allowed,
+                'denied': row.expected_denied,
+            },
+            'actual': {
+                'allowed': row.actual_allowed,
+                'denied': row.actual_denied,
+            },
+        }
+        for row in differences
+    ]
+
+
+if __name__ == '__main__':
+    from web_backend.database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('command', choices=['backfill', 'check'])
+    parser.add_argument('--from', dest='start', type=datetime.fromisoformat)
+    parser.add_argument('--to', dest='end', type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    if args.command == 'backfill':
+        with engine.begin() as connection:
+            written = backfill_stats(connection, args.start, args.end)
+        print(f'{written} environment-hours written')
+    else:
+        with engine.connect() as connection:
+            differences = check_stats(connection, args.start, args.end)
+        for difference in differences:
+            print(difference)
+        print(f'{len(differences)} environment-hours differ')
+        raise SystemExit(1 if differences else 0)
@@ -0,0 +1,195 @@
+import os
+from http import HTTPStatus
+from pathlib import Path
+from uuid import uuid4
+
+import anyio
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+from web_backend.models import Photo
+from web_backend.schemas import PhotoSize
+from web_backend.settings import Settings
+from web_backend.utils.process_pool import BoundedProcessPool
+
+settings = Settings()
+
+# longest side, in pixels, of each derivative, from largest to smallest
+DERIVATIVE_SIDES = {
+    PhotoSize.recognition: 1024,
+    PhotoSize.card: 480,
+    PhotoSize.thumbnail: 160,
+}
+JPEG_QUALITY = 85
+
+derivative_pool = BoundedProcessPool(
+    max_workers=settings.PHOTO_DERIVATIVE_WORKERS,
+    max_queue=settings.PHOTO_DERIVATIVE_MAX_QUEUE,
+)
+
+
+def render_derivatives(source: str, targets: dict[str, int]) -> None:
+    """
+    Decodes a photo once and writes a JPEG of each requested size,
+    shrinking the largest one into the next. Runs in `derivative_pool`.
+
+    Args:
+        source (str): Path of the original photo.
+        targets (dict[str, int]): Longest side of each file to write,
+        keyed by its path.
+
+    Raises:
+        OSError: If the original is missing or cannot be decoded.
+    """
+    targets = sorted(targets.items(), key=lambda target: -target[1])
+    largest = targets[0][1]
+
+    with Image.open(source) as original:
+        # lets JPEGs decode straight to a reduced scale
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    for destination, max_side in targets:
+        image.thumbnail((max_side, max_side))
+        directory, name = os.path.split(destination)
+        temp_path = os.path.join(directory, f'.{name}.{uuid4().hex}.tmp')
+        try:
+            image.save(temp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+            os.replace(temp_path, destination)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+
+def original_path(photo: Photo) -> anyio.Path:
+    """
+    Locates the original of a photo. Like its derivatives, it is named
+    after its hash, so a registry entry only ever finds the bytes it
+    describes, even while the photo is being replaced.
+
+    Args:
+        photo (Photo): The registry entry of the original.
+
+    Returns:
+        anyio.Path: `UPLOADS_DIR/{kind}/{owner_id}.{version}{extension}`.
+    """
+    return (
+        anyio.Path(settings.UPLOADS_DIR) / photo.kind.value / photo.file_name
+    )
+
+
+def derivative_name(owner_id: int, size: PhotoSize, version: str) -> str:
+    return f'{owner_id}.{size.value}.{version}.jpg'
+
+
+def derivative_path(photo: Photo, size: PhotoSize) -> anyio.Path:
+    """
+    Locates a derivative next to its original. The name carries the
+    original's hash, so a replaced photo never shares derivatives with
+    the one before it.
+
+    Args:
+        photo (Photo): The registry entry of the original.
+        size (PhotoSize): The derivative's size.
+
+    Returns:
+        anyio.Path: `UPLOADS_DIR/{kind}/{owner_id}.{size}.{version}.jpg`.
+    """
+    return (
+        anyio.Path(settings.UPLOADS_DIR)
+        / photo.kind.value
+        / derivative_name(photo.owner_id, size, photo.version)
+    )
+
+
+async def render_missing(photo: Photo, sizes: list[PhotoSize]) -> None:
+    """
+    Renders the derivatives of a photo that are not on disk yet.
+
+    Args:
+        photo (Photo): The registry entry of the original.
+        sizes (list[PhotoSize]): The derivatives wanted.
+
+    Raises:
+        HTTPException: 404 if the original is missing, 422 if it cannot
+        be decoded, 503 if `derivative_pool` is saturated.
+    """
+    targets = {}
+    for size in sizes:
+        path = derivative_path(photo, size)
+        if not await path.exists():
+            targets[str(path)] = DERIVATIVE_SIDES[size]
+
+    if not targets:
+        return
+
+    try:
+        await derivative_pool.run(
+            render_derivatives, str(original_path(photo)), targets
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Photo not found'
+        ) from None
+    except (OSError, Image.DecompressionBombError):
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='Photo cannot be resized',
+        ) from None
+
+
+async def get_photo_path(photo: Photo, size: PhotoSize) -> anyio.Path:
+    """
+    Returns the file of a photo in the requested size, rendering the
+    derivative first if it is missing.
+
+    Args:
+        photo (Photo): The registry entry of the original.
+        size (PhotoSize): The size wanted.
+
+    Returns:
+        anyio.Path: The path of the file to serve.
+
+    Raises:
+        HTTPException: 404 if the original is missing, 422 if it cannot
+        be decoded, 503 if `derivative_pool` is saturated.
+    """
+    if size == PhotoSize.original:
+        path = original_path(photo)
+        if not await path.exists():
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail='Photo not found'
+            )
+        return path
+
+    await render_missing(photo, [size])
+
+    return derivative_path(photo, size)
+
+
+async def generate_derivatives(photo: Photo) -> None:
+    """
+    Renders every derivative of a newly uploaded photo. Meant to run
+    after the response is sent; whatever fails here is rendered on its
+    first request instead.
+
+    Args:
+        photo (Photo): The registry entry of the original.
+    """
+    try:
+        await render_missing(photo, list(DERIVATIVE_SIDES))
+    except HTTPException:
+        pass
+
+
+async def remove_photo_files(photo: Photo) -> None:
+    """
+    Deletes the original and derivatives of a replaced photo. Meant to
+    run once the registry entry that replaced it is committed.
+
+    Args:
+        photo (Photo): The registry entry of the replaced original.
+    """
+    await original_path(photo).unlink(missing_ok=True)
+    for size in DERIVATIVE_SIDES:
+        await derivative_path(photo, size).unlink(missing_ok=True)
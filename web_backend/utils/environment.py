@@ -1,13 +1,13 @@
 from uuid import UUID
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from web_backend.models import Device, Environment
 
 
-def relate_devices_to_environment(
-    session: Session,
+async def relate_devices_to_environment(
+    session: AsyncSession,
     environment_db: Environment,
     devices_ids: list[UUID] | None = None,
 ) -> list[Device] | None:
@@ -15,16 +15,30 @@ def relate_devices_to_environment(
     Take a list of devices_ids and relate the
     valid ones to the specified environment.
 
+    Devices of the environment not in the list are released. Only the
+    devices involved are written, without loading the ones it has.
+
     Return a list of added devices.
     """
     if not devices_ids:
         return None
 
-    devices_to_relate = session.scalars(
-        select(Device).where(Device.id.in_(devices_ids))
+    await session.execute(
+        update(Device)
+        .where(
+            Device.environment_id == environment_db.id,
+            Device.id.not_in(devices_ids),
+        )
+        .values(environment_id=None)
+    )
+    devices_to_relate = (
+        await session.scalars(
+            update(Device)
+            .where(Device.id.in_(devices_ids))
+            .values(environment_id=environment_db.id)
+            .returning(Device),
+            execution_options={'populate_existing': True},
+        )
     ).all()
 
-    environment_db.devices = devices_to_relate
-    session.commit()
-
     return devices_to_relate
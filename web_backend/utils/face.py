@@ -0,0 +1,255 @@
+import io
+from functools import cache
+from http import HTTPStatus
+from typing import Optional
+
+import anyio
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from web_backend.models import FaceEmbedding, Photo
+from web_backend.schemas import PhotoSize
+from web_backend.settings import Settings
+from web_backend.utils.derivatives import DERIVATIVE_SIDES, get_photo_path
+from web_backend.utils.gallery import FaceGallery
+from web_backend.utils.process_pool import BoundedProcessPool
+
+try:
+    from dlib import (
+        face_recognition_model_v1,
+        get_frontal_face_detector,
+        shape_predictor,
+    )
+except ImportError:  # dlib is optional, see the README
+    face_recognition_model_v1 = None
+
+settings = Settings()
+
+face_pool = BoundedProcessPool(
+    max_workers=settings.FACE_WORKERS,
+    max_queue=settings.FACE_MAX_QUEUE,
+)
+gallery = FaceGallery()
+load_lock = anyio.Lock()
+
+
+def face_recognition_available() -> bool:
+    return bool(
+        face_recognition_model_v1 is not None
+        and settings.FACE_LANDMARKS_MODEL
+        and settings.FACE_RECOGNITION_MODEL
+    )
+
+
+@cache
+def face_models() -> tuple:
+    # loaded once per worker process
+    return (
+        get_frontal_face_detector(),
+        shape_predictor(settings.FACE_LANDMARKS_MODEL),
+        face_recognition_model_v1(settings.FACE_RECOGNITION_MODEL),
+    )
+
+
+def compute_descriptor(image: str | bytes) -> Optional[bytes]:
+    """
+    Computes the 128-d dlib descriptor of the largest face in a photo.
+    Runs in `face_pool`.
+
+    Args:
+        image (str | bytes): Path or content of the photo. It is scaled
+        down to the recognition size first.
+
+    Returns:
+        Optional[bytes]: The descriptor as float32 bytes, or None if no
+        face was found.
+    """
+    side = DERIVATIVE_SIDES[PhotoSize.recognition]
+    source = io.BytesIO(image) if isinstance(image, bytes) else image
+    with Image.open(source) as original:
+        original.draft('RGB', (side, side))
+        rgb = ImageOps.exif_transpose(original).convert('RGB')
+    rgb.thumbnail((side, side))
+    pixels = np.asarray(rgb)
+
+    detector, predictor, encoder = face_models()
+    faces = detector(pixels, 1)
+    if not faces:
+        return None
+
+    face = max(faces, key=lambda rectangle: rectangle.area())
+    descriptor = encoder.compute_face_descriptor(
+        pixels, predictor(pixels, face)
+    )
+
+    return np.asarray(descriptor, np.float32).tobytes()
+
+
+async def extract_descriptor(image: str | bytes) -> Optional[np.ndarray]:
+    """
+    Computes a face descriptor in `face_pool`.
+
+    Args:
+        image (str | bytes): Path or content of the photo.
+
+    Returns:
+        Optional[np.ndarray]: The descriptor, or None if the photo has no
+        face.
+
+    Raises:
+        HTTPException: 422 if the photo cannot be decoded, 503 if face
+        recognition is not configured or `face_pool` is saturated.
+    """
+    if not face_recognition_available():
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Face recognition is not available',
+        )
+
+    try:
+        descriptor = await face_pool.run(compute_descriptor, image)
+    except (OSError, Image.DecompressionBombError):
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='Photo cannot be decoded',
+        ) from None
+
+    if descriptor is None:
+        return None
+
+    return np.frombuffer(descriptor, np.float32)
+
+
+def gallery_stale() -> bool:
+    return (
+        not gallery.loaded
+        or gallery.age() > settings.FACE_GALLERY_RELOAD_SECONDS
+    )
+
+
+async def load_gallery(session: AsyncSession) -> FaceGallery:
+    """
+    Fills `gallery` from the database the first time it is needed, and
+    again once it is older than `FACE_GALLERY_RELOAD_SECONDS`, which
+    bounds how long enrollments made by other processes go unseen.
+
+    Args:
+        session (AsyncSession): The database session.
+
+    Returns:
+        FaceGallery: The loaded gallery.
+    """
+    if not gallery_stale():
+        return gallery
+
+    async with load_lock:
+        if gallery_stale():
+            rows = (
+                await session.execute(
+                    select(FaceEmbedding.user_id, FaceEmbedding.descriptor)
+                )
+            ).all()
+            gallery.load(
+                [user_id for user_id, _ in rows],
+                b''.join(descriptor for _, descriptor in rows),
+            )
+
+    return gallery
+
+
+async def confirm_matches(
+    session: AsyncSession,
+    descriptor: np.ndarray,
+    matches: list[tuple[int, float]],
+) -> list[tuple[int, float]]:
+    """
+    Checks matches found in `gallery` against the stored descriptors,
+    which other processes may have replaced or deleted since it was
+    loaded, and corrects `gallery` on the way.
+
+    Args:
+        session (AsyncSession): The database session.
+        descriptor (np.ndarray): The probe's face descriptor.
+        matches (list[tuple[int, float]]): User IDs and distances, as
+        returned by `FaceGallery.search`.
+
+    Returns:
+        list[tuple[int, float]]: The users still enrolled, with their
+        distances to their stored descriptors, nearest first.
+    """
+    if not matches:
+        return []
+
+    rows = await session.execute(
+        select(FaceEmbedding.user_id, FaceEmbedding.descriptor).where(
+            FaceEmbedding.user_id.in_([user_id for user_id, _ in matches])
+        )
+    )
+    stored = {
+        user_id: np.frombuffer(value, np.float32) for user_id, value in rows
+    }
+    probe = np.asarray(descriptor, np.float32)
+
+    confirmed = []
+    for user_id, _ in matches:
+        if user_id not in stored:
+            gallery.remove(user_id)
+            continue
+
+        gallery.add(user_id, stored[user_id])
+        distance = float(np.linalg.norm(stored[user_id] - probe))
+        confirmed.append((user_id, distance))
+
+    return sorted(confirmed, key=lambda match: match[1])
+
+
+async def index_face(bind: AsyncEngine, photo: Photo) -> None:
+    """
+    Computes and stores the face descriptor of a user's new photo and
+    updates `gallery`. Meant to run after the response is sent, once the
+    photo's recognition-size derivative exists; a photo without a face
+    removes the user from the gallery.
+
+    Args:
+        bind (AsyncEngine): The engine to open a session on.
+        photo (Photo): The registry entry of the user's photo.
+    """
+    if not face_recognition_available():
+        return
+
+    try:
+        path = await get_photo_path(photo, PhotoSize.recognition)
+        descriptor = await extract_descriptor(str(path))
+    except HTTPException:
+        return
+
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        if descriptor is None:
+            await session.execute(
+                delete(FaceEmbedding).where(
+                    FaceEmbedding.user_id == photo.owner_id
+                )
+            )
+        else:
+            values = {
+                'photo_version': photo.version,
+                'descriptor': descriptor.tobytes(),
+            }
+            await session.execute(
+                insert(FaceEmbedding)
+                .values(user_id=photo.owner_id, **values)
+                .on_conflict_do_update(
+                    index_elements=[FaceEmbedding.user_id],
+                    set_={**values, 'updated_at': func.now()},
+                )
+            )
+        await session.commit()
+
+    if descriptor is None:
+        gallery.remove(photo.owner_id)
+    else:
+        gallery.add(photo.owner_id, descriptor)
@@ -0,0 +1,71 @@
+"""
+Fast JSON responses for list and detail endpoints, enabled with
+`FAST_JSON_RESPONSES`.
+
+Rows are selected as mappings of the columns their schema returns and
+serialized as they are with orjson, without building ORM instances or
+validating them again on the way out.
+"""
+
+from math import ceil
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from web_backend.schemas import CountMode
+
+
+class RowSerializer:
+    """
+    Serializes rows, and pages of rows, shaped like the items of a
+    response schema.
+
+    Args:
+        schema (type[BaseModel]): The schema of one item.
+        entity (type): The mapped class the rows are selected from; its
+        attributes named like the schema's fields are the columns.
+    """
+
+    def __init__(self, schema: type[BaseModel], entity: type) -> None:
+        self.columns = [
+            getattr(entity, name)
+            for name in schema.model_fields
+            if hasattr(entity, name)
+        ]
+
+    def project(self, query: Select) -> Select:
+        """
+        Narrows a query on the entity to the schema's columns, keeping
+        its filters and ordering.
+        """
+        return query.with_only_columns(*self.columns)
+
+    def row_response(self, row: dict[str, Any]) -> Response:
+        return self._response(row)
+
+    def page_response(
+        self,
+        items: list[dict[str, Any]],
+        total: Optional[int],
+        page: int,
+        size: int,
+        count: CountMode,
+    ) -> Response:
+        """
+        Builds the response of a `CountPage`, with the same fields.
+        """
+        return self._response({
+            'items': items,
+            'total': total,
+            'page': page,
+            'size': size,
+            'pages': ceil(total / size) if total is not None else None,
+            'count': count,
+        })
+
+    @staticmethod
+    def _response(content: dict) -> Response:
+        return Response(orjson.dumps(content), media_type='application/json')
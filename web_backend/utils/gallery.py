@@ -0,0 +1,140 @@
+import time
+
+import numpy as np
+
+DESCRIPTOR_SIZE = 128
+
+
+class FaceGallery:
+    """
+    Face descriptors of every enrolled user kept in one contiguous
+    float32 matrix, so that a probe is compared with the whole gallery
+    in a single matrix-vector product.
+
+    Rows are packed: removing a user moves the last row into its place.
+    Capacity doubles as users are added, keeping additions amortized
+    O(1) without reallocating on every enrollment.
+
+    Like `PermissionMatrix`, it only sees the enrollments of other
+    processes on the next `load`, so its matches are candidates to be
+    confirmed against the database.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._set_rows(np.empty(0, np.int64), np.empty((0, DESCRIPTOR_SIZE)))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.rows
+
+    def _set_rows(self, ids: np.ndarray, descriptors: np.ndarray) -> None:
+        self.ids = np.array(ids, np.int64)
+        self.matrix = np.array(descriptors, np.float32)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.rows = {int(user_id): row for row, user_id in enumerate(ids)}
+        self.size = len(self.ids)
+
+    def _grow(self) -> None:
+        capacity = max(1024, 2 * len(self.ids))
+        for name in ('ids', 'matrix', 'norms'):
+            current = getattr(self, name)
+            grown = np.zeros((capacity, *current.shape[1:]), current.dtype)
+            grown[: self.size] = current[: self.size]
+            setattr(self, name, grown)
+
+    def load(self, ids: list[int], descriptors: bytes) -> None:
+        """
+        Replaces the whole gallery.
+
+        Args:
+            ids (list[int]): The users' IDs.
+            descriptors (bytes): Their descriptors, concatenated in the
+            same order.
+        """
+        matrix = np.frombuffer(descriptors, np.float32)
+        self._set_rows(
+            np.array(ids, np.int64), matrix.reshape(-1, DESCRIPTOR_SIZE)
+        )
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    def age(self) -> float:
+        """
+        Seconds since the gallery was last loaded from the database.
+        """
+        return time.monotonic() - self.loaded_at
+
+    def add(self, user_id: int, descriptor: np.ndarray) -> None:
+        """
+        Adds a user's descriptor, replacing the one they had.
+
+        Args:
+            user_id (int): The user's ID.
+            descriptor (np.ndarray): The 128-d face descriptor.
+        """
+        row = self.rows.get(user_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[user_id] = row
+            self.ids[row] = user_id
+
+        self.matrix[row] = descriptor
+        self.norms[row] = self.matrix[row] @ self.matrix[row]
+
+    def remove(self, user_id: int) -> None:
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+
+        last = self.size - 1
+        if row != last:
+            self.ids[row] = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.norms[row] = self.norms[last]
+            self.rows[int(self.ids[row])] = row
+        self.size = last
+
+    def search(
+        self, descriptor: np.ndarray, limit: int = 1
+    ) -> list[tuple[int, float]]:
+        """
+        Finds the users whose descriptors are nearest to `descriptor`.
+
+        The squared euclidean distance to every row is expanded as
+        ||g||² - 2 g·q + ||q||², where the norms of the gallery are kept
+        up to date as rows change, so the search costs one matrix-vector
+        product plus a partial sort of the `limit` best rows.
+
+        Args:
+            descriptor (np.ndarray): The probe's 128-d face descriptor.
+            limit (int): How many users to return.
+
+        Returns:
+            list[tuple[int, float]]: User IDs and euclidean distances,
+            nearest first.
+        """
+        size = self.size
+        if not size:
+            return []
+
+        probe = np.asarray(descriptor, np.float32)
+        distances = self.matrix[:size] @ probe
+        distances *= -2
+        distances += self.norms[:size]
+        distances += probe @ probe
+
+        limit = min(limit, size)
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest])]
+
+        return [
+            (int(self.ids[row]), float(np.sqrt(max(distances[row], 0))))
+            for row in nearest
+        ]
@@ -0,0 +1,224 @@
+from collections.abc import Awaitable, Callable, Sequence
+from http import HTTPStatus
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response
+from fastapi_pagination.api import create_page, resolve_params
+from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlakeyset import BadBookmark, unserialize_bookmark
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.schemas import CountMode
+from web_backend.utils.fast_json import RowSerializer
+
+ItemsTransformer = Callable[[Sequence[Any]], Awaitable[Sequence[Any]]]
+
+INVALID_CURSOR = HTTPException(
+    status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+)
+
+
+def verify_cursor(cursor: str, order_by: Sequence[ColumnElement[Any]]) -> None:
+    """
+    Checks that a decoded cursor marks a position in an ordering: one
+    value per ORDER BY column, each of the column's type.
+
+    Args:
+        cursor (str): The sqlakeyset bookmark carried by the cursor.
+        order_by (Sequence[ColumnElement]): The ordering being paginated,
+        as `asc`/`desc` clauses or bare columns.
+
+    Raises:
+        HTTPException: 400 if the cursor does not fit the query.
+    """
+    try:
+        place = unserialize_bookmark(cursor).place
+    except BadBookmark:
+        raise INVALID_CURSOR from None
+
+    if place is None:
+        return
+
+    columns = [getattr(clause, 'element', clause) for clause in order_by]
+    if len(place) != len(columns):
+        raise INVALID_CURSOR
+
+    for value, column in zip(place, columns):
+        if value is not None and not isinstance(
+            value, column.type.python_type
+        ):
+            raise INVALID_CURSOR
+
+
+async def paginate_cursor(
+    session: AsyncSession,
+    query: Select,
+    order_by: Sequence[ColumnElement[Any]],
+    transformer: Optional[ItemsTransformer] = None,
+):
+    """
+    Keyset-paginates a query in the given order with the cursor of the
+    current request, rejecting cursors that were not issued for that
+    ordering.
+
+    Args:
+        session (AsyncSession): The database session.
+        query (Select): The query, without an ORDER BY.
+        order_by (Sequence[ColumnElement]): Its sort key followed by a
+        unique tie-breaker.
+        transformer (Optional[ItemsTransformer]): Applied to the items of
+        the page before it is built.
+
+    Returns:
+        CursorPage: The requested page.
+    """
+    cursor = resolve_params().to_raw_params().cursor
+    if cursor:
+        verify_cursor(cursor, order_by)
+
+    return await paginate(
+        session, query.order_by(*order_by), transformer=transformer
+    )
+
+
+async def estimate_count(session: AsyncSession, query: Select) -> int:
+    """
+    Returns the planner's row estimate for a query without running it.
+    Unfiltered scans come straight from `pg_class.reltuples`; filters
+    are applied using the column statistics gathered by ANALYZE.
+
+    Args:
+        session (AsyncSession): The database session.
+        query (Select): The query to estimate.
+
+    Returns:
+        int: The estimated number of rows.
+    """
+    connection = await session.connection()
+    # expanding IN parameters are only turned into placeholders when the
+    # statement is rendered for execution
+    compiled = query.order_by(None).compile(
+        dialect=connection.dialect,
+        compile_kwargs={'render_postcompile': True},
+    )
+    result = await connection.exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+    )
+    plan = result.scalar_one()
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+async def count_rows(
+    session: AsyncSession, query: Select, mode: CountMode, cap: int
+) -> int | None:
+    """
+    Counts the rows of a query the way `mode` asks for.
+
+    Args:
+        session (AsyncSession): The database session.
+        query (Select): The query to count.
+        mode (CountMode): exact, estimate, capped (at most `cap`) or none.
+        cap (int): Upper bound of a capped count.
+
+    Returns:
+        int | None: The count, or None when `mode` is none.
+    """
+    if mode == CountMode.none:
+        return None
+
+    if mode == CountMode.estimate:
+        return await estimate_count(session, query)
+
+    query = query.order_by(None)
+    if mode == CountMode.capped:
+        query = query.limit(cap)
+
+    return await session.scalar(
+        select(func.count()).select_from(query.subquery())
+    )
+
+
+async def paginate_counted(
+    session: AsyncSession,
+    query: Select,
+    transformer: Optional[ItemsTransformer] = None,
+    max_offset: Optional[int] = None,
+):
+    """
+    Offset-paginates a query whose `total` is computed according to the
+    `count` query parameter of the current request.
+
+    Args:
+        session (AsyncSession): The database session.
+        query (Select): The query to paginate.
+        transformer (Optional[ItemsTransformer]): Applied to the items of
+        the page before it is built.
+        max_offset (Optional[int]): The deepest row a page may start at,
+        since the database reads and discards every row before it.
+
+    Returns:
+        CountPage: The requested page.
+
+    Raises:
+        HTTPException: 400 if the page starts past `max_offset`.
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params()
+
+    if max_offset is not None and raw_params.offset > max_offset:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=(
+                f'Pages cannot start past row {max_offset}; '
+                'use the cursor endpoint to go further'
+            ),
+        )
+
+    total = await count_rows(session, query, params.count, params.count_cap)
+    items = await session.scalars(
+        query.limit(raw_params.limit).offset(raw_params.offset)
+    )
+    items = items.all()
+    if transformer:
+        items = await transformer(items)
+
+    return create_page(items, total=total, params=params, count=params.count)
+
+
+async def paginate_rows(
+    session: AsyncSession,
+    query: Select,
+    serializer: RowSerializer,
+    transformer: Optional[ItemsTransformer] = None,
+) -> Response:
+    """
+    Like `paginate_counted`, but selects only the columns of the page's
+    schema and serializes the rows without building ORM instances.
+
+    Args:
+        session (AsyncSession): The database session.
+        query (Select): The query to paginate, on the serializer's entity.
+        serializer (RowSerializer): The serializer of the page's items.
+        transformer (Optional[ItemsTransformer]): Applied to the rows, as
+        dicts, before the page is built.
+
+    Returns:
+        Response: The requested page, already serialized.
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params()
+
+    query = serializer.project(query)
+    total = await count_rows(session, query, params.count, params.count_cap)
+    rows = await session.execute(
+        query.limit(raw_params.limit).offset(raw_params.offset)
+    )
+    items = [dict(row) for row in rows.mappings()]
+    if transformer:
+        items = await transformer(items)
+
+    return serializer.page_response(
+        items, total, params.page, params.size, params.count
+    )
@@ -0,0 +1,32 @@
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from web_backend.settings import Settings
+
+settings = Settings()
+
+pwd_context = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a password and rehash it when its Argon2 parameters differ
+    from the configured ones.
+
+    Returns:
+        tuple[bool, str | None]: Whether the password matches, and the
+        new hash to store or None if the current one is up to date.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
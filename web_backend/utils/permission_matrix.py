@@ -0,0 +1,214 @@
+import time
+
+import numpy as np
+
+ABSENT, INACTIVE, ACTIVE = 0, 1, 2
+
+
+class PermissionMatrix:
+    """
+    Which users may enter which environments, kept as one bitset row per
+    user indexed directly by user ID, with bit `environment_id` of the row
+    set when the user has that environment. A parallel array folds in
+    whether each user exists and is active, so a check is two array
+    lookups and never touches the database.
+
+    Both axes double in capacity as IDs grow, keeping updates amortized
+    O(1). Rows of deleted users are cleared rather than reclaimed, since
+    IDs come from a sequence and are not reused.
+
+    Changes committed by this process are applied as they happen, but
+    the ones made by other processes are only seen on the next `load`,
+    so the matrix is an advisory cache: decisions that must be exact are
+    taken by the database.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def _set_arrays(
+        self,
+        statuses: np.ndarray,
+        environments: np.ndarray,
+        grants: np.ndarray,
+    ) -> None:
+        self.statuses = statuses
+        self.environments = environments
+        self.grants = grants
+        # single elements read through a memoryview are plain Python
+        # objects, several times cheaper than numpy scalars
+        self._statuses = memoryview(statuses)
+        self._environments = memoryview(environments)
+        self._grants = memoryview(grants)
+
+    def _fit(self, user_id: int = -1, environment_id: int = -1) -> None:
+        users, columns = self.grants.shape
+        needed_users = max(users, user_id + 1)
+        needed_columns = max(columns, (environment_id >> 3) + 1)
+        if needed_users == users and needed_columns == columns:
+            return
+
+        if needed_users > users:
+            needed_users = max(1024, 2 * users, needed_users)
+        if needed_columns > columns:
+            needed_columns = max(8, 2 * columns, needed_columns)
+
+        grown_statuses = np.zeros(needed_users, np.uint8)
+        grown_statuses[:users] = self.statuses
+        grown_environments = np.zeros(needed_columns * 8, bool)
+        grown_environments[: len(self.environments)] = self.environments
+        grown_grants = np.zeros((needed_users, needed_columns), np.uint8)
+        grown_grants[:users, :columns] = self.grants
+        self._set_arrays(grown_statuses, grown_environments, grown_grants)
+
+    def begin_load(self) -> None:
+        """
+        Starts buffering changes, so that the ones committed while the
+        matrix is being read from the database are replayed onto it. A
+        loaded matrix keeps applying them meanwhile.
+        """
+        if self._replay is None:
+            self._replay = []
+
+    def cancel_load(self) -> None:
+        self._replay = None
+
+    def load(
+        self,
+        users: list[tuple[int, bool]],
+        environment_ids: list[int],
+        grants: list[tuple[int, int]],
+    ) -> None:
+        """
+        Replaces the whole matrix.
+
+        Args:
+            users (list[tuple[int, bool]]): Every user's ID and whether
+            they are active.
+            environment_ids (list[int]): Every environment's ID.
+            grants (list[tuple[int, int]]): The rows of
+            `users_environments`, as (user ID, environment ID) pairs.
+        """
+        statuses = np.array(users, np.int64).reshape(-1, 2)
+        user_ids, active = statuses[:, 0], statuses[:, 1].astype(bool)
+        environments = np.array(environment_ids, np.int64)
+        pairs = np.array(grants, np.int64).reshape(-1, 2)
+
+        self._set_arrays(
+            np.zeros(0, np.uint8),
+            np.zeros(0, bool),
+            np.zeros((0, 0), np.uint8),
+        )
+        self._fit(
+            int(user_ids.max(initial=-1)),
+            int(environments.max(initial=-1)),
+        )
+        self.statuses[user_ids] = np.where(active, ACTIVE, INACTIVE)
+        self.environments[environments] = True
+        np.bitwise_or.at(
+            self.grants,
+            (pairs[:, 0], pairs[:, 1] >> 3),
+            (1 << (pairs[:, 1] & 7)).astype(np.uint8),
+        )
+
+        replay, self._replay = self._replay or [], None
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        self.apply(replay)
+
+    def age(self) -> float:
+        """
+        Seconds since the matrix was last loaded from the database.
+        """
+        return time.monotonic() - self.loaded_at
+
+    def clear(self) -> None:
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._replay = None
+        self._set_arrays(
+            np.zeros(0, np.uint8),
+            np.zeros(0, bool),
+            np.zeros((0, 0), np.uint8),
+        )
+
+    def has_user(self, user_id: int) -> bool:
+        return 0 <= user_id < len(self._statuses) and bool(
+            self._statuses[user_id]
+        )
+
+    def has_environment(self, environment_id: int) -> bool:
+        return (
+            0 <= environment_id < len(self._environments)
+            and self._environments[environment_id]
+        )
+
+    def granted(self, user_id: int, environment_id: int) -> bool:
+        """
+        Whether the user has the environment, regardless of their status.
+        """
+        if not (
+            0 <= user_id < len(self._statuses)
+            and 0 <= environment_id < len(self._environments)
+        ):
+            return False
+
+        bits = self._grants[user_id, environment_id >> 3]
+        return bool(bits >> (environment_id & 7) & 1)
+
+    def allowed(self, user_id: int, environment_id: int) -> bool:
+        """
+        Whether the user may enter the environment: they have it and are
+        active.
+        """
+        return (
+            self.granted(user_id, environment_id)
+            and self._statuses[user_id] == ACTIVE
+        )
+
+    def set_user(self, user_id: int, active: bool) -> None:
+        self._fit(user_id)
+        self._statuses[user_id] = ACTIVE if active else INACTIVE
+
+    def drop_user(self, user_id: int) -> None:
+        if 0 <= user_id < len(self.statuses):
+            self.statuses[user_id] = ABSENT
+            self.grants[user_id] = 0
+
+    def add_environment(self, environment_id: int) -> None:
+        self._fit(environment_id=environment_id)
+        self.environments[environment_id] = True
+
+    def drop_environment(self, environment_id: int) -> None:
+        if 0 <= environment_id < len(self.environments):
+            self.environments[environment_id] = False
+            self.grants[:, environment_id >> 3] &= ~np.uint8(
+                1 << (environment_id & 7)
+            )
+
+    def grant(self, user_id: int, environment_id: int) -> None:
+        self._fit(user_id, environment_id)
+        self._grants[user_id, environment_id >> 3] |= 1 << (environment_id & 7)
+
+    def revoke(self, user_id: int, environment_id: int) -> None:
+        if self.granted(user_id, environment_id):
+            self._grants[user_id, environment_id >> 3] &= (
+                ~(1 << (environment_id & 7)) & 0xFF
+            )
+
+    def apply(self, changes: list[tuple]) -> None:
+        """
+        Applies changes recorded as (method name, *arguments) tuples, e.g.
+        `('grant', user_id, environment_id)`. They are buffered while the
+        matrix loads, to be replayed onto it, and dropped while it is not
+        loaded at all, since the next load reads them from the database.
+        Every change is idempotent, so replaying one the load already
+        read is harmless.
+        """
+        if self._replay is not None:
+            self._replay.extend(changes)
+        if not self.loaded:
+            return
+
+        for method, *arguments in changes:
+            getattr(self, method)(*arguments)
@@ -0,0 +1,250 @@
+import anyio
+from sqlalchemy import ColumnElement, delete, event, inspect, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from web_backend.models import Environment, User
+from web_backend.models.user import UserStatus
+from web_backend.models.user_environment import association_table
+from web_backend.settings import Settings
+from web_backend.utils.permission_matrix import PermissionMatrix
+
+settings = Settings()
+
+permissions = PermissionMatrix()
+load_lock = anyio.Lock()
+
+
+def permissions_stale() -> bool:
+    return (
+        not permissions.loaded
+        or permissions.age() > settings.PERMISSIONS_RELOAD_SECONDS
+    )
+
+
+async def load_permissions(session: AsyncSession) -> PermissionMatrix:
+    """
+    Fills `permissions` from the database the first time it is needed,
+    and again once it is older than `PERMISSIONS_RELOAD_SECONDS`, which
+    bounds how long changes made by other processes go unseen.
+
+    Args:
+        session (AsyncSession): The database session.
+
+    Returns:
+        PermissionMatrix: The loaded matrix.
+    """
+    if not permissions_stale():
+        return permissions
+
+    async with load_lock:
+        if not permissions_stale():
+            return permissions
+
+        permissions.begin_load()
+        try:
+            users = await session.execute(
+                select(User.id, User.status == UserStatus.active)
+            )
+            environment_ids = await session.scalars(select(Environment.id))
+            grants = await session.execute(
+                select(
+                    association_table.c.user_id,
+                    association_table.c.enviroment_id,
+                )
+            )
+        except BaseException:
+            permissions.cancel_load()
+            raise
+
+        permissions.load(
+            [tuple(row) for row in users],
+            list(environment_ids),
+            [tuple(row) for row in grants],
+        )
+
+    return permissions
+
+
+def record_changes(session: Session, *changes: tuple) -> None:
+    """
+    Queues changes to `permissions`, applied once the session commits.
+    Only needed for writes that bypass the ORM; the ones made through
+    mapped objects are recorded at flush.
+
+    Args:
+        session (Session): The session the writes were made in.
+        *changes (tuple): (method name, *arguments) tuples, see
+        `PermissionMatrix.apply`.
+    """
+    session.info.setdefault('permission_changes', []).extend(changes)
+
+
+async def grant_environment(
+    session: AsyncSession, user_id: int, environment_id: int
+) -> bool:
+    """
+    Gives a user an environment without loading the ones they have.
+
+    Returns:
+        bool: Whether the user did not have it yet.
+    """
+    granted = await session.scalar(
+        insert(association_table)
+        .values(user_id=user_id, enviroment_id=environment_id)
+        .on_conflict_do_nothing()
+        .returning(association_table.c.user_id)
+    )
+    if granted is None:
+        return False
+
+    record_changes(session.sync_session, ('grant', user_id, environment_id))
+    return True
+
+
+async def revoke_environment(
+    session: AsyncSession, user_id: int, environment_id: int
+) -> bool:
+    """
+    Takes an environment from a user without loading the ones they have.
+
+    Returns:
+        bool: Whether the user had it.
+    """
+    revoked = await session.scalar(
+        delete(association_table)
+        .where(
+            association_table.c.user_id == user_id,
+            association_table.c.enviroment_id == environment_id,
+        )
+        .returning(association_table.c.user_id)
+    )
+    if revoked is None:
+        return False
+
+    record_changes(session.sync_session, ('revoke', user_id, environment_id))
+    return True
+
+
+async def grant_environment_to_users(
+    session: AsyncSession,
+    environment_id: int,
+    conditions: list[ColumnElement[bool]],
+) -> int:
+    """
+    Gives an environment to every user matching `conditions` with a
+    single `INSERT ... SELECT`, skipping the ones that already have it.
+
+    Args:
+        session (AsyncSession): The database session; the caller commits.
+        environment_id (int): The environment.
+        conditions (list[ColumnElement[bool]]): Conditions on `User`.
+
+    Returns:
+        int: How many users were given the environment.
+    """
+    user_ids = await session.scalars(
+        insert(association_table)
+        .from_select(
+            ['user_id', 'enviroment_id'],
+            select(User.id, literal(environment_id)).where(*conditions),
+        )
+        .on_conflict_do_nothing()
+        .returning(association_table.c.user_id)
+    )
+    changes = [('grant', user_id, environment_id) for user_id in user_ids]
+    record_changes(session.sync_session, *changes)
+
+    return len(changes)
+
+
+async def revoke_environment_from_users(
+    session: AsyncSession,
+    environment_id: int,
+    conditions: list[ColumnElement[bool]],
+) -> int:
+    """
+    Takes an environment from every user matching `conditions` with a
+    single `DELETE ... USING users`.
+
+    Args:
+        session (AsyncSession): The database session; the caller commits.
+        environment_id (int): The environment.
+        conditions (list[ColumnElement[bool]]): Conditions on `User`.
+
+    Returns:
+        int: How many users lost the environment.
+    """
+    user_ids = await session.scalars(
+        delete(association_table)
+        .where(
+            association_table.c.enviroment_id == environment_id,
+            association_table.c.user_id == User.id,
+            *conditions,
+        )
+        .returning(association_table.c.user_id)
+    )
+    changes = [('revoke', user_id, environment_id) for user_id in user_ids]
+    record_changes(session.sync_session, *changes)
+
+    return len(changes)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_permissions(session: Session, flush_context) -> None:
+    """
+    Turn the users, environments and grants written by a flush into
+    changes to `permissions`.
+
+    Runs while the session still holds the pre-flush state and history,
+    but after the flush assigned the new rows their IDs.
+    """
+    changes = []
+    for target in session.new | session.dirty:
+        state = inspect(target)
+        if isinstance(target, User):
+            if target in session.new or state.attrs.status.history.added:
+                changes.append((
+                    'set_user',
+                    target.id,
+                    target.status == UserStatus.active,
+                ))
+            history = state.attrs.environments.history
+            changes.extend(
+                ('grant', target.id, environment.id)
+                for environment in history.added
+            )
+            changes.extend(
+                ('revoke', target.id, environment.id)
+                for environment in history.deleted
+            )
+        elif isinstance(target, Environment):
+            if target in session.new:
+                changes.append(('add_environment', target.id))
+            history = state.attrs.users.history
+            changes.extend(
+                ('grant', user.id, target.id) for user in history.added
+            )
+            changes.extend(
+                ('revoke', user.id, target.id) for user in history.deleted
+            )
+
+    for target in session.deleted:
+        if isinstance(target, User):
+            changes.append(('drop_user', target.id))
+        elif isinstance(target, Environment):
+            changes.append(('drop_environment', target.id))
+
+    if changes:
+        record_changes(session, *changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_permissions(session: Session) -> None:
+    permissions.apply(session.info.pop('permission_changes', []))
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back_permissions(session: Session, previous_transaction):
+    session.info.pop('permission_changes', None)
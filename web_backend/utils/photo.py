@@ -0,0 +1,244 @@
+from collections.abc import Awaitable, Callable, Sequence
+from http import HTTPStatus
+from typing import Any, Optional
+
+from fastapi import BackgroundTasks, Request, Response, UploadFile
+from fastapi.responses import FileResponse
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from web_backend.models import Photo, PhotoKind
+from web_backend.schemas import PhotoSize
+from web_backend.utils.derivatives import (
+    generate_derivatives,
+    get_photo_path,
+    remove_photo_files,
+)
+from web_backend.utils.face import index_face
+from web_backend.utils.upload_photo import PhotoFile, upload_photo
+
+
+async def get_photo(
+    session: AsyncSession, owner_id: int, kind: PhotoKind
+) -> Optional[Photo]:
+    return await session.scalar(
+        select(Photo).where(Photo.kind == kind, Photo.owner_id == owner_id)
+    )
+
+
+async def get_photos(
+    session: AsyncSession, owner_ids: list[int], kind: PhotoKind
+) -> dict[int, Photo]:
+    """
+    Looks up the photos of many owners of the same kind in one query.
+
+    Args:
+        session (AsyncSession): The database session.
+        owner_ids (list[int]): IDs of the users or environments.
+        kind (PhotoKind): Whose photos are being looked up.
+
+    Returns:
+        dict[int, Photo]: The photos found, keyed by owner ID.
+    """
+    if not owner_ids:
+        return {}
+
+    photos = await session.scalars(
+        select(Photo).where(Photo.kind == kind, Photo.owner_id.in_(owner_ids))
+    )
+    return {photo.owner_id: photo for photo in photos}
+
+
+async def register_photo(
+    session: AsyncSession, owner_id: int, kind: PhotoKind, file: PhotoFile
+) -> Photo:
+    """
+    Records, or replaces, the registry entry of an owner's photo in the
+    session's transaction; the caller commits it.
+
+    Args:
+        session (AsyncSession): The database session.
+        owner_id (int): The ID of the user or environment.
+        kind (PhotoKind): Whose photo it is.
+        file (PhotoFile): Metadata of the file written to disk.
+
+    Returns:
+        Photo: The registry entry.
+    """
+    values = file._asdict()
+    photo = await session.scalar(
+        insert(Photo)
+        .values(kind=kind, owner_id=owner_id, **values)
+        .on_conflict_do_update(
+            index_elements=[Photo.kind, Photo.owner_id],
+            set_={**values, 'updated_at': func.now()},
+        )
+        .returning(Photo),
+        execution_options={'populate_existing': True},
+    )
+
+    return photo
+
+
+async def store_photo(
+    session: AsyncSession,
+    file: UploadFile,
+    owner_id: int,
+    kind: PhotoKind,
+    background_tasks: BackgroundTasks,
+) -> Photo:
+    """
+    Saves an uploaded photo to disk and records it in the photo registry,
+    leaving the commit to the caller. The files of the photo it replaces
+    are removed, and the new derivatives, along with a user's face
+    descriptor, are computed after the response, so only once the
+    request's transaction is committed.
+
+    Args:
+        session (AsyncSession): The database session.
+        file (UploadFile): The uploaded photo.
+        owner_id (int): The ID of the user or environment.
+        kind (PhotoKind): Whose photo it is.
+        background_tasks (BackgroundTasks): The tasks of the current
+        request.
+
+    Returns:
+        Photo: The registry entry of the stored photo.
+    """
+    previous = await get_photo(session, owner_id, kind)
+    if previous is not None:
+        # the upsert below refreshes the same instance
+        session.expunge(previous)
+    photo_file = await upload_photo(file, owner_id, kind.value)
+    photo = await register_photo(session, owner_id, kind, photo_file)
+
+    if previous is not None and previous.version != photo.version:
+        background_tasks.add_task(remove_photo_files, previous)
+    background_tasks.add_task(generate_derivatives, photo)
+    if kind == PhotoKind.users_photos:
+        background_tasks.add_task(index_face, session.bind, photo)
+
+    return photo
+
+
+def photo_url(
+    request: Request,
+    photo: Optional[Photo],
+    size: PhotoSize = PhotoSize.original,
+) -> str:
+    """
+    Builds the content-addressed URL of a registered photo without
+    touching the filesystem. The URL carries the photo's version, so it
+    changes whenever the photo is replaced and can be cached forever.
+
+    Args:
+        request (Request): The current request, for its base URL.
+        photo (Optional[Photo]): The registry entry, if there is one.
+        size (PhotoSize): The size wanted.
+
+    Returns:
+        str: The URL of the photo or an empty string if there is none.
+    """
+    if photo is None:
+        return ''
+
+    url = (
+        f'{request.base_url}photos/{photo.kind.value}/{photo.owner_id}/'
+        f'{photo.version}'
+    )
+    if size != PhotoSize.original:
+        url = f'{url}?size={size.value}'
+
+    return url
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Compares an `If-None-Match` header with an entity tag, using the weak
+    comparison RFC 9110 prescribes for it.
+
+    Args:
+        if_none_match (str): The header sent by the client.
+        etag (str): The current entity tag, quoted.
+
+    Returns:
+        bool: Whether the client already has the current representation.
+    """
+    if if_none_match.strip() == '*':
+        return True
+
+    return etag in {
+        tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+    }
+
+
+async def photo_response(
+    request: Request, photo: Photo, size: PhotoSize, cache_control: str
+) -> Response:
+    """
+    Serves a photo in the requested size with a strong ETag derived from
+    its hash, answering `304 Not Modified` without touching the disk
+    when the client's copy is current.
+
+    Args:
+        request (Request): The current request, for `If-None-Match`.
+        photo (Photo): The registry entry of the photo.
+        size (PhotoSize): The size wanted.
+        cache_control (str): The `Cache-Control` of the response.
+
+    Returns:
+        Response: The file, or an empty 304 response.
+
+    Raises:
+        HTTPException: 404 if the original is missing, 422 if it cannot
+        be resized, 503 if `derivative_pool` is saturated.
+    """
+    headers = {
+        'ETag': f'"{photo.version}-{size.value}"',
+        'Cache-Control': cache_control,
+    }
+    if etag_matches(request.headers.get('if-none-match', ''), headers['ETag']):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    return FileResponse(await get_photo_path(photo, size), headers=headers)
+
+
+def with_photo_urls(
+    session: AsyncSession, request: Request, kind: PhotoKind
+) -> Callable[[Sequence[Any]], Awaitable[Sequence[Any]]]:
+    """
+    Builds a page transformer that sets `photo_url` and `thumbnail_url`
+    on every item with a single registry lookup. Items are objects, or
+    dicts when rows are paginated as mappings.
+
+    Args:
+        session (AsyncSession): The database session.
+        request (Request): The current request, for its base URL.
+        kind (PhotoKind): Whose photos the items have.
+
+    Returns:
+        Callable: The transformer, for `paginate_counted` and
+        `paginate_cursor`.
+    """
+
+    async def transformer(items: Sequence[Any]) -> Sequence[Any]:
+        rows = bool(items) and isinstance(items[0], dict)
+        ids = [item['id'] if rows else item.id for item in items]
+        photos = await get_photos(session, ids, kind)
+        for owner_id, item in zip(ids, items):
+            photo = photos.get(owner_id)
+            urls = {
+                'photo_url': photo_url(request, photo),
+                'thumbnail_url': photo_url(
+                    request, photo, PhotoSize.thumbnail
+                ),
+            }
+            if rows:
+                item.update(urls)
+            else:
+                for name, url in urls.items():
+                    setattr(item, name, url)
+        return items
+
+    return transformer
@@ -0,0 +1,529 @@
+import hashlib
+import os
+import re
+import tempfile
+from http import HTTPStatus
+from pathlib import Path, PurePosixPath
+from typing import Optional
+from uuid import uuid4
+from zipfile import BadZipFile, ZipFile
+
+import anyio
+import numpy as np
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from web_backend.models import FaceEmbedding, Photo, PhotoKind, User
+from web_backend.schemas import PhotoEnrollment, PhotoEnrollmentJob, PhotoSize
+from web_backend.schemas.schemas_utils import CPF_PATTERN
+from web_backend.settings import Settings
+from web_backend.utils.cache import TTLCache
+from web_backend.utils.derivatives import (
+    DERIVATIVE_SIDES,
+    derivative_name,
+    derivative_path,
+    derivative_pool,
+    remove_photo_files,
+    render_derivatives,
+)
+from web_backend.utils.face import (
+    extract_descriptor,
+    face_recognition_available,
+    gallery,
+)
+from web_backend.utils.upload_photo import (
+    CHUNK_SIZE,
+    SNIFF_SIZE,
+    PhotoFile,
+    original_name,
+    sniff_extension,
+)
+
+settings = Settings()
+
+Status = PhotoEnrollment.Status
+JobStatus = PhotoEnrollmentJob.Status
+
+# photos registered per statement while a job runs
+REGISTER_BATCH_SIZE = 64
+BUSY_RETRY_SECONDS = 1
+
+enrollment_jobs = TTLCache(
+    maxsize=settings.PHOTO_ENROLLMENT_MAX_JOBS,
+    ttl=settings.PHOTO_ENROLLMENT_JOB_TTL_SECONDS,
+)
+# jobs take turns, each using every worker of `derivative_pool`
+job_lock = anyio.Lock()
+
+
+def copy_archive(file: UploadFile) -> tuple[str, list[str]]:
+    """
+    Copies an uploaded ZIP archive, chunk by chunk, to a file that
+    outlives the request, and lists its files.
+
+    Args:
+        file (UploadFile): The uploaded archive.
+
+    Returns:
+        tuple[str, list[str]]: The path of the copy and the names of the
+        files in the archive.
+
+    Raises:
+        HTTPException: 413 if the archive is larger than
+        `PHOTO_ENROLLMENT_MAX_BYTES`, 415 if it is not a ZIP archive.
+    """
+    max_bytes = settings.PHOTO_ENROLLMENT_MAX_BYTES
+    descriptor, archive = tempfile.mkstemp(suffix='.zip')
+    try:
+        size = 0
+        with os.fdopen(descriptor, 'wb') as copy:
+            while chunk := file.file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        detail=(
+                            f'Archive exceeds the maximum size of '
+                            f'{max_bytes} bytes'
+                        ),
+                    )
+                copy.write(chunk)
+
+        try:
+            with ZipFile(archive) as zip_file:
+                names = [
+                    info.filename
+                    for info in zip_file.infolist()
+                    if not info.is_dir()
+                ]
+        except BadZipFile:
+            raise HTTPException(
+                status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                detail='Photos must be sent in a ZIP archive',
+            ) from None
+    except BaseException:
+        Path(archive).unlink(missing_ok=True)
+        raise
+
+    # metadata some archivers add, not photos
+    names = [
+        name
+        for name in names
+        if not name.startswith('__MACOSX/')
+        and not PurePosixPath(name).name.startswith('.')
+    ]
+
+    return archive, names
+
+
+async def save_archive(file: UploadFile) -> tuple[str, list[str]]:
+    """
+    Runs `copy_archive` in a worker thread.
+    """
+    return await to_thread.run_sync(copy_archive, file)
+
+
+def owner_key(name: str) -> Optional[tuple[str, str]]:
+    """
+    Tells whose photo a file is from its name, `<CPF, email or user
+    ID>.<extension>`, in any folder of the archive.
+
+    Returns:
+        Optional[tuple[str, str]]: The user field and its value, or None
+        if the name is none of them.
+    """
+    stem = PurePosixPath(name).stem
+    if re.match(CPF_PATTERN, stem):
+        return 'cpf', stem
+    if '@' in stem:
+        return 'email', stem
+    if stem.isdigit():
+        return 'id', str(int(stem))
+
+    return None
+
+
+def enroll_photo(  # noqa PLR0913
+    archive: str,
+    name: str,
+    photos_dir: str,
+    owner_id: int,
+    max_bytes: int,
+) -> PhotoFile:
+    """
+    Writes a photo from an archive to
+    `photos_dir/{owner_id}.{version}{extension}`
+    and renders its derivatives, decoding it once. The photo it replaces
+    is left in place for `register_enrollments` to remove once the new
+    one is committed. Runs in `derivative_pool`.
+
+    Args:
+        archive (str): Path of the ZIP archive.
+        name (str): Name of the photo in the archive.
+        photos_dir (str): The directory of users' photos.
+        owner_id (int): The user's ID.
+        max_bytes (int): The maximum size of the photo.
+
+    Returns:
+        PhotoFile: The extension, size in bytes and SHA-256 of the file.
+
+    Raises:
+        ValueError: If the file is not a supported image or is too big.
+        OSError: If it cannot be decoded.
+    """
+    temp_path = os.path.join(photos_dir, f'.{owner_id}.{uuid4().hex}.tmp')
+    try:
+        with (
+            ZipFile(archive) as zip_file,
+            zip_file.open(name) as source,
+            open(temp_path, 'wb') as target,
+        ):
+            head = source.read(SNIFF_SIZE)
+            try:
+                extension = sniff_extension(head)
+            except HTTPException as error:
+                raise ValueError(error.detail) from None
+
+            digest = hashlib.sha256(head)
+            size = len(head)
+            target.write(head)
+            # the size in the archive's directory could be a lie
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(
+                        f'Photo exceeds the maximum size of {max_bytes} bytes'
+                    )
+                digest.update(chunk)
+                target.write(chunk)
+
+        photo_file = PhotoFile(extension, size, digest.hexdigest())
+        version = photo_file.version
+        render_derivatives(
+            temp_path,
+            {
+                os.path.join(
+                    photos_dir, derivative_name(owner_id, photo_size, version)
+                ): side
+                for photo_size, side in DERIVATIVE_SIDES.items()
+            },
+        )
+        os.replace(
+            temp_path,
+            os.path.join(
+                photos_dir, original_name(owner_id, version, extension)
+            ),
+        )
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+    return photo_file
+
+
+def create_job(names: list[str]) -> PhotoEnrollmentJob:
+    job = PhotoEnrollmentJob(
+        id=uuid4().hex, status=JobStatus.queued, total=len(names)
+    )
+    enrollment_jobs.set(job.id, job)
+    return job
+
+
+async def find_owners(
+    session: AsyncSession, keys: set[tuple[str, str]]
+) -> dict[tuple[str, str], int]:
+    """
+    Finds the users the files of an archive belong to in one query.
+
+    Args:
+        session (AsyncSession): The database session.
+        keys (set[tuple[str, str]]): The (field, value) pairs naming the
+        files, see `owner_key`.
+
+    Returns:
+        dict: The user ID of each key that names a user.
+    """
+    values = {field: set() for field in ('id', 'cpf', 'email')}
+    for field, value in keys:
+        values[field].add(int(value) if field == 'id' else value)
+
+    users = await session.execute(
+        select(User.id, User.cpf, User.email).where(
+            or_(
+                User.id.in_(values['id']),
+                User.cpf.in_(values['cpf']),
+                User.email.in_(values['email']),
+            )
+        )
+    )
+
+    owners = {}
+    for user_id, cpf, email in users:
+        for key in (('id', str(user_id)), ('cpf', cpf), ('email', email)):
+            if key in keys:
+                owners[key] = user_id
+
+    return owners
+
+
+async def register_enrollments(
+    session: AsyncSession,
+    enrollments: list[tuple[int, PhotoFile, Optional[np.ndarray]]],
+) -> None:
+    """
+    Records the photos written by `enroll_photo`, and the face
+    descriptors computed from them, in one statement each. The files of
+    the photos they replace are removed once that is committed.
+
+    Args:
+        session (AsyncSession): The database session; committed.
+        enrollments (list): (user ID, photo file, descriptor) triples;
+        the descriptor is None when the photo has no face, or was not
+        looked for one.
+    """
+    # locked so a concurrent upload cannot slip in between
+    previous = (
+        await session.scalars(
+            select(Photo)
+            .where(
+                Photo.kind == PhotoKind.users_photos,
+                Photo.owner_id.in_([user_id for user_id, *_ in enrollments]),
+            )
+            .with_for_update()
+        )
+    ).all()
+    # the upsert below would refresh the same instances
+    for photo in previous:
+        session.expunge(photo)
+
+    statement = insert(Photo).values([
+        {'kind': PhotoKind.users_photos, 'owner_id': user_id, **file._asdict()}
+        for user_id, file, _ in enrollments
+    ])
+    photos = (
+        await session.scalars(
+            statement.on_conflict_do_update(
+                index_elements=[Photo.kind, Photo.owner_id],
+                set_={
+                    'extension': statement.excluded.extension,
+                    'size': statement.excluded.size,
+                    'sha256': statement.excluded.sha256,
+                    'updated_at': func.now(),
+                },
+            ).returning(Photo),
+            execution_options={'populate_existing': True},
+        )
+    ).all()
+
+    faces = {
+        user_id: descriptor
+        for user_id, _, descriptor in enrollments
+        if descriptor is not None
+    }
+    versions = {photo.owner_id: photo.version for photo in photos}
+    if faces:
+        statement = insert(FaceEmbedding).values([
+            {
+                'user_id': user_id,
+                'photo_version': versions[user_id],
+                'descriptor': descriptor.tobytes(),
+            }
+            for user_id, descriptor in faces.items()
+        ])
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[FaceEmbedding.user_id],
+                set_={
+                    'photo_version': statement.excluded.photo_version,
+                    'descriptor': statement.excluded.descriptor,
+                    'updated_at': func.now(),
+                },
+            )
+        )
+    faceless = [user_id for user_id in versions if user_id not in faces]
+    if faceless and face_recognition_available():
+        await session.execute(
+            delete(FaceEmbedding).where(FaceEmbedding.user_id.in_(faceless))
+        )
+    await session.commit()
+
+    for user_id, descriptor in faces.items():
+        gallery.add(user_id, descriptor)
+    if face_recognition_available():
+        for user_id in faceless:
+            gallery.remove(user_id)
+    for photo in previous:
+        if photo.version != versions[photo.owner_id]:
+            await remove_photo_files(photo)
+
+
+async def enroll_file(
+    archive: str,
+    name: str,
+    photos_dir: anyio.Path,
+    owner_id: int,
+) -> tuple[PhotoEnrollment, Optional[tuple]]:
+    """
+    Enrolls one photo of an archive: writes it in `derivative_pool` and
+    then, if face recognition is available, extracts its descriptor.
+
+    Returns:
+        tuple: The result of the file and, if it was enrolled, its
+        (user ID, photo file, descriptor) triple.
+    """
+    while True:
+        try:
+            photo_file = await derivative_pool.run(
+                enroll_photo,
+                archive,
+                name,
+                str(photos_dir),
+                owner_id,
+                settings.PHOTO_MAX_BYTES,
+            )
+            break
+        except HTTPException:
+            # the pool is saturated by other requests
+            await anyio.sleep(BUSY_RETRY_SECONDS)
+        except ValueError as error:
+            return PhotoEnrollment(
+                file=name, status=Status.invalid, detail=str(error)
+            ), None
+        except (OSError, BadZipFile, Image.DecompressionBombError):
+            return PhotoEnrollment(
+                file=name,
+                status=Status.invalid,
+                detail='Photo cannot be decoded',
+            ), None
+
+    descriptor = face_indexed = None
+    if face_recognition_available():
+        photo = Photo(
+            kind=PhotoKind.users_photos,
+            owner_id=owner_id,
+            **photo_file._asdict(),
+        )
+        try:
+            descriptor = await extract_descriptor(
+                str(derivative_path(photo, PhotoSize.recognition))
+            )
+            face_indexed = descriptor is not None
+        except HTTPException:
+            face_indexed = False
+
+    return PhotoEnrollment(
+        file=name,
+        status=Status.enrolled,
+        user_id=owner_id,
+        face_indexed=face_indexed,
+    ), (owner_id, photo_file, descriptor)
+
+
+async def enroll_archive(
+    job: PhotoEnrollmentJob,
+    archive: str,
+    names: list[str],
+    session: AsyncSession,
+) -> None:
+    photos_dir = (
+        anyio.Path(settings.UPLOADS_DIR) / PhotoKind.users_photos.value
+    )
+    await photos_dir.mkdir(parents=True, exist_ok=True)
+    keys = {name: owner_key(name) for name in names}
+    owners = await find_owners(
+        session, {key for key in keys.values() if key is not None}
+    )
+
+    def finish(result: PhotoEnrollment) -> None:
+        job.files.append(result)
+        job.processed += 1
+        job.enrolled += result.status == Status.enrolled
+
+    pending = []
+    first_files = {}
+    for name, key in keys.items():
+        if key not in owners:
+            finish(
+                PhotoEnrollment(
+                    file=name,
+                    status=Status.unmatched,
+                    detail='No user has this CPF, email or ID',
+                )
+            )
+            continue
+
+        owner_id = owners[key]
+        if owner_id in first_files:
+            finish(
+                PhotoEnrollment(
+                    file=name,
+                    status=Status.duplicate,
+                    user_id=owner_id,
+                    detail=f'Same user as {first_files[owner_id]}',
+                )
+            )
+            continue
+
+        first_files[owner_id] = name
+        pending.append((name, owner_id))
+
+    send, receive = anyio.create_memory_object_stream(len(pending))
+    remaining = iter(pending)
+
+    async def worker(send) -> None:
+        async with send:
+            for name, owner_id in remaining:
+                await send.send(
+                    await enroll_file(archive, name, photos_dir, owner_id)
+                )
+
+    async with anyio.create_task_group() as task_group:
+        async with send:
+            for _ in range(derivative_pool.max_workers):
+                task_group.start_soon(worker, send.clone())
+
+        enrollments = []
+        async with receive:
+            async for result, enrollment in receive:
+                finish(result)
+                if enrollment is not None:
+                    enrollments.append(enrollment)
+                if len(enrollments) >= REGISTER_BATCH_SIZE:
+                    await register_enrollments(session, enrollments)
+                    enrollments = []
+
+    if enrollments:
+        await register_enrollments(session, enrollments)
+
+
+async def run_job(
+    job: PhotoEnrollmentJob, archive: str, names: list[str], bind: AsyncEngine
+) -> None:
+    """
+    Enrolls the photos of an archive saved by `save_archive`, updating
+    `job` as each file is processed, and deletes the archive. Meant to
+    run after the response is sent.
+
+    Args:
+        job (PhotoEnrollmentJob): The job, as returned by `create_job`.
+        archive (str): Path of the archive.
+        names (list[str]): The files to enroll.
+        bind (AsyncEngine): The engine to open a session on.
+    """
+    try:
+        async with job_lock:
+            job.status = JobStatus.running
+            async with AsyncSession(bind, expire_on_commit=False) as session:
+                await enroll_archive(job, archive, names, session)
+            job.status = JobStatus.done
+    except Exception:
+        job.status = JobStatus.failed
+        raise
+    finally:
+        await anyio.Path(archive).unlink(missing_ok=True)
+        # kept for polling from when the job ends
+        enrollment_jobs.set(job.id, job)
@@ -1,19 +1,20 @@
 import time
 from datetime import datetime, timedelta
 from random import choice, randint
+from uuid import uuid4
 
 from faker import Faker
-from sqlalchemy import create_engine, delete, text
+from sqlalchemy import delete, text
 from sqlalchemy.orm import Session
 from unidecode import unidecode
 
+from web_backend.database import engine
 from web_backend.models import AccessLog, Admin, Device, Environment, User
 from web_backend.models.user_environment import association_table
 from web_backend.security import get_password_hash
-from web_backend.settings import Settings
+from web_backend.utils.access_log_writer import insert_access_logs
 
 faker = Faker('pt_BR')
-engine = create_engine(Settings().DATABASE_URL)
 
 
 def create_devices(
@@ -52,38 +53,38 @@ def create_access_logs(
         for _ in range(randint(1, 5)):
             environment = choice(environments)
             allowed_access = choice([True, False])
-            new_log = AccessLog(
-                user_id=user.id,
-                user_name=user.name,
-                user_name_unaccent=user.name_unaccent,
-                user_email=user.email,
-                user_cpf=user.cpf,
-                user_phone_number=user.phone_number,
-                environment_id=environment.id,
-                environment_name=environment.name,
-                environment_name_unaccent=environment.name_unaccent,
-                allowed_access=allowed_access,
-            )
-            new_log.access_time = datetime.now() - timedelta(
+            access_time = datetime.now() - timedelta(
                 days=randint(0, 30),
                 hours=randint(0, 23),
                 minutes=randint(0, 59),
                 seconds=randint(0, 59),
             )
+            logs.append({
+                'id': uuid4(),
+                'user_id': user.id,
+                'user_name': user.name,
+                'user_name_unaccent': user.name_unaccent,
+                'user_email': user.email,
+                'user_cpf': user.cpf,
+                'user_phone_number': user.phone_number,
+                'environment_id': environment.id,
+                'environment_name': environment.name,
+                'environment_name_unaccent': environment.name_unaccent,
+                'access_time': access_time,
+                'allowed_access': allowed_access,
+            })
 
             if allowed_access:
                 user.last_accessed_environment_id = environment.id
                 user.last_accessed_environment_name = environment.name
-                user.last_access_time = new_log.access_time
+                user.last_access_time = access_time
 
                 environment.last_accessed_by_user_id = user.id
                 environment.last_accessed_by_user_name = user.name
-                environment.last_access_time = new_log.access_time
-
-            logs.append(new_log)
+                environment.last_access_time = access_time
 
-    logs.sort(key=lambda log: log.access_time)
-    session.add_all(logs)
+    logs.sort(key=lambda log: log['access_time'])
+    insert_access_logs(session.connection(), logs)
     session.commit()
     print(' OK')
 
@@ -0,0 +1,102 @@
+import argparse
+import hashlib
+from pathlib import Path
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from web_backend.database import engine
+from web_backend.models import Photo, PhotoKind
+from web_backend.settings import Settings
+from web_backend.utils.upload_photo import (
+    CHUNK_SIZE,
+    PhotoFile,
+    original_name,
+)
+
+
+def scan_photos(kind: PhotoKind) -> list[dict]:
+    """
+    Reads the metadata of every original of a kind under `UPLOADS_DIR`,
+    renaming the ones still stored as `{id}{extension}` after their hash.
+
+    Args:
+        kind (PhotoKind): The photo directory to scan.
+
+    Returns:
+        list[dict]: One row of the photo registry per file.
+    """
+    photos_dir = Path(Settings().UPLOADS_DIR) / kind.value
+    if not photos_dir.is_dir():
+        return []
+
+    # originals are {id}{extension} or {id}.{version}{extension}; when an
+    # owner has several, the newest file wins
+    paths = {}
+    for path in sorted(photos_dir.iterdir(), key=lambda p: p.stat().st_mtime):
+        owner_id, *version = path.stem.split('.')
+        if path.is_file() and owner_id.isdigit() and len(version) <= 1:
+            paths[int(owner_id)] = path
+
+    rows = []
+    for owner_id, path in paths.items():
+        digest = hashlib.sha256()
+        with path.open('rb') as photo:
+            while chunk := photo.read(CHUNK_SIZE):
+                digest.update(chunk)
+
+        photo_file = PhotoFile(
+            path.suffix, path.stat().st_size, digest.hexdigest()
+        )
+        path.rename(
+            photos_dir
+            / original_name(owner_id, photo_file.version, path.suffix)
+        )
+        rows.append({
+            'kind': kind,
+            'owner_id': owner_id,
+            **photo_file._asdict(),
+        })
+
+    return rows
+
+
+def sync_photos(session: Session, if_empty: bool = False) -> None:
+    """
+    Rebuilds the photo registry from the files under `UPLOADS_DIR`.
+
+    Args:
+        session (Session): The database session.
+        if_empty (bool): Whether to skip the kinds that already have
+        registered photos, so that it can run on every start and only
+        backfill the registry the migration created empty.
+    """
+    for kind in PhotoKind:
+        if if_empty and session.scalar(
+            select(exists().where(Photo.kind == kind))
+        ):
+            continue
+
+        print(f'Syncing {kind.value}...', end='')
+        rows = scan_photos(kind)
+        session.execute(delete(Photo).where(Photo.kind == kind))
+        if rows:
+            session.execute(insert(Photo), rows)
+        session.commit()
+        print(f' {len(rows)} photos')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Rebuilds the photo registry from the uploaded files.'
+    )
+    parser.add_argument(
+        '--if-empty',
+        action='store_true',
+        help='only sync the kinds of photos with an empty registry',
+    )
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        sync_photos(session, if_empty=args.if_empty)
@@ -1,22 +1,159 @@
-import glob
-import shutil
-from pathlib import Path
+import hashlib
+from http import HTTPStatus
+from typing import BinaryIO, NamedTuple
+from uuid import uuid4
 
-from fastapi import UploadFile
+import anyio
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
 
 from web_backend.settings import Settings
 
+settings = Settings()
 
-def upload_photo(file: UploadFile, id: int, dir_name: str) -> None:
-    upload_dir = Path(Settings().UPLOADS_DIR) / dir_name
-    upload_dir.mkdir(parents=True, exist_ok=True)
+CHUNK_SIZE = 1024 * 1024
+SNIFF_SIZE = 16
 
-    photo_path = f'{upload_dir}/{id}.*'
-    files = glob.glob(photo_path)
-    if files:
-        Path(files[0]).unlink()
+# magic bytes of the accepted formats and the extension they are stored as
+SIGNATURES = {
+    b'\xff\xd8\xff': '.jpg',
+    b'\x89PNG\r\n\x1a\n': '.png',
+}
 
-    extension = Path(file.filename).suffix
-    file_destiny = upload_dir / Path(f'{id}{extension}')
-    with file_destiny.open('wb') as buffer:
-        shutil.copyfileobj(file.file, buffer)
+
+class PhotoFile(NamedTuple):
+    extension: str
+    size: int
+    sha256: str
+
+    @property
+    def version(self) -> str:
+        return self.sha256[:16]
+
+
+def original_name(owner_id: int, version: str, extension: str) -> str:
+    return f'{owner_id}.{version}{extension}'
+
+
+def sniff_extension(head: bytes) -> str:
+    """
+    Identifies a photo by its leading bytes rather than by the name or
+    content type the client sent.
+
+    Args:
+        head (bytes): The first bytes of the upload.
+
+    Returns:
+        str: The extension the photo is stored with.
+
+    Raises:
+        HTTPException: 415 if the bytes are not a JPEG, PNG or WebP image.
+    """
+    for signature, extension in SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+
+    raise HTTPException(
+        status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+        detail='Photo must be a JPEG, PNG or WebP image',
+    )
+
+
+async def upload_photo(file: UploadFile, id: int, dir_name: str) -> PhotoFile:
+    """
+    Streams an uploaded photo to
+    `UPLOADS_DIR/dir_name/{id}.{version}{extension}`.
+
+    The content is hashed and size-checked chunk by chunk while it is
+    written to a temporary file, which is then renamed after its hash.
+    The current photo of that id is left untouched: a path always holds
+    the same bytes, and the replaced file is removed by the caller once
+    the registry points at the new one.
+
+    Args:
+        file (UploadFile): The uploaded photo.
+        id (int): The ID of the photo's owner.
+        dir_name (str): The directory of the owner's kind.
+
+    Returns:
+        PhotoFile: The extension, size in bytes and SHA-256 of the file.
+
+    Raises:
+        HTTPException: 413 if the photo is larger than `PHOTO_MAX_BYTES`,
+        415 if it is not a supported image.
+    """
+    max_bytes = settings.PHOTO_MAX_BYTES
+    upload_dir = anyio.Path(settings.UPLOADS_DIR) / dir_name
+    await upload_dir.mkdir(parents=True, exist_ok=True)
+
+    head = await file.read(SNIFF_SIZE)
+    extension = sniff_extension(head)
+
+    digest = hashlib.sha256(head)
+    size = len(head)
+
+    def copy_chunk(buffer: BinaryIO) -> int:
+        # one worker-thread hop per chunk for the read, hash and write;
+        # hashlib releases the GIL on large buffers
+        chunk = file.file.read(CHUNK_SIZE)
+        digest.update(chunk)
+        buffer.write(chunk)
+        return len(chunk)
+
+    temp_path = upload_dir / f'.{id}.{uuid4().hex}.tmp'
+    try:
+        async with await anyio.open_file(temp_path, 'wb') as buffer:
+            await buffer.write(head)
+            while copied := await to_thread.run_sync(
+                copy_chunk, buffer.wrapped
+            ):
+                size += copied
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        detail=(
+                            f'Photo exceeds the maximum size of '
+                            f'{max_bytes} bytes'
+                        ),
+                    )
+
+        photo_file = PhotoFile(extension, size, digest.hexdigest())
+        await temp_path.rename(
+            upload_dir / original_name(id, photo_file.version, extension)
+        )
+    except BaseException:
+        await temp_path.unlink(missing_ok=True)
+        raise
+
+    return photo_file
+
+
+async def read_photo(file: UploadFile) -> bytes:
+    """
+    Reads a photo that is only needed in memory, with the same size cap
+    and content check as `upload_photo`.
+
+    Args:
+        file (UploadFile): The uploaded photo.
+
+    Returns:
+        bytes: The content of the photo.
+
+    Raises:
+        HTTPException: 413 if the photo is larger than `PHOTO_MAX_BYTES`,
+        415 if it is not a supported image.
+    """
+    max_bytes = settings.PHOTO_MAX_BYTES
+    content = await file.read(max_bytes + 1)
+    sniff_extension(content[:SNIFF_SIZE])
+
+    if len(content) > max_bytes:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Photo exceeds the maximum size of {max_bytes} bytes',
+        )
+
+    return content
@@ -1,15 +1,65 @@
 from http import HTTPStatus
 
 from fastapi import HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Select,
+    all_,
+    any_,
+    bindparam,
+    delete,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from unidecode import unidecode
 
 from web_backend.models import Environment, User
-from web_backend.schemas import UserSchema
+from web_backend.models.user_environment import association_table
+from web_backend.schemas import UserFilter, UserSchema, UserSelection
+from web_backend.utils.permissions import record_changes
 
 
-def verify_repeated_fields(user_form: UserSchema, session: Session) -> None:
-    user_db = session.scalar(
+def user_conditions(filters: UserFilter) -> list[ColumnElement[bool]]:
+    """
+    Turns the name and status of a `UserFilter` into conditions on
+    `User`; its sorting is left to the caller.
+    """
+    conditions = []
+    if filters.name:
+        conditions.append(
+            User.name_unaccent.ilike(f'%{unidecode(filters.name)}%')
+        )
+    if filters.status:
+        conditions.append(User.status == filters.status)
+
+    return conditions
+
+
+def filter_users(query: Select, filters: UserFilter) -> Select:
+    return query.where(*user_conditions(filters))
+
+
+def selected_users(selection: UserSelection) -> list[ColumnElement[bool]]:
+    """
+    Turns a `UserSelection` into conditions on `User`. IDs are sent as a
+    single array parameter, so any number of them fits in one statement.
+    """
+    if selection.user_ids is not None:
+        return [
+            User.id
+            == any_(bindparam('user_ids', selection.user_ids, ARRAY(Integer)))
+        ]
+
+    return user_conditions(selection.filter)
+
+
+async def verify_repeated_fields(
+    user_form: UserSchema, session: AsyncSession
+) -> None:
+    user_db = await session.scalar(
         select(User).where(
             (User.email == user_form.email)
             | (User.cpf == user_form.cpf)
@@ -32,17 +82,24 @@ def verify_repeated_fields(user_form: UserSchema, session: Session) -> None:
             raise http_exception
 
 
-def verify_environment_ids(
-    environment_ids: list[int] | None, session: Session, user_db: User
+async def verify_environment_ids(
+    environment_ids: list[int] | None,
+    session: AsyncSession,
+    user_db: User,
+    replace: bool = False,
 ) -> tuple[list[int], list[int]]:
     """
-    Verify valid environments and already add them to user.
+    Verify valid environments and give them to the user, in a fixed
+    number of statements however many there are. Only the missing grants
+    are inserted and, when replacing, only the dropped ones deleted; the
+    caller commits.
 
     Args:
         environment_ids (list[int] | None): List of environment IDs to verify.
-        session (Session): SQLAlchemy session object.
+        session (AsyncSession): SQLAlchemy session object.
         user_db (User): User database object to which environments will be
-        added.
+        added; it must have been flushed.
+        replace (bool): Whether the user loses the environments not listed.
 
     Returns:
         tuple[list[int], list[int]]: A tuple containing two lists:
@@ -52,54 +109,45 @@ def verify_environment_ids(
     if environment_ids is None:
         return [], []
 
-    existing_environments = session.scalars(
-        select(Environment).where(Environment.id.in_(environment_ids))
-    ).all()
-
-    existing_ids = [env.id for env in existing_environments]
-    invalid_ids = [
-        env_id for env_id in environment_ids if env_id not in existing_ids
-    ]
-
-    for environment in existing_environments:
-        user_db.environments.append(environment)
-
-    session.commit()
-
-    return existing_ids, invalid_ids
-
-
-def verify_environment_ids_put(
-    environment_ids: list[int] | None, session: Session, user_db: User
-) -> tuple[list[int], list[int]]:
-    """
-    Verify valid environments and already add them to user.
-
-    Args:
-        environment_ids (list[int] | None): List of environment IDs to verify.
-        session (Session): SQLAlchemy session object.
-        user_db (User): User database object to which environments will be
-        added.
-
-    Returns:
-        tuple[list[int], list[int]]: A tuple containing two lists:
-            - The first list contains the IDs of the valid environments.
-            - The second list contains the IDs of the invalid environments.
-    """
-    if environment_ids is None:
-        return [], []
-
-    existing_environments = session.scalars(
-        select(Environment).where(Environment.id.in_(environment_ids))
-    ).all()
-
-    existing_ids = [env.id for env in existing_environments]
+    requested = bindparam('environment_ids', environment_ids, ARRAY(Integer))
+    existing_ids = list(
+        await session.scalars(
+            select(Environment.id).where(Environment.id == any_(requested))
+        )
+    )
     invalid_ids = [
         env_id for env_id in environment_ids if env_id not in existing_ids
     ]
 
-    user_db.environments = existing_environments
+    changes = []
+    if replace:
+        revoked = await session.scalars(
+            delete(association_table)
+            .where(
+                association_table.c.user_id == user_db.id,
+                association_table.c.enviroment_id
+                != all_(
+                    bindparam('existing_ids', existing_ids, ARRAY(Integer))
+                ),
+            )
+            .returning(association_table.c.enviroment_id)
+        )
+        changes.extend(('revoke', user_db.id, env_id) for env_id in revoked)
+
+    if existing_ids:
+        granted = await session.scalars(
+            insert(association_table)
+            .from_select(
+                ['user_id', 'enviroment_id'],
+                select(literal(user_db.id), Environment.id).where(
+                    Environment.id == any_(requested)
+                ),
+            )
+            .on_conflict_do_nothing()
+            .returning(association_table.c.enviroment_id)
+        )
+        changes.extend(('grant', user_db.id, env_id) for env_id in granted)
 
-    session.commit()
+    record_changes(session.sync_session, *changes)
 
     return existing_ids, invalid_ids
@@ -0,0 +1,346 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+from pathlib import PurePath
+
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy import (
+    Column,
+    Date,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.schema import CreateTable
+from unidecode import unidecode
+
+from web_backend.models import User
+from web_backend.schemas import UserImportResult, UserImportRow
+from web_backend.settings import Settings
+from web_backend.utils.permissions import record_changes
+
+settings = Settings()
+
+Status = UserImportResult.Status
+
+# the fields that must be unique, with the names errors give them
+UNIQUE_FIELDS = {
+    'email': 'Email',
+    'cpf': 'CPF',
+    'phone_number': 'Phone Number',
+}
+
+# the rows to register are copied in first, so that looking up their
+# conflicts and inserting them are joins rather than statements with
+# one parameter per row
+USER_IMPORT = Table(
+    'user_import',
+    MetaData(),
+    Column('row', Integer),
+    Column('name', String),
+    Column('name_unaccent', String),
+    Column('email', String),
+    Column('date_of_birth', Date),
+    Column('cpf', String),
+    Column('phone_number', String),
+    prefixes=['TEMPORARY'],
+    postgresql_on_commit='DROP',
+)
+USER_IMPORT_COPY = (
+    f'COPY user_import ({", ".join(USER_IMPORT.columns.keys())}) FROM STDIN'
+)
+USER_FIELDS = [
+    column for column in USER_IMPORT.columns.keys() if column != 'row'
+]
+
+
+FORMATS = {
+    '.csv': 'csv',
+    'text/csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+async def read_import(file: UploadFile) -> tuple[str, str]:
+    """
+    Reads an import file and tells its format from its extension or, if
+    it has none, its content type.
+
+    Args:
+        file (UploadFile): The uploaded file.
+
+    Returns:
+        tuple[str, str]: The text of the file and its format, `csv` or
+        `ndjson`.
+
+    Raises:
+        HTTPException: 415 if the format is not supported, 413 if the
+        file is larger than `USER_IMPORT_MAX_BYTES`, 400 if it is not
+        UTF-8.
+    """
+    suffix = PurePath(file.filename or '').suffix.lower()
+    format = FORMATS.get(suffix) or FORMATS.get(file.content_type)
+    if not format:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail='Users must be sent as CSV or NDJSON',
+        )
+
+    max_bytes = settings.USER_IMPORT_MAX_BYTES
+    content = await file.read(max_bytes + 1)
+    if len(content) > max_bytes:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=f'File exceeds the maximum size of {max_bytes} bytes',
+        )
+
+    try:
+        return content.decode('utf-8-sig'), format
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='File must be UTF-8 encoded',
+        )
+
+
+def validation_detail(error: ValidationError) -> str:
+    return '; '.join(
+        f'{".".join(map(str, item["loc"])) or "row"}: {item["msg"]}'
+        for item in error.errors()
+    )
+
+
+def parse_users(text: str, format: str) -> tuple[list, list]:
+    """
+    Reads and validates the rows of an import file, one at a time, so a
+    bad row is reported without failing the others.
+
+    Args:
+        text (str): The file.
+        format (str): `csv`, with a header line naming the columns, or
+        `ndjson`, one JSON object per line.
+
+    Returns:
+        tuple[list, list]: The valid rows, as (row number, UserImportRow)
+        pairs, and the results of the invalid ones.
+    """
+    if format == 'csv':
+        records = list(csv.DictReader(io.StringIO(text)))
+    else:
+        records = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as error:
+                records.append(error)
+
+    valid, invalid = [], []
+    for number, record in enumerate(records, start=1):
+        try:
+            if isinstance(record, json.JSONDecodeError):
+                raise ValueError(f'Invalid JSON: {record.msg}')
+            valid.append((number, UserImportRow.model_validate(record)))
+        except ValidationError as error:
+            invalid.append(
+                UserImportResult(
+                    row=number,
+                    status=Status.invalid,
+                    detail=validation_detail(error),
+                )
+            )
+        except ValueError as error:
+            invalid.append(
+                UserImportResult(
+                    row=number, status=Status.invalid, detail=str(error)
+                )
+            )
+
+    return valid, invalid
+
+
+def find_repeats(
+    rows: list[tuple[int, UserImportRow]],
+) -> dict[int, str]:
+    """
+    Finds the rows repeating the email, CPF or phone number of an
+    earlier row of the file, which is the one registered.
+
+    Returns:
+        dict[int, str]: The conflict of each repeating row, by row
+        number.
+    """
+    repeats = {}
+    first_rows = {field: {} for field in UNIQUE_FIELDS}
+    for number, row in rows:
+        for field, name in UNIQUE_FIELDS.items():
+            first = first_rows[field].get(getattr(row, field))
+            if first:
+                repeats[number] = f'{name} repeats row {first}'
+                break
+        else:
+            for field in UNIQUE_FIELDS:
+                first_rows[field][getattr(row, field)] = number
+
+    return repeats
+
+
+def copy_records(rows: list[tuple[int, UserImportRow]]) -> list[tuple]:
+    return [
+        (
+            number,
+            row.name,
+            unidecode(row.name),
+            row.email,
+            row.date_of_birth,
+            row.cpf,
+            row.phone_number,
+        )
+        for number, row in rows
+    ]
+
+
+async def copy_rows(connection: AsyncConnection, records: list[tuple]) -> None:
+    """
+    Copies rows, as built by `copy_records`, into `user_import`, created
+    for the current transaction.
+    """
+    await connection.execute(CreateTable(USER_IMPORT))
+    raw_connection = await connection.get_raw_connection()
+    async with (
+        raw_connection.driver_connection.cursor() as cursor,
+        cursor.copy(USER_IMPORT_COPY) as copy,
+    ):
+        for record in records:
+            await copy.write_row(record)
+
+
+async def find_conflicts(connection: AsyncConnection) -> dict[int, str]:
+    """
+    Finds the rows of `user_import` whose email, CPF or phone number
+    belongs to a registered user, in one query.
+
+    Returns:
+        dict[int, str]: The conflict of each conflicting row, by row
+        number.
+    """
+    # a join per field: an OR of the three could not be hashed
+    taken = await connection.execute(
+        union_all(
+            *(
+                select(USER_IMPORT.c.row, literal(name)).join(
+                    User.__table__,
+                    User.__table__.c[field] == USER_IMPORT.c[field],
+                )
+                for field, name in UNIQUE_FIELDS.items()
+            )
+        )
+    )
+
+    conflicts = {}
+    for number, name in taken:
+        conflicts.setdefault(number, f'{name} already in use!')
+
+    return conflicts
+
+
+def insert_users(admin_id: int):
+    """
+    Builds the insert of the rows of `user_import`, skipping the ones
+    that conflict with a registered user, returning the new IDs.
+    """
+    return (
+        insert(User.__table__)
+        .from_select(
+            ['registered_by_admin_id', *USER_FIELDS],
+            select(
+                literal(admin_id),
+                *(USER_IMPORT.c[field] for field in USER_FIELDS),
+            ),
+        )
+        .on_conflict_do_nothing()
+        .returning(User.id, User.email)
+    )
+
+
+async def import_users(
+    session: AsyncSession, text: str, format: str, admin_id: int
+) -> dict:
+    """
+    Registers the users of an import file, skipping invalid rows and
+    rows whose email, CPF or phone number is taken, and reports on
+    every row.
+
+    Args:
+        session (AsyncSession): The database session; committed.
+        text (str): The file.
+        format (str): `csv` or `ndjson`.
+        admin_id (int): The admin registering the users.
+
+    Returns:
+        dict: The counts of created, invalid and conflicting rows, and
+        the result of each row.
+    """
+    valid, results = await to_thread.run_sync(parse_users, text, format)
+    conflicts = await to_thread.run_sync(find_repeats, valid)
+    new_rows = [
+        (number, row) for number, row in valid if number not in conflicts
+    ]
+
+    ids = {}
+    if new_rows:
+        records = await to_thread.run_sync(copy_records, new_rows)
+        connection = await session.connection()
+        await copy_rows(connection, records)
+        conflicts |= await find_conflicts(connection)
+        inserted = await connection.execute(insert_users(admin_id))
+        ids = {email: user_id for user_id, email in inserted}
+        record_changes(
+            session.sync_session,
+            *(('set_user', user_id, True) for user_id in ids.values()),
+        )
+        await session.commit()
+
+    for number, row in valid:
+        if number not in conflicts and row.email in ids:
+            results.append(
+                UserImportResult(
+                    row=number, status=Status.created, user_id=ids[row.email]
+                )
+            )
+        else:
+            # without a known conflict, registered by someone else since
+            # the conflicts were looked up
+            results.append(
+                UserImportResult(
+                    row=number,
+                    status=Status.conflict,
+                    detail=conflicts.get(
+                        number, 'Email, CPF or Phone Number already in use!'
+                    ),
+                )
+            )
+
+    results.sort(key=lambda result: result.row)
+
+    return {
+        'created': len(ids),
+        'invalid': sum(result.status == Status.invalid for result in results),
+        'conflicts': sum(
+            result.status == Status.conflict for result in results
+        ),
+        'rows': results,
+    }